@@ -5,7 +5,7 @@ from pathlib import Path
 from typing import Any, Dict, Optional, AsyncIterator, List
 
 from fastapi import Depends, FastAPI, HTTPException, Header, Query, status, Request, Response
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from telegram import Bot, Update
 
@@ -13,20 +13,20 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from libs.core.settings import get_settings
 from libs.logging import setup_logging
+from libs.metrics import collect_calls, get_metrics, summarize_calls
 from libs.storage.notes_storage import NotesStorage
 from libs.llm.replicate_client import ReplicateLLMClient
 from libs.llm.embeddings_provider import EmbeddingsProvider
-from libs.rag import VectorIndex
-from libs.usecases import IngestText, Search
-from libs.db import get_session, NoteRepo, ChunkRepo, UserRepo, models, init_db
+from libs.llm.prompts import get_prompt_registry
+from libs.rag import VectorIndex, get_index_version
+from libs.usecases import IngestText, Search, build_ingest_text, get_search_cache
+from libs.db import get_session, JobRepo, UserRepo, models, init_db
 
 import hmac
 import hashlib
 import json
 from urllib.parse import parse_qsl
 
-MAX_NOTE_LEN = 1000
-
 
 # ---------------------------------------------------------------------------
 # Dependency factories
@@ -107,16 +107,11 @@ def get_llm_client(user: models.User = Depends(current_user)) -> ReplicateLLMCli
     Defined after current_user to avoid NameError during module import.
     """
     lang = getattr(user, "language", "en") or "en"
-    base = Path("/app/config")
-    candidates = [
-        base / f"prompts.{lang}.yaml",
-        base / "prompts.yaml",
-        base / "prompts.en.yaml",
-    ]
-    for path in candidates:
-        if path.exists():
-            return ReplicateLLMClient(prompts_path=path)
-    return ReplicateLLMClient()
+    try:
+        path, prompts = get_prompt_registry().for_language(lang)
+    except FileNotFoundError:
+        return ReplicateLLMClient()
+    return ReplicateLLMClient(prompts_path=path, prompts=prompts)
 
 
 def get_embeddings_provider() -> EmbeddingsProvider:
@@ -135,9 +130,16 @@ class IngestTextRequest(BaseModel):
     channel: Optional[str] = None
 
 
+class IngestBatchRequest(BaseModel):
+    items: List[IngestTextRequest] = Field(min_length=1, max_length=100)
+
+
 class SearchRequest(BaseModel):
     query: str
     k: int = Field(5, ge=1, le=50)
+    # "retrieve" returns the result list only; fetch the answer later via
+    # POST /search/answer (retrieval is cached, so it is not repeated)
+    mode: str = Field("answer", pattern="^(retrieve|answer)$")
 
 
 class UpdateLanguageRequest(BaseModel):
@@ -177,7 +179,8 @@ async def request_logging_middleware(request: Request, call_next):
     req_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
     request.state.request_id = req_id
     try:
-        response: Response = await call_next(request)
+        with collect_calls() as llm_calls:
+            response: Response = await call_next(request)
         duration_ms = int((time.perf_counter() - start) * 1000)
         in_len = int(request.headers.get("content-length", "0") or 0)
         out_len = int(response.headers.get("content-length", "0") or 0)
@@ -198,6 +201,7 @@ async def request_logging_middleware(request: Request, call_next):
                 "payload_in": in_len,
                 "payload_out": out_len,
                 "db": {"name": db_name},
+                "llm": summarize_calls(llm_calls),
             },
         )
         response.headers["X-Request-ID"] = req_id
@@ -228,6 +232,7 @@ def require_json_content_type(request: Request) -> None:
 
 @app.on_event("startup")
 async def startup() -> None:
+    get_prompt_registry().preload()
     await init_db()
 
 
@@ -237,6 +242,12 @@ def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics/llm")
+def llm_metrics(user: models.User = Depends(current_user)) -> Dict[str, Any]:
+    """Aggregated LLM/embedding call metrics of this process."""
+    return get_metrics().snapshot()
+
+
 @app.get("/user/settings")
 async def user_settings(user: models.User = Depends(current_user)) -> Dict[str, Any]:
     return {
@@ -400,10 +411,11 @@ async def ingest_text_uc(
     llm: ReplicateLLMClient = Depends(get_llm_client),
     emb: EmbeddingsProvider = Depends(get_embeddings_provider),
     session: AsyncSession = Depends(db_session),
+    user: models.User = Depends(current_user),
 ) -> IngestText:
-    note_repo = NoteRepo(session)
-    chunk_repo = ChunkRepo(session)
-    return IngestText(llm, storage, emb, index, note_repo, chunk_repo)
+    return build_ingest_text(
+        llm, storage, emb, index, session, getattr(user, "language", "en") or "en"
+    )
 
 
 def search_uc(
@@ -411,8 +423,25 @@ def search_uc(
     index: VectorIndex = Depends(get_index),
     llm: ReplicateLLMClient = Depends(get_llm_client),
     emb: EmbeddingsProvider = Depends(get_embeddings_provider),
+    user: models.User = Depends(current_user),
 ) -> Search:
-    return Search(llm, emb, index, storage)
+    settings = get_settings()
+    cache = get_search_cache() if getattr(settings, "search_cache", True) else None
+    return Search(
+        llm,
+        emb,
+        index,
+        storage,
+        cache=cache,
+        version=get_index_version(),
+        # Answers follow the user's prompt language
+        user=f'{getattr(user, "id", "")}:{getattr(user, "language", "en") or "en"}',
+        mmr_lambda=float(getattr(settings, "search_mmr_lambda", 0.5)),
+        fetch_factor=int(getattr(settings, "search_fetch_factor", 3)),
+        context_tokens=int(getattr(settings, "search_context_tokens", 800)),
+        neighbors=int(getattr(settings, "search_neighbor_chunks", 1)),
+        timeout=float(getattr(settings, "search_timeout", 30.0)) or None,
+    )
 
 
 # Routes ---------------------------------------------------------------------
@@ -423,6 +452,14 @@ async def auth_telegram(user: models.User = Depends(current_user)) -> Dict[str,
     return {"id": user.id, "telegram_id": user.telegram_id}
 
 
+def _timing_headers(uc: Any) -> Dict[str, str]:
+    """``Server-Timing`` with the ingest's per-stage breakdown, when enabled."""
+    timings = getattr(uc, "timings", None)
+    if timings is None or not getattr(get_settings(), "ingest_timing_header", False):
+        return {}
+    return {"Server-Timing": timings.server_timing()}
+
+
 @app.post("/ingest/text", status_code=status.HTTP_201_CREATED)
 async def ingest_text(
     req: IngestTextRequest,
@@ -430,9 +467,22 @@ async def ingest_text(
     uc: IngestText = Depends(ingest_text_uc),
     storage: NotesStorage = Depends(get_storage),
     user: models.User = Depends(current_user),
+    session: AsyncSession = Depends(db_session),
+    run_async: bool = Query(False, alias="async"),
 ) -> JSONResponse:
+    if run_async:
+        # Picked up by apps/worker; poll GET /jobs/{id} for the outcome
+        job = await JobRepo(session).create(
+            req.model_dump(mode="json"), user_id=getattr(user, "id", None)
+        )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"job_id": job.id, "status": job.status},
+            headers={"Location": f"/jobs/{job.id}"},
+        )
     try:
         notes = await uc(req.text)
+        headers = _timing_headers(uc)
         result = {
             "notes": [
                 {
@@ -443,13 +493,81 @@ async def ingest_text(
                 for n in notes
             ]
         }
-        return JSONResponse(status_code=status.HTTP_201_CREATED, content=result)
+        return JSONResponse(
+            status_code=status.HTTP_201_CREATED, content=result, headers=headers
+        )
     except Exception as exc:  # pragma: no cover - generic error
         import logging
         logging.exception("ingest_text failed")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
 
 
+@app.post("/ingest/batch", status_code=status.HTTP_201_CREATED)
+async def ingest_batch(
+    req: IngestBatchRequest,
+    response: Response,
+    _: None = Depends(require_json_content_type),
+    uc: IngestText = Depends(ingest_text_uc),
+    storage: NotesStorage = Depends(get_storage),
+) -> Dict[str, Any]:
+    items = [
+        {
+            "text": item.text,
+            "meta": {
+                "source_url": item.source_url,
+                "source_author": item.author,
+                "source_dt": item.dt.isoformat() if item.dt else None,
+                "source_channel": item.channel,
+            },
+        }
+        for item in req.items
+    ]
+    try:
+        results = await uc.ingest_batch(items)
+    except Exception as exc:  # pragma: no cover - generic error
+        import logging
+        logging.exception("ingest_batch failed")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    response.headers.update(_timing_headers(uc))
+    return {
+        "items": [
+            {
+                "notes": [
+                    {
+                        "id": n.id,
+                        "title": n.title,
+                        "content": storage.read_note(n.id).body,
+                    }
+                    for n in r.notes
+                ],
+                "duplicate": r.duplicate,
+                "error": r.error,
+            }
+            for r in results
+        ]
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    user: models.User = Depends(current_user),
+    session: AsyncSession = Depends(db_session),
+) -> Dict[str, Any]:
+    job = await JobRepo(session).get(job_id)
+    if not job or str(job.user_id) != str(getattr(user, "id", None)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return {
+        "id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
 @app.post("/ingest/video", status_code=status.HTTP_501_NOT_IMPLEMENTED)
 def ingest_video(_: None = Depends(require_json_content_type)) -> Dict[str, str]:
     return {"detail": "Not implemented"}
@@ -461,23 +579,87 @@ def ingest_image(_: None = Depends(require_json_content_type)) -> Dict[str, str]
 
 
 @app.post("/search")
-def search(
+async def search(
     req: SearchRequest,
     _: None = Depends(require_json_content_type),
     uc: Search = Depends(search_uc),
     user: models.User = Depends(current_user),
 ) -> Dict[str, Any]:
     try:
-        answer_md, items = uc(req.query, req.k)
+        if req.mode == "retrieve":
+            answer_md, items = None, await uc.retrieve(req.query, req.k)
+        else:
+            answer_md, items = await uc(req.query, req.k)
         # Filter out any missing fragments to return only existing notes
         filtered_items = [item for item in items if item]
         return {"answer_md": answer_md, "items": filtered_items}
+    except TimeoutError:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Search timed out")
     except Exception as exc:  # pragma: no cover - generic error
         import logging
         logging.exception("search failed")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
 
 
+@app.post("/search/answer")
+async def search_answer(
+    req: SearchRequest,
+    _: None = Depends(require_json_content_type),
+    uc: Search = Depends(search_uc),
+    user: models.User = Depends(current_user),
+) -> Dict[str, Any]:
+    """Answer for a query whose results were fetched with ``mode=retrieve``."""
+    try:
+        answer_md, _items = await uc(req.query, req.k)
+        return {"answer_md": answer_md}
+    except TimeoutError:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Search timed out")
+    except Exception as exc:  # pragma: no cover - generic error
+        import logging
+        logging.exception("search answer failed")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a single Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/search/stream")
+async def search_stream(
+    query: str = Query(...),
+    k: int = Query(5, ge=1, le=50),
+    uc: Search = Depends(search_uc),
+    user: models.User = Depends(current_user),
+) -> StreamingResponse:
+    """Stream search results over SSE.
+
+    Emits an ``items`` event with retrieved fragments first, then ``token``
+    events as the answer is generated, and finally ``done`` (or ``error``).
+    """
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            items, tokens = await uc.stream(query, k)
+            yield _sse("items", {"items": [item for item in items if item]})
+            async for token in tokens:
+                yield _sse("token", {"text": token})
+            yield _sse("done", {})
+        except TimeoutError:
+            yield _sse("error", {"detail": "Search timed out"})
+        except Exception as exc:  # pragma: no cover - generic error
+            import logging
+            logging.exception("search stream failed")
+            yield _sse("error", {"detail": str(exc)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so tokens reach the client as they arrive
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/notes")
 def list_notes(
     storage: NotesStorage = Depends(get_storage),
@@ -545,10 +727,8 @@ async def telegram_webhook(
     if not msg or not msg.forward_date or not msg.text:
         return {"status": "ignored"}
 
-    text = msg.text
-    parts = [text] if len(text) <= MAX_NOTE_LEN else [text[i : i + MAX_NOTE_LEN] for i in range(0, len(text), MAX_NOTE_LEN)]
-    for part in parts:
-        await uc(part)
+    # Long forwards are segmented by IngestText itself (one topic grouping)
+    await uc(msg.text)
 
     return {"status": "ok"}
 
@@ -204,6 +204,46 @@ async def ingest(text: str) -> Tuple[List[dict], Optional[dict]]:
         return [], {"status": status, "message": str(exc)}
     data = response.json()
     return data.get("notes", []), None
+
+
+# The API accepts at most this many items per /ingest/batch request
+BATCH_LIMIT = 100
+
+
+async def ingest_many(texts: List[str]) -> Tuple[List[dict], Optional[dict]]:
+    """Send several texts in batches and return all created notes.
+
+    Failed items do not fail the batch; their errors are returned like a
+    failed :func:`ingest` call, alongside the notes of the items that worked.
+    """
+    settings = get_settings()
+    url = f"{settings.public_url}/api/ingest/batch"
+    token = settings.bot_api_token
+    headers = {"X-Bot-Api-Token": token} if token else None
+    notes: List[dict] = []
+    seen: set = set()
+    errors: List[str] = []
+    async with httpx.AsyncClient() as client:
+        for start in range(0, len(texts), BATCH_LIMIT):
+            chunk = texts[start : start + BATCH_LIMIT]
+            try:
+                response = await client.post(
+                    url, json={"items": [{"text": t} for t in chunk]}, headers=headers
+                )
+                response.raise_for_status()
+            except httpx.HTTPError as exc:  # pragma: no cover - network errors
+                status = getattr(getattr(exc, "response", None), "status_code", None)
+                return notes, {"status": status, "message": str(exc)}
+            for item in response.json().get("items", []):
+                if item.get("error") and item["error"] not in errors:
+                    errors.append(item["error"])
+                for note in item.get("notes", []):
+                    if note.get("id") not in seen:
+                        seen.add(note.get("id"))
+                        notes.append(note)
+    if errors:
+        return notes, {"status": None, "message": "; ".join(errors)}
+    return notes, None
 # ---------------------------------------------------------------------------
 
 # Bot handlers
@@ -378,11 +418,13 @@ async def _flush_buffer(chat_id: int, context: ContextTypes.DEFAULT_TYPE, lang:
 async def _process_text(
     texts: List[str], chat_id: int, context: ContextTypes.DEFAULT_TYPE, lang: str
 ) -> None:
-    text = "\n\n".join(texts)
     await context.bot.send_message(chat_id, L(lang, 'processing'))
     try:
-        notes, error = await ingest(text)
-        if error:
+        if len(texts) > 1:
+            notes, error = await ingest_many(texts)
+        else:
+            notes, error = await ingest(texts[0] if texts else "")
+        if error and not notes:
             status = error.get("status")
             message = error.get("message")
             if status and 500 <= status < 600:
@@ -408,6 +450,8 @@ async def _process_text(
             else:
                 lines = [f"- {n['title']}" for n in notes]
             reply = L(lang, 'done') + "\n" + "\n".join(lines)
+            if error:  # some items of a batch failed
+                reply += "\n\n" + L(lang, 'error').format(error=error.get("message"))
         else:
             reply = L(lang, 'no_notes')
         await context.bot.send_message(
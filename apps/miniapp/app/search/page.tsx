@@ -1,21 +1,31 @@
 ﻿'use client';
 
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import Link from 'next/link';
 import { t } from '@/lib/i18n';
 import ReactMarkdown from 'react-markdown';
-import { searchNotes } from '@/lib/api';
+import { searchAnswer, searchNotes } from '@/lib/api';
 
 export default function SearchPage() {
   const [query, setQuery] = useState('');
   const [answer, setAnswer] = useState('');
   const [items, setItems] = useState<Array<{ id: string; title: string }>>([]);
+  // Responses of an older search must not overwrite the newer one
+  const latest = useRef(0);
 
   const handleSearch = async (e: React.FormEvent) => {
     e.preventDefault();
+    const request = ++latest.current;
+    setAnswer('');
     const res = await searchNotes(query);
-    setAnswer(res.answer_md);
+    if (request !== latest.current) return;
     setItems(res.items);
+    // The list is shown right away; the answer follows when it is ready
+    searchAnswer(query)
+      .then((text) => {
+        if (request === latest.current) setAnswer(text);
+      })
+      .catch((err) => console.error('Error fetching answer', err));
   };
 
   return (
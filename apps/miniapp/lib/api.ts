@@ -38,20 +38,21 @@ export async function getNote(id: string): Promise<{id: string; title: string; c
   return res.json();
 }
 
+// Results only (no LLM call); fetch the answer separately with searchAnswer()
 export async function searchNotes(
   query: string,
 ): Promise<{ answer_md: string; items: Array<{ id: string; title: string }> }> {
   const res = await fetch(`${API_BASE_URL}/search`, {
     method: 'POST',
     headers: authHeaders({ 'Content-Type': 'application/json' }),
-    body: JSON.stringify({ query }),
+    body: JSON.stringify({ query, mode: 'retrieve' }),
   });
   if (!res.ok) {
     throw new Error('Search request failed');
   }
   const data = await res.json();
   return {
-    answer_md: data.answer_md,
+    answer_md: data.answer_md || '',
     items: data.items.map(
       (item: { note_id: string; title: string }) => ({
         id: item.note_id,
@@ -61,6 +62,19 @@ export async function searchNotes(
   };
 }
 
+export async function searchAnswer(query: string): Promise<string> {
+  const res = await fetch(`${API_BASE_URL}/search/answer`, {
+    method: 'POST',
+    headers: authHeaders({ 'Content-Type': 'application/json' }),
+    body: JSON.stringify({ query }),
+  });
+  if (!res.ok) {
+    throw new Error('Search answer request failed');
+  }
+  const data = await res.json();
+  return data.answer_md || '';
+}
+
 export function getZipUrl(): string {
   const initData = getInitData();
   const url = `${API_BASE_URL}/export/zip`;
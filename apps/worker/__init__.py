@@ -0,0 +1 @@
+"""Background ingest worker for BaseKnowledge."""
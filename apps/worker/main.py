@@ -0,0 +1,200 @@
+"""Background ingest worker entry point.
+
+Claims ``ingest_jobs`` rows queued by ``POST /ingest/text?async=true`` with
+``FOR UPDATE SKIP LOCKED`` and runs the ingest pipeline for up to
+``WORKER_CONCURRENCY`` jobs at a time on one event loop (the pipeline's
+blocking calls run in threads). Any number of worker processes can run
+against the same database. Failed jobs are retried up to
+``INGEST_JOB_MAX_ATTEMPTS`` times, after ``INGEST_JOB_RETRY_BACKOFF``
+seconds doubled per attempt; the notes of a failed attempt roll back with its
+session and :class:`~libs.usecases.IngestText` removes its note files and
+index entries, so a retry starts clean. While a job runs, its ``started_at``
+is refreshed every third of ``INGEST_JOB_STALE_AFTER`` so only jobs whose
+worker died are re-claimed as stale.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from libs.core.settings import get_settings
+from libs.db import JobRepo, UserRepo, get_session, init_db, models
+from libs.llm.embeddings_provider import EmbeddingsProvider
+from libs.llm.prompts import get_prompt_registry
+from libs.llm.replicate_client import ReplicateLLMClient
+from libs.logging import setup_logging
+from libs.metrics import collect_calls, summarize_calls
+from libs.rag import VectorIndex
+from libs.storage.notes_storage import NotesStorage
+from libs.usecases import build_ingest_text
+
+logger = logging.getLogger("worker")
+
+IngestRunner = Callable[
+    [AsyncSession, Dict[str, Any], Optional[models.User]], Awaitable[List[Any]]
+]
+
+
+async def run_ingest(
+    session: AsyncSession, payload: Dict[str, Any], user: Optional[models.User]
+) -> List[models.Note]:
+    """Run the same pipeline as the synchronous ``/ingest/text`` endpoint."""
+    lang = getattr(user, "language", None) or "en"
+    try:
+        path, prompts = get_prompt_registry().for_language(lang)
+        llm = ReplicateLLMClient(prompts_path=path, prompts=prompts)
+    except FileNotFoundError:
+        llm = ReplicateLLMClient()
+    uc = build_ingest_text(
+        llm,
+        NotesStorage(Path(get_settings().vault_dir)),
+        EmbeddingsProvider(),
+        # Connecting to Milvus blocks; keep the other jobs running meanwhile
+        await asyncio.to_thread(VectorIndex),
+        session,
+        lang,
+    )
+    return await uc(str(payload.get("text") or ""))
+
+
+async def _heartbeat(session_factory, job_id: str, interval: float) -> None:
+    """Keep a claimed job's ``started_at`` fresh until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as session:
+                await JobRepo(session).heartbeat(job_id)
+        except Exception:  # the next beat may get through
+            logger.exception("ingest_job_heartbeat_failed", extra={"job_id": job_id})
+
+
+async def run_once(
+    session_factory=get_session,
+    ingest: IngestRunner = run_ingest,
+    *,
+    stale_after: timedelta | None = None,
+    max_attempts: int = 3,
+    retry_backoff: float = 0.0,
+) -> bool:
+    """Claim and process one job. Returns ``False`` when the queue is empty."""
+    # Claim in its own short transaction so the row is visibly running and
+    # its lock is released while the (long) ingest is in progress.
+    async with session_factory() as session:
+        job = await JobRepo(session).claim(
+            stale_after=stale_after, max_attempts=max_attempts
+        )
+        if job is None:
+            return False
+        job_id, payload, user_id, attempts = (
+            job.id,
+            dict(job.payload or {}),
+            job.user_id,
+            job.attempts,
+        )
+
+    beat = None
+    if stale_after is not None:
+        beat = asyncio.create_task(
+            _heartbeat(session_factory, job_id, stale_after.total_seconds() / 3)
+        )
+    with collect_calls() as calls:
+        try:
+            # Notes and the job outcome commit together
+            async with session_factory() as session:
+                user = await UserRepo(session).get(user_id) if user_id else None
+                notes = await ingest(session, payload, user)
+                repo = JobRepo(session)
+                job = await repo.get(job_id)
+                await repo.finish(
+                    job,
+                    result={"notes": [{"id": n.id, "title": n.title} for n in notes]},
+                )
+        except Exception as exc:
+            retry = attempts < max_attempts
+            backoff = timedelta(seconds=retry_backoff * 2 ** (attempts - 1))
+            logger.exception(
+                "ingest_job_failed", extra={"job_id": job_id, "attempt": attempts, "retry": retry}
+            )
+            async with session_factory() as session:
+                repo = JobRepo(session)
+                job = await repo.get(job_id)
+                if job is not None:
+                    await repo.finish(
+                        job,
+                        error=str(exc)[:2000],
+                        retry=retry,
+                        retry_after=backoff,
+                    )
+            return True
+        finally:
+            if beat is not None:
+                beat.cancel()
+                await asyncio.gather(beat, return_exceptions=True)
+    logger.info(
+        "ingest_job_done",
+        extra={"job_id": job_id, "notes": len(notes), "llm": summarize_calls(calls)},
+    )
+    return True
+
+
+async def worker_loop(
+    stop: asyncio.Event,
+    session_factory=get_session,
+    ingest: IngestRunner = run_ingest,
+) -> None:
+    """Process jobs until ``stop`` is set, polling while the queue is empty."""
+    settings = get_settings()
+    poll_interval = float(getattr(settings, "worker_poll_interval", 1.0))
+    stale_after = timedelta(seconds=int(getattr(settings, "ingest_job_stale_after", 900)))
+    max_attempts = int(getattr(settings, "ingest_job_max_attempts", 3))
+    retry_backoff = float(getattr(settings, "ingest_job_retry_backoff", 30.0))
+    while not stop.is_set():
+        try:
+            busy = await run_once(
+                session_factory,
+                ingest,
+                stale_after=stale_after,
+                max_attempts=max_attempts,
+                retry_backoff=retry_backoff,
+            )
+        except Exception:  # e.g. database briefly unavailable
+            logger.exception("worker_claim_failed")
+            busy = False
+        if busy:
+            continue
+        try:
+            await asyncio.wait_for(stop.wait(), poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def serve(concurrency: int) -> None:
+    await init_db()
+    get_prompt_registry().preload()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # pragma: no cover - non-Unix
+            pass
+    logger.info("worker_started", extra={"concurrency": concurrency})
+    # Each loop finishes its current job before exiting on shutdown
+    await asyncio.gather(*(worker_loop(stop) for _ in range(concurrency)))
+
+
+def main() -> None:
+    settings = get_settings()
+    asyncio.run(serve(max(1, int(getattr(settings, "worker_concurrency", 2)))))
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
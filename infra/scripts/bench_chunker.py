@@ -0,0 +1,80 @@
+"""Throughput benchmark for the Markdown chunker.
+
+Usage: python infra/scripts/bench_chunker.py [--size-kb 512] [--repeat 5]
+
+Builds a synthetic Markdown note (headings, paragraphs, lists, code fences)
+and reports MB/s and chunk counts for ``libs.rag.chunker`` next to the
+previous fixed 500/50 character window, which cut words and headings.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from libs.rag.chunker import MarkdownChunker  # noqa: E402
+
+
+def fixed_window(text: str, size: int = 500, overlap: int = 50) -> List[str]:
+    chunks: List[str] = []
+    start = 0
+    while start < len(text):
+        chunks.append(text[start : start + size])
+        start += size - overlap
+    return chunks
+
+
+def synthetic_note(size_kb: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    words = "знание note vector index заметка pipeline model context search тема".split()
+
+    def sentence() -> str:
+        n = rnd.randint(6, 22)
+        return " ".join(rnd.choice(words) for _ in range(n)).capitalize() + rnd.choice(".!?")
+
+    parts: List[str] = []
+    section = 0
+    while sum(len(p) for p in parts) < size_kb * 1024:
+        section += 1
+        parts.append(f"## Section {section}")
+        for _ in range(rnd.randint(1, 4)):
+            parts.append(" ".join(sentence() for _ in range(rnd.randint(2, 8))))
+        parts.append("\n".join(f"- {sentence()}" for _ in range(rnd.randint(2, 6))))
+        if section % 5 == 0:
+            parts.append("```python\n" + "\n".join(f"x{i} = {i}" for i in range(10)) + "\n```")
+    return "\n\n".join(parts)
+
+
+def bench(name: str, fn: Callable[[str], list], text: str, repeat: int) -> None:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = len(fn(text))
+        best = min(best, time.perf_counter() - started)
+    mb = len(text.encode("utf-8")) / 1e6
+    print(f"{name:<16} {mb / best:8.1f} MB/s  {best * 1000:8.1f} ms  {count:6d} chunks")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target-tokens", type=int, default=200)
+    args = parser.parse_args()
+
+    text = synthetic_note(args.size_kb)
+    chunker = MarkdownChunker(target_tokens=args.target_tokens)
+    print(f"note: {len(text)} chars, {len(text.encode('utf-8'))} bytes")
+    bench("fixed 500/50", fixed_window, text, args.repeat)
+    bench("markdown", chunker.split, text, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
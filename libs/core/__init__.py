@@ -4,6 +4,7 @@ from .settings import Settings, get_settings
 from .exceptions import DomainError, NotFoundError, ValidationError, Error
 from .models import User, Note, Chunk, SearchResult
 from .types import Result
+from .fingerprint import Fingerprint
 
 __all__ = [
     "Settings",
@@ -17,5 +18,6 @@ __all__ = [
     "Chunk",
     "SearchResult",
     "Result",
+    "Fingerprint",
 ]
 
@@ -0,0 +1,95 @@
+"""Text fingerprints for exact and near-duplicate detection.
+
+``sha256`` is taken over normalized text (Unicode NFKC, case-folded, collapsed
+whitespace), so trivial reformatting still matches exactly. ``simhash`` is a
+64-bit SimHash over word 3-shingles; texts within a small Hamming distance
+are near-duplicates (e.g. the same post with an extra line or emoji; on
+30–200 word posts such edits land within ~3–10 bits, unrelated texts 20+).
+The hash is stored as eight 8-bit bands: two hashes within distance 7 always
+share at least one band, which makes candidate lookup an indexed equality
+query.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import List, Tuple
+
+BANDS = 8
+_BAND_BITS = 64 // BANDS
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def _tokens(text: str) -> List[str]:
+    return _WORD_RE.findall(normalize_text(text))
+
+
+def simhash(tokens: List[str], shingle: int = 3) -> int:
+    """64-bit SimHash of word shingles (single words for very short texts)."""
+    if len(tokens) >= shingle:
+        grams = [" ".join(tokens[i : i + shingle]) for i in range(len(tokens) - shingle + 1)]
+    else:
+        grams = tokens
+    if not grams:
+        return 0
+    weights = [0] * 64
+    for gram in grams:
+        h = int.from_bytes(
+            hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & (2**64 - 1)).count("1")
+
+
+def to_signed64(value: int) -> int:
+    """Map an unsigned 64-bit value into BIGINT range."""
+    return value - 2**64 if value >= 2**63 else value
+
+
+def from_signed64(value: int) -> int:
+    return value + 2**64 if value < 0 else value
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    sha256: str
+    simhash: int
+    tokens: int
+
+    @classmethod
+    def of(cls, text: str) -> "Fingerprint":
+        tokens = _tokens(text)
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return cls(digest, simhash(tokens), len(tokens))
+
+    @property
+    def bands(self) -> Tuple[int, ...]:
+        mask = (1 << _BAND_BITS) - 1
+        return tuple(
+            self.simhash >> (i * _BAND_BITS) & mask for i in range(BANDS)
+        )
+
+
+__all__ = [
+    "BANDS",
+    "Fingerprint",
+    "from_signed64",
+    "hamming",
+    "normalize_text",
+    "simhash",
+    "to_signed64",
+]
@@ -5,6 +5,7 @@ from __future__ import annotations
 import os
 from functools import lru_cache
 from pathlib import Path
+from typing import Any, Dict
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -25,6 +26,43 @@ def _default_postgres_uri_from_env() -> str:
     return f"postgresql+psycopg://{user}:{password}@{host}:{port}/{db}"
 
 
+def _default_llm_routes() -> Dict[str, Dict[str, Any]]:
+    """Step -> model routing with latency budgets (see libs.llm.routing).
+
+    Flagship ``gpt-5`` is kept for extraction and grouping; cheap steps run on
+    smaller GPT-5 variants of the structured endpoint.
+    """
+    structured = "openai/gpt-5-structured"
+    return {
+        "insights": {
+            "model": f"{structured}@gpt-5",
+            "budget_ms": 60000,
+            "fallback": f"{structured}@gpt-5-mini",
+        },
+        "topics": {
+            "model": f"{structured}@gpt-5",
+            "budget_ms": 20000,
+            "fallback": f"{structured}@gpt-5-mini",
+        },
+        "autolink": {
+            "model": f"{structured}@gpt-5-mini",
+            "budget_ms": 5000,
+            "fallback": f"{structured}@gpt-5-nano",
+        },
+        "note": {
+            "model": f"{structured}@gpt-5-mini",
+            "budget_ms": 15000,
+            "fallback": f"{structured}@gpt-5-nano",
+        },
+        "moc": {
+            "model": f"{structured}@gpt-5-mini",
+            "budget_ms": 15000,
+            "fallback": f"{structured}@gpt-5-nano",
+        },
+        "answer": {"model": "openai/gpt-5-nano"},
+    }
+
+
 class Settings(BaseSettings):
     """Runtime settings for the application."""
 
@@ -50,6 +88,10 @@ class Settings(BaseSettings):
         default=False,
         description="Log raw Replicate request/response payloads at INFO level",
     )
+    llm_log_payload_max_chars: int = Field(
+        default=2000,
+        description="Cap on each logged payload after summarizing vectors and long text",
+    )
     llm_max_output_tokens: int = Field(
         default=2048,
         description="Max output tokens for structured models (gpt-5-structured)",
@@ -58,6 +100,122 @@ class Settings(BaseSettings):
         default=1024,
         description="Max completion tokens for nano models (gpt-5-nano)",
     )
+    llm_routes: Dict[str, Dict[str, Any]] = Field(
+        default_factory=_default_llm_routes,
+        description="Per-step model, latency budget (ms) and faster fallback; "
+        "JSON steps must route to openai/gpt-5-structured[@variant]",
+    )
+    # Replicate call scheduling (per process)
+    replicate_max_concurrency: int = Field(
+        default=8,
+        description="Max in-flight Replicate calls per process (<=0 disables the cap)",
+    )
+    replicate_reserved_interactive: int = Field(
+        default=2,
+        description="Slots out of the cap that ingest calls may never use",
+    )
+    llm_prices: Dict[str, Dict[str, float]] = Field(
+        default_factory=dict,
+        description="Per-model USD price per 1k tokens for cost accounting, e.g. "
+        '{"openai/gpt-5-structured": {"input": 0.00125, "output": 0.01}}',
+    )
+    # Autolinks ("See also")
+    autolink_engine: str = Field(
+        default="llm",
+        description="'llm' (one LLM call per insight, current batch only) or "
+        "'embedding' (vector similarity across the whole vault)",
+    )
+    autolink_threshold: float = Field(
+        default=0.75,
+        description="Min cosine similarity for embedding autolinks",
+    )
+    autolink_max_links: int = Field(default=5)
+    # Note rendering
+    note_renderer: str = Field(
+        default="template",
+        description="'template' (local, localized via config/i18n) or 'llm' "
+        "(one gpt-5-structured call per note)",
+    )
+    chunk_target_tokens: int = Field(
+        default=200, description="Target chunk size for embedding (~4 chars per token)"
+    )
+    chunk_overlap_sentences: int = Field(
+        default=1, description="Sentences repeated between consecutive chunks of a section"
+    )
+    ingest_dedup: bool = Field(
+        default=True,
+        description="Return previously created notes for exact/near-duplicate input text",
+    )
+    ingest_near_duplicate_distance: int = Field(
+        default=7,
+        description="Max SimHash Hamming distance (bits, up to 7) for near-duplicates",
+    )
+    moc_llm_summary: bool = Field(
+        default=False,
+        description="Also write an LLM overview of each ingest's topics to "
+        "00_MOC/topics_summary.md in the background (the MOC itself is rendered locally)",
+    )
+    ingest_concurrency: int = Field(
+        default=4,
+        description="Insights processed at once in each ingest stage (render, embed, index)",
+    )
+    ingest_long_document_tokens: int = Field(
+        default=3000,
+        description="Longer texts are split into segments whose insights are "
+        "extracted in parallel and merged in one topics/links step",
+    )
+    ingest_segment_tokens: int = Field(
+        default=1500, description="Target segment size for long-document ingest"
+    )
+    search_cache: bool = Field(
+        default=True,
+        description="Cache search results and answers until the index changes",
+    )
+    search_cache_size: int = Field(default=512, description="Max cached searches per process")
+    search_cache_ttl: int = Field(default=600, description="Seconds a cached search stays valid")
+    search_mmr_lambda: float = Field(
+        default=0.5,
+        description="MMR trade-off between relevance (1.0 = off) and diversity of hits",
+    )
+    search_fetch_factor: int = Field(
+        default=3, description="Candidates fetched per requested hit for MMR"
+    )
+    search_context_tokens: int = Field(
+        default=800, description="Token budget of the passages sent to the answer model"
+    )
+    search_neighbor_chunks: int = Field(
+        default=1,
+        description="Chunks before/after each hit added to the answer context (0 = off)",
+    )
+    search_timeout: float = Field(
+        default=30.0,
+        description="Deadline of a search request in seconds; a late answer is omitted (0 = none)",
+    )
+    ingest_timing_header: bool = Field(
+        default=False,
+        description="Return per-stage ingest timings in a Server-Timing response header",
+    )
+    # Background ingest worker (apps/worker)
+    worker_concurrency: int = Field(
+        default=2, description="Ingest jobs processed at once per worker process"
+    )
+    worker_poll_interval: float = Field(
+        default=1.0, description="Seconds to wait before polling an empty job queue"
+    )
+    ingest_job_stale_after: int = Field(
+        default=900,
+        description="Seconds without a heartbeat after which a running job is assumed lost and re-claimed",
+    )
+    ingest_job_max_attempts: int = Field(default=3)
+    ingest_job_retry_backoff: float = Field(
+        default=30.0,
+        description="Seconds before a failed job is retried; doubles with every attempt",
+    )
+    llm_stream_insights: bool = Field(
+        default=False,
+        description="Stream structured insights and store each note as soon as "
+        "the model emits it; topics and 'See also' links are filled in afterwards",
+    )
 
     model_config = SettingsConfigDict(
         env_file=".env",
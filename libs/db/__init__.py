@@ -2,6 +2,6 @@
 
 from . import models
 from .database import get_session, init_db
-from .repositories import UserRepo, NoteRepo, ChunkRepo
+from .repositories import UserRepo, NoteRepo, ChunkRepo, JobRepo, FingerprintRepo
 
-__all__ = ["models", "get_session", "init_db", "UserRepo", "NoteRepo", "ChunkRepo"]
+__all__ = ["models", "get_session", "init_db", "UserRepo", "NoteRepo", "ChunkRepo", "JobRepo", "FingerprintRepo"]
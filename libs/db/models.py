@@ -6,7 +6,7 @@ from datetime import datetime
 from uuid import uuid4
 from typing import Optional, List
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, BigInteger
+from sqlalchemy import JSON, DateTime, ForeignKey, Integer, String, BigInteger, Text
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -70,4 +70,64 @@ class Chunk(Base):
     note: Mapped[Note] = relationship(back_populates="chunks")
 
 
-__all__ = ["User", "Note", "Chunk"]
+class IngestJob(Base):
+    """Queued ingest request processed by ``apps/worker``."""
+
+    __tablename__ = "ingest_jobs"
+
+    id: Mapped[str] = mapped_column(
+        String, primary_key=True, default=lambda: str(uuid4())
+    )
+    user_id: Mapped[Optional[str]] = mapped_column(
+        ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    # queued -> running -> done | failed
+    status: Mapped[str] = mapped_column(String(16), default="queued", index=True)
+    payload: Mapped[dict] = mapped_column(JSON, default=dict)
+    result: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow
+    )
+    # A retried job is not claimed again before this time (backoff)
+    run_after: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+
+class TextFingerprint(Base):
+    """Fingerprint of ingested text and the notes it produced.
+
+    ``simhash`` is stored signed; ``band0``..``band7`` are its 8-bit bands
+    (see :mod:`libs.core.fingerprint`) for indexed near-duplicate lookup.
+    """
+
+    __tablename__ = "text_fingerprints"
+
+    id: Mapped[str] = mapped_column(
+        String, primary_key=True, default=lambda: str(uuid4())
+    )
+    sha256: Mapped[str] = mapped_column(String(64), index=True)
+    simhash: Mapped[int] = mapped_column(BigInteger)
+    band0: Mapped[int] = mapped_column(Integer, index=True)
+    band1: Mapped[int] = mapped_column(Integer, index=True)
+    band2: Mapped[int] = mapped_column(Integer, index=True)
+    band3: Mapped[int] = mapped_column(Integer, index=True)
+    band4: Mapped[int] = mapped_column(Integer, index=True)
+    band5: Mapped[int] = mapped_column(Integer, index=True)
+    band6: Mapped[int] = mapped_column(Integer, index=True)
+    band7: Mapped[int] = mapped_column(Integer, index=True)
+    note_ids: Mapped[list] = mapped_column(JSON, default=list)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow
+    )
+
+
+__all__ = ["User", "Note", "Chunk", "IngestJob", "TextFingerprint"]
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
 
-from sqlalchemy import select
+from sqlalchemy import and_, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from libs.core.fingerprint import Fingerprint, from_signed64, hamming, to_signed64
+
 from . import models
 
 
@@ -102,6 +106,21 @@ class NoteRepo:
         await self.session.flush()
         return note
 
+    async def bulk_create(self, rows: List[Dict[str, Any]]) -> List[str]:
+        """Insert many notes with one multi-row ``INSERT``.
+
+        Each row takes the same fields as :meth:`create`; missing ids are
+        generated client-side. Returns the ids in input order.
+        """
+        if not rows:
+            return []
+        values = [
+            {**row, "id": row.get("id") or str(uuid4()), "tags": row.get("tags") or []}
+            for row in rows
+        ]
+        await self.session.execute(insert(models.Note).values(values))
+        return [v["id"] for v in values]
+
     async def get(self, note_id: str) -> Optional[models.Note]:
         return await self.session.get(models.Note, note_id)
 
@@ -133,6 +152,27 @@ class ChunkRepo:
         await self.session.flush()
         return chunk
 
+    async def bulk_create(self, rows: List[Dict[str, Any]]) -> List[str]:
+        """Insert many chunks with one multi-row ``INSERT``.
+
+        Rows carry ``note_id``, ``pos`` and optionally ``anchor``; ids are
+        generated client-side and returned in input order, ready for
+        ``VectorIndex.upsert_chunks``.
+        """
+        if not rows:
+            return []
+        values = [
+            {
+                "id": str(uuid4()),
+                "note_id": row["note_id"],
+                "pos": row["pos"],
+                "anchor": row.get("anchor"),
+            }
+            for row in rows
+        ]
+        await self.session.execute(insert(models.Chunk).values(values))
+        return [v["id"] for v in values]
+
     async def get(self, chunk_id: str) -> Optional[models.Chunk]:
         return await self.session.get(models.Chunk, chunk_id)
 
@@ -152,5 +192,166 @@ class ChunkRepo:
         return chunk
 
 
-__all__ = ["UserRepo", "NoteRepo", "ChunkRepo"]
+class JobRepo:
+    """Queue operations for :class:`models.IngestJob`."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def create(
+        self, payload: Dict[str, Any], user_id: Optional[str] = None
+    ) -> models.IngestJob:
+        job = models.IngestJob(user_id=user_id, payload=payload, status="queued")
+        self.session.add(job)
+        await self.session.flush()
+        return job
+
+    async def get(self, job_id: str) -> Optional[models.IngestJob]:
+        return await self.session.get(models.IngestJob, job_id)
+
+    async def claim(
+        self,
+        *,
+        stale_after: timedelta | None = None,
+        max_attempts: int | None = None,
+    ) -> Optional[models.IngestJob]:
+        """Lock the oldest runnable job and mark it running.
+
+        Uses ``FOR UPDATE SKIP LOCKED`` so concurrent workers never claim the
+        same row. Queued jobs wait until their ``run_after``. Jobs left
+        ``running`` longer than ``stale_after`` (a worker died mid-job) are
+        claimed again, unless they already used ``max_attempts``: those are
+        marked failed so a job that crashes the worker is not retried forever.
+        """
+        J = models.IngestJob
+        now = datetime.utcnow()
+        runnable = and_(
+            J.status == "queued", or_(J.run_after.is_(None), J.run_after <= now)
+        )
+        if stale_after is not None:
+            stale = and_(J.status == "running", J.started_at < now - stale_after)
+            if max_attempts is not None:
+                await self.session.execute(
+                    update(J)
+                    .where(stale, J.attempts >= max_attempts)
+                    .values(
+                        status="failed",
+                        error="worker stopped during the last attempt",
+                        finished_at=now,
+                    )
+                )
+                stale = and_(stale, J.attempts < max_attempts)
+            runnable = or_(runnable, stale)
+        stmt = (
+            select(models.IngestJob)
+            .where(runnable)
+            .order_by(models.IngestJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        res = await self.session.execute(stmt)
+        job = res.scalar_one_or_none()
+        if job is None:
+            return None
+        job.status = "running"
+        job.attempts = (job.attempts or 0) + 1
+        job.started_at = datetime.utcnow()
+        await self.session.flush()
+        return job
+
+    async def heartbeat(self, job_id: str) -> None:
+        """Refresh ``started_at`` of a running job so it is not seen as stale."""
+        J = models.IngestJob
+        await self.session.execute(
+            update(J)
+            .where(J.id == job_id, J.status == "running")
+            .values(started_at=datetime.utcnow())
+        )
+
+    async def finish(
+        self,
+        job: models.IngestJob,
+        *,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        retry: bool = False,
+        retry_after: timedelta | None = None,
+    ) -> models.IngestJob:
+        """Record the outcome; ``retry`` puts a failed job back in the queue.
+
+        A retried job becomes claimable again after ``retry_after``.
+        """
+        if error is None:
+            job.status = "done"
+        else:
+            job.status = "queued" if retry else "failed"
+        job.result = result
+        job.error = error
+        now = datetime.utcnow()
+        job.finished_at = None if job.status == "queued" else now
+        job.run_after = None
+        if job.status == "queued" and retry_after:
+            job.run_after = now + retry_after
+        await self.session.flush()
+        return job
+
+
+class FingerprintRepo:
+    """Lookup and storage of :class:`models.TextFingerprint` rows."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def add(self, fp: Fingerprint, note_ids: List[str]) -> models.TextFingerprint:
+        row = models.TextFingerprint(
+            sha256=fp.sha256,
+            simhash=to_signed64(fp.simhash),
+            note_ids=list(note_ids),
+            **{f"band{i}": band for i, band in enumerate(fp.bands)},
+        )
+        self.session.add(row)
+        await self.session.flush()
+        return row
+
+    async def find_exact(self, fp: Fingerprint) -> Optional[models.TextFingerprint]:
+        stmt = (
+            select(models.TextFingerprint)
+            .where(models.TextFingerprint.sha256 == fp.sha256)
+            .order_by(models.TextFingerprint.created_at.desc())
+            .limit(1)
+        )
+        res = await self.session.execute(stmt)
+        return res.scalar_one_or_none()
+
+    async def find_near(
+        self, fp: Fingerprint, max_distance: int = 7, max_candidates: int = 500
+    ) -> Optional[models.TextFingerprint]:
+        """Closest stored fingerprint within ``max_distance`` bits, if any.
+
+        Band lookup only guarantees candidates up to distance 7. Rows sharing
+        a band are about 1/32 of the table, so only the ``max_candidates``
+        newest of them are compared; past ~16k fingerprints an older
+        near-duplicate can be missed (exact duplicates never are).
+        """
+        T = models.TextFingerprint
+        shares_band = or_(
+            *(getattr(T, f"band{i}") == band for i, band in enumerate(fp.bands))
+        )
+        stmt = (
+            select(T)
+            .where(shares_band)
+            .order_by(T.created_at.desc())
+            .limit(max_candidates)
+        )
+        res = await self.session.execute(stmt)
+        best: Optional[models.TextFingerprint] = None
+        best_dist = max_distance + 1
+        for row in res.scalars():
+            dist = hamming(fp.simhash, from_signed64(row.simhash))
+            if dist < best_dist:
+                best, best_dist = row, dist
+        return best
+
+
+__all__ = ["UserRepo", "NoteRepo", "ChunkRepo", "JobRepo", "FingerprintRepo"]
 
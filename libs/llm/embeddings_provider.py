@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Any, Dict, List, Tuple
 import logging
-import json
+import time
 
 import replicate
 from libs.core.settings import get_settings
+from libs.metrics import CallRecord, current_step, get_metrics
+from .scheduler import get_scheduler, priority_for_step
+from .singleflight import get_single_flight, payload_key
+from .payload_log import PayloadLogger
 
 
 class EmbeddingsProvider:
@@ -31,23 +35,54 @@ class EmbeddingsProvider:
         self.enable_cache = enable_cache
         self._cache: Dict[str, List[float]] = {}
         self.logger = logging.getLogger(__name__)
+        self._payload_log = PayloadLogger(
+            self.logger,
+            max_chars=int(getattr(settings, "llm_log_payload_max_chars", 2000)),
+        )
 
     def _embed_batch(self, texts: List[str]) -> List[List[float]]:
-        # Log full request for embeddings
-        try:
-            payload_json = json.dumps({"texts": texts}, ensure_ascii=False, default=str)
-        except Exception:
-            payload_json = repr({"texts": texts})
-        self.logger.debug("Replicate request | model=%s | input=%s", self.model, payload_json)
+        step = current_step("embed")
+        started = time.perf_counter()
+        queue_ms = 0.0
+        failed = False
+        shared = False
+        payload = {"texts": texts}
+        self._payload_log.log(
+            logging.DEBUG, "Replicate request | model=%s | input=%s", self.model, payload
+        )
 
-        output = replicate.run(self.model, input={"texts": texts})
+        def run() -> Tuple[Any, float]:
+            with get_scheduler().slot(priority_for_step(step)) as waited:
+                return replicate.run(self.model, input=payload), waited
 
-        # Log raw response (as-is) for embeddings
         try:
-            raw_json = json.dumps(output, ensure_ascii=False, default=str)
+            (output, queue_ms), shared = get_single_flight().do(
+                payload_key(self.model, payload), run
+            )
+            if shared:
+                queue_ms = 0.0
         except Exception:
-            raw_json = repr(output)
-        self.logger.debug("Replicate raw response | model=%s | raw=%s", self.model, raw_json)
+            failed = True
+            raise
+        finally:
+            get_metrics().record_call(
+                CallRecord(
+                    kind="embedding",
+                    model=self.model,
+                    step=step,
+                    latency_ms=(time.perf_counter() - started) * 1000,
+                    input_chars=sum(len(t) for t in texts),
+                    items=len(texts),
+                    error=failed,
+                    queue_ms=queue_ms,
+                    shared=shared,
+                )
+            )
+
+        # Vectors are logged as dim/head summaries, never as full float lists
+        self._payload_log.log(
+            logging.DEBUG, "Replicate raw response | model=%s | raw=%s", self.model, output
+        )
         if isinstance(output, dict) and "embeddings" in output:
             embeddings = output["embeddings"]
         else:
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+"""Incremental parsing of streamed JSON model output."""
+
+import json
+import logging
+from typing import Any, Iterable, Iterator, List
+
+
+class ArrayItemParser:
+    """Extract objects of a top-level array as soon as each one closes.
+
+    Feed raw text chunks (as streamed by the model) with :meth:`feed`; every
+    call returns the elements of ``{"<key>": [ {...}, {...} ]}`` completed by
+    that chunk. Text before the first ``{`` (e.g. a Markdown code fence) is
+    ignored, and elements that are not objects are skipped.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_string: str | None = None
+        self._array_depth: int | None = None
+        self._capture: List[str] | None = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        items: List[Any] = []
+        for ch in chunk:
+            if self.done:
+                break
+            if self._capture is not None:
+                self._capture.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = "".join(self._string)
+                elif self._depth == 1:
+                    self._string.append(ch)
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch in "{[":
+                if (
+                    ch == "["
+                    and self._depth == 1
+                    and self._array_depth is None
+                    and self._last_string == self.key
+                ):
+                    self._array_depth = self._depth + 1
+                elif (
+                    ch == "{"
+                    and self._capture is None
+                    and self._depth == self._array_depth
+                ):
+                    self._capture = [ch]
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._capture is not None and self._depth == self._array_depth:
+                    raw = "".join(self._capture)
+                    self._capture = None
+                    try:
+                        items.append(json.loads(raw))
+                    except ValueError:
+                        # The rest of the array is still usable; make the loss visible
+                        logging.getLogger("llm").warning(
+                            "stream_array_item_invalid",
+                            extra={"key": self.key, "preview": raw[:200]},
+                        )
+                elif self._array_depth is not None and self._depth < self._array_depth:
+                    self.done = True
+        return items
+
+
+def iter_array_items(chunks: Iterable[str], key: str) -> Iterator[Any]:
+    """Yield elements of the ``key`` array from a stream of text chunks."""
+    parser = ArrayItemParser(key)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+
+__all__ = ["ArrayItemParser", "iter_array_items"]
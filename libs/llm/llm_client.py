@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
 
 
 class LLMClient(ABC):
@@ -11,6 +11,13 @@ class LLMClient(ABC):
     def generate_structured_notes(self, text: str) -> List[Dict[str, Any]]:
         """Return list of structured insights extracted from raw text."""
 
+    def iter_structured_notes(self, text: str) -> Iterator[Dict[str, Any]]:
+        """Yield structured insights as soon as each one is available.
+
+        Clients without streaming support yield the full list at once.
+        """
+        yield from self.generate_structured_notes(text)
+
     @abstractmethod
     def group_topics(self, insights: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Group insights into topics structure."""
@@ -32,3 +39,12 @@ class LLMClient(ABC):
     @abstractmethod
     def answer_from_context(self, query: str, fragments: List[Dict[str, str]]) -> str:
         """Answer a query using provided context fragments."""
+
+    def stream_answer_from_context(
+        self, query: str, fragments: List[Dict[str, str]]
+    ) -> Iterator[str]:
+        """Yield the answer in chunks as it is generated.
+
+        Clients without native streaming yield the full answer at once.
+        """
+        yield self.answer_from_context(query, fragments)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+"""Lazy, size-capped logging of Replicate request/response payloads.
+
+Payloads (prompts, model output, embedding batches) can be large, and most of
+the time the log level drops them anyway. :class:`PayloadLogger` checks the
+level first and hands enabled records to a background thread, which
+summarizes the payload (vectors become ``<vector dim=…>``, long strings and
+lists are truncated) and serializes it off the request path.
+"""
+
+import json
+import logging
+import queue
+import threading
+from numbers import Number
+from typing import Any, Optional
+
+_MAX_QUEUE = 1000
+
+
+def summarize_payload(obj: Any, *, max_str: int = 500, max_items: int = 20) -> Any:
+    """Return a compact, JSON-serializable view of ``obj``."""
+    if isinstance(obj, str):
+        if len(obj) > max_str:
+            return f"{obj[:max_str]}…(+{len(obj) - max_str} chars)"
+        return obj
+    if obj is None or isinstance(obj, (bool, Number)):
+        return obj
+    if isinstance(obj, dict):
+        return {
+            str(k): summarize_payload(v, max_str=max_str, max_items=max_items)
+            for k, v in obj.items()
+        }
+    if isinstance(obj, (list, tuple)):
+        if len(obj) > 8 and all(
+            isinstance(x, Number) and not isinstance(x, bool) for x in obj
+        ):
+            head = ", ".join(f"{float(x):.4f}" for x in obj[:3])
+            return f"<vector dim={len(obj)} head=[{head}, …]>"
+        items = [
+            summarize_payload(x, max_str=max_str, max_items=max_items)
+            for x in obj[:max_items]
+        ]
+        if len(obj) > max_items:
+            items.append(f"…(+{len(obj) - max_items} items)")
+        return items
+    return summarize_payload(repr(obj), max_str=max_str, max_items=max_items)
+
+
+class _Payload:
+    """Deferred ``%s`` argument: summarized and serialized only when rendered."""
+
+    __slots__ = ("obj", "max_chars")
+
+    def __init__(self, obj: Any, max_chars: int) -> None:
+        # Shallow copy so later in-place tweaks (e.g. a retry bumping the
+        # token cap) do not leak into the logged request.
+        self.obj = dict(obj) if isinstance(obj, dict) else obj
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        try:
+            text = json.dumps(
+                summarize_payload(self.obj), ensure_ascii=False, default=str
+            )
+        except Exception:
+            text = repr(self.obj)
+        if len(text) > self.max_chars:
+            text = f"{text[: self.max_chars]}…(+{len(text) - self.max_chars} chars)"
+        return text
+
+
+class _Writer:
+    """Daemon thread that emits queued payload records."""
+
+    def __init__(self) -> None:
+        self.queue: "queue.Queue[tuple]" = queue.Queue(maxsize=_MAX_QUEUE)
+        self.dropped = 0
+        self._thread = threading.Thread(
+            target=self._run, name="payload-log", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            logger, level, msg, args = self.queue.get()
+            try:
+                logger.log(level, msg, *args)
+            except Exception:  # pragma: no cover - logging must never raise
+                pass
+            finally:
+                self.queue.task_done()
+
+    def submit(self, logger: logging.Logger, level: int, msg: str, args: tuple) -> None:
+        try:
+            self.queue.put_nowait((logger, level, msg, args))
+        except queue.Full:
+            self.dropped += 1
+
+
+_writer: Optional[_Writer] = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer() -> _Writer:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = _Writer()
+    return _writer
+
+
+def flush_payload_logs() -> None:
+    """Block until every queued payload record has been emitted."""
+    if _writer is not None:
+        _writer.queue.join()
+
+
+class PayloadLogger:
+    """Log payload-carrying messages lazily on a background thread.
+
+    Positional arguments that are not plain scalars are treated as payloads:
+    they are summarized and capped at ``max_chars`` once serialized.
+    """
+
+    def __init__(self, logger: logging.Logger, *, max_chars: int = 2000) -> None:
+        self.logger = logger
+        self.max_chars = max_chars
+
+    def log(self, level: int, msg: str, *args: Any) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        wrapped = tuple(
+            a
+            if a is None or isinstance(a, (str, bool, Number))
+            else _Payload(a, self.max_chars)
+            for a in args
+        )
+        _get_writer().submit(self.logger, level, msg, wrapped)
+
+
+__all__ = ["PayloadLogger", "flush_payload_logs", "summarize_payload"]
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+"""Process-wide registry of LLM prompt files.
+
+Prompt files (``config/prompts*.yaml``) are parsed once and cached; a file is
+re-read only when its modification time changes. Loaded files can be validated
+against the sections and ``str.format`` placeholders the client relies on.
+"""
+
+import logging
+import threading
+from functools import lru_cache
+from pathlib import Path
+from string import Formatter
+from typing import Dict, List, Tuple
+
+import yaml
+
+
+Prompts = Dict[str, Dict[str, str]]
+
+# Sections used by ReplicateLLMClient and the placeholders each user template
+# may reference. System prompts are never formatted, so braces there are literal.
+PROMPT_PLACEHOLDERS: Dict[str, set[str]] = {
+    "insights": {"raw_text"},
+    "topics": {"insights"},
+    "note": {
+        "title",
+        "summary",
+        "bullets",
+        "tags",
+        "url",
+        "author",
+        "dt",
+        "topic_id",
+        "candidates",
+    },
+    "moc": {"topics_json"},
+    "autolink": {"title", "summary", "candidates"},
+    "answer": {"query", "context"},
+}
+
+
+def validate_prompts(prompts: Prompts) -> List[str]:
+    """Return a list of problems found in a prompts mapping (empty if valid)."""
+
+    errors: List[str] = []
+    if not isinstance(prompts, dict):
+        return ["prompts file must contain a mapping of sections"]
+    for section, allowed in PROMPT_PLACEHOLDERS.items():
+        entry = prompts.get(section)
+        if not isinstance(entry, dict):
+            errors.append(f"missing section '{section}'")
+            continue
+        for key in ("system", "user"):
+            if not isinstance(entry.get(key), str):
+                errors.append(f"missing prompt '{section}.{key}'")
+        template = entry.get("user")
+        if not isinstance(template, str):
+            continue
+        try:
+            fields = {
+                name.split(".", 1)[0].split("[", 1)[0]
+                for _, name, _, _ in Formatter().parse(template)
+                if name is not None
+            }
+        except ValueError as exc:
+            errors.append(f"'{section}.user' is not a valid format string: {exc}")
+            continue
+        unknown = sorted(f for f in fields if f not in allowed)
+        if unknown:
+            errors.append(
+                f"'{section}.user' uses unknown placeholders: {', '.join(unknown)}"
+            )
+    return errors
+
+
+class PromptRegistry:
+    """Cache of parsed prompt files with per-language lookups."""
+
+    def __init__(self, base_dir: Path | None = None) -> None:
+        if base_dir is None:
+            # libs/llm/prompts.py -> project_root/config
+            base_dir = Path(__file__).resolve().parents[2] / "config"
+        self.base_dir = Path(base_dir)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # path -> (mtime_ns, prompts, validation errors)
+        self._files: Dict[Path, Tuple[int, Prompts, List[str]]] = {}
+
+    def _entry(self, path: Path) -> Tuple[int, Prompts, List[str]]:
+        path = Path(path)
+        mtime = path.stat().st_mtime_ns  # raises FileNotFoundError
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached
+        with self._lock:
+            cached = self._files.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached
+            with path.open("r", encoding="utf-8") as fh:
+                prompts = yaml.safe_load(fh) or {}
+            errors = validate_prompts(prompts)
+            if errors:
+                self.logger.warning(
+                    "Prompts file %s is invalid: %s", str(path), "; ".join(errors)
+                )
+            else:
+                self.logger.debug("Prompts loaded from: %s", str(path))
+            entry = (mtime, prompts, errors)
+            self._files[path] = entry
+            return entry
+
+    def load(self, path: Path) -> Prompts:
+        """Return parsed prompts from ``path``, re-reading it only if it changed.
+
+        Raises ``FileNotFoundError`` or ``yaml.YAMLError`` like a plain load.
+        """
+        return self._entry(path)[1]
+
+    def errors(self, path: Path) -> List[str]:
+        return list(self._entry(path)[2])
+
+    def preload(self) -> None:
+        """Parse and validate every ``prompts*.yaml`` in the base directory."""
+        for path in sorted(self.base_dir.glob("prompts*.yaml")):
+            try:
+                self._entry(path)
+            except (OSError, yaml.YAMLError) as exc:
+                self.logger.warning("Failed to load prompts file %s: %s", str(path), exc)
+
+    def for_language(self, lang: str) -> Tuple[Path, Prompts]:
+        """Return the first valid prompts file for ``lang``.
+
+        Falls back to ``prompts.yaml`` and then ``prompts.en.yaml``.
+        """
+        lang = (lang or "en").lower()
+        candidates = [
+            self.base_dir / f"prompts.{lang}.yaml",
+            self.base_dir / "prompts.yaml",
+            self.base_dir / "prompts.en.yaml",
+        ]
+        for path in candidates:
+            try:
+                _, prompts, errors = self._entry(path)
+            except (OSError, yaml.YAMLError):
+                continue
+            if not errors:
+                return path, prompts
+        raise FileNotFoundError(f"No valid prompts file for '{lang}' in {self.base_dir}")
+
+
+@lru_cache
+def get_prompt_registry() -> PromptRegistry:
+    """Return the process-wide prompt registry."""
+    return PromptRegistry()
+
+
+__all__ = [
+    "PromptRegistry",
+    "PROMPT_PLACEHOLDERS",
+    "get_prompt_registry",
+    "validate_prompts",
+]
@@ -3,19 +3,35 @@ from __future__ import annotations
 import json
 from pathlib import Path
 import logging
-from typing import Any, Dict, Iterable, List, Union
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
 
 import replicate
 import yaml
 
 from libs.core.settings import Settings, get_settings
+from libs.metrics import CallRecord, current_step, get_metrics, llm_step
 from .llm_client import LLMClient
+from .prompts import Prompts, get_prompt_registry
+from .scheduler import Priority, get_scheduler, priority_for_step
+from .routing import get_router
+from .json_stream import ArrayItemParser
+from .singleflight import get_single_flight, payload_key
+from .payload_log import PayloadLogger
 
 
 class LLMClientError(Exception):
     """Raised when interaction with LLM fails."""
 
 
+def _message_chars(messages: List[Dict[str, Any]]) -> int:
+    return sum(
+        len(m.get("content") or "")
+        for m in messages
+        if isinstance(m, dict) and isinstance(m.get("content"), str)
+    )
+
+
 class ReplicateLLMClient(LLMClient):
     """LLM client powered by Replicate API."""
 
@@ -24,6 +40,7 @@ class ReplicateLLMClient(LLMClient):
         settings: Settings | None = None,
         timeout: float = 30.0,
         prompts_path: str | Path | None = None,
+        prompts: Prompts | None = None,
     ) -> None:
         self.settings = settings or get_settings()
         self.timeout = timeout  # reserved for future granular timeouts
@@ -32,6 +49,10 @@ class ReplicateLLMClient(LLMClient):
         # LLM diagnostics and limits (configurable via Settings / env)
         # Fall back to sensible defaults if custom Settings class is used in tests
         self._log_payloads: bool = bool(getattr(self.settings, "llm_log_payloads", False))
+        self._payload_log = PayloadLogger(
+            self.logger,
+            max_chars=int(getattr(self.settings, "llm_log_payload_max_chars", 2000)),
+        )
         self._max_output_tokens: int = int(
             getattr(self.settings, "llm_max_output_tokens", 2048)
         )
@@ -44,11 +65,12 @@ class ReplicateLLMClient(LLMClient):
             if prompts_path is not None
             else Path("/app/config/prompts.yaml")
         )
+        if prompts is not None:
+            # Already parsed (e.g. by the prompt registry); nothing to read
+            self.prompts: Prompts = prompts
+            return
         try:
-            with self.prompts_path.open("r", encoding="utf-8") as fh:
-                self.prompts: Dict[str, Dict[str, str]] = yaml.safe_load(fh) or {}
-            # Log which prompts file is loaded for transparency
-            self.logger.debug("Prompts loaded from: %s", str(self.prompts_path))
+            self.prompts = get_prompt_registry().load(self.prompts_path)
         except FileNotFoundError as exc:
             raise LLMClientError(
                 f"Prompts file not found: {self.prompts_path}"
@@ -123,107 +145,135 @@ class ReplicateLLMClient(LLMClient):
                     f"Failed to parse JSON from Replicate output. Preview: {preview}"
                 ) from exc
 
-    def _call(self, model: str, messages: List[Dict[str, str]]) -> str:
-        """Call Replicate model using the official client per guide and schemas.
+    def _build_input(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        variant: str | None = None,
+    ) -> tuple[Dict[str, Any], str]:
+        """Map chat-style messages into a schema-compliant Replicate input.
 
         - For `openai/gpt-5-structured`, follow docs/gpt-5-structured-input-schema.json:
           use `instructions` (system) + `input_item_list` (user) and `response_format`
           for JSON schemas, along with `max_output_tokens`.
         - For `openai/gpt-5-nano`, follow docs/gpt-5-nano-input-schema.json:
           use chat `messages` (or `prompt`) and `max_completion_tokens`.
-        """
-        try:
-            input_payload: Dict[str, Any] = {
-                "reasoning_effort": "minimal",
-                "verbosity": "low",
-            }
-
-            # Merge any extra input passed via a sentinel element at the tail
-            extra_input: Dict[str, Any] = {}
-            if messages and isinstance(messages[-1], dict) and "_extra_input" in messages[-1]:
-                sentinel = messages.pop()  # type: ignore[assignment]
-                try:
-                    extra_input = dict(sentinel.get("_extra_input") or {})
-                except Exception:
-                    extra_input = {}
-
-            # Structured vs Nano mapping strictly per schemas in docs
-            is_structured = model.endswith("gpt-5-structured")
-
-            if is_structured:
-                # docs/gpt-5-structured-input-schema.json
-                # Map chat-style messages into schema-compliant fields:
-                # - Combine system messages into `instructions`
-                # - Convert user messages into `input_item_list` with input_text content
-                system_parts = [
-                    (m.get("content") or "")
-                    for m in messages
-                    if isinstance(m, dict) and m.get("role") == "system"
-                ]
-                user_parts = [
-                    (m.get("content") or "")
-                    for m in messages
-                    if isinstance(m, dict) and m.get("role") == "user"
-                ]
-
-                instructions = "\n\n".join([p for p in system_parts if p])
-                if instructions:
-                    input_payload["instructions"] = instructions
-
-                input_item_list = []
-                for part in [p for p in user_parts if p]:
-                    input_item_list.append(
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "input_text",
-                                    "text": part,
-                                }
-                            ],
-                        }
-                    )
-                if input_item_list:
-                    input_payload["input_item_list"] = input_item_list
 
-                # Be explicit about model family selection for structured
-                input_payload.setdefault("model", "gpt-5")
+        ``variant`` selects the GPT-5 family member run by the structured
+        endpoint (``gpt-5``, ``gpt-5-mini``, ``gpt-5-nano``).
 
-                # Tokens control per schema
-                tokens_key = "max_output_tokens"
-                input_payload[tokens_key] = self._max_output_tokens
+        Returns the input payload and the name of its token cap key.
+        """
+        input_payload: Dict[str, Any] = {
+            "reasoning_effort": "minimal",
+            "verbosity": "low",
+        }
+
+        # Merge any extra input passed via a sentinel element at the tail
+        extra_input: Dict[str, Any] = {}
+        if messages and isinstance(messages[-1], dict) and "_extra_input" in messages[-1]:
+            sentinel = messages.pop()  # type: ignore[assignment]
+            try:
+                extra_input = dict(sentinel.get("_extra_input") or {})
+            except Exception:
+                extra_input = {}
+
+        # Structured vs Nano mapping strictly per schemas in docs
+        is_structured = model.endswith("gpt-5-structured")
+
+        if is_structured:
+            # docs/gpt-5-structured-input-schema.json
+            # Map chat-style messages into schema-compliant fields:
+            # - Combine system messages into `instructions`
+            # - Convert user messages into `input_item_list` with input_text content
+            system_parts = [
+                (m.get("content") or "")
+                for m in messages
+                if isinstance(m, dict) and m.get("role") == "system"
+            ]
+            user_parts = [
+                (m.get("content") or "")
+                for m in messages
+                if isinstance(m, dict) and m.get("role") == "user"
+            ]
+
+            instructions = "\n\n".join([p for p in system_parts if p])
+            if instructions:
+                input_payload["instructions"] = instructions
+
+            input_item_list = []
+            for part in [p for p in user_parts if p]:
+                input_item_list.append(
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "input_text",
+                                "text": part,
+                            }
+                        ],
+                    }
+                )
+            if input_item_list:
+                input_payload["input_item_list"] = input_item_list
+
+            # Be explicit about model family selection for structured
+            input_payload["model"] = variant or "gpt-5"
+
+            # Tokens control per schema
+            tokens_key = "max_output_tokens"
+            input_payload[tokens_key] = self._max_output_tokens
+        else:
+            # docs/gpt-5-nano-input-schema.json
+            # Prefer passing chat messages, fallback to concatenated prompt
+            has_roles = bool(
+                isinstance(messages, list)
+                and messages
+                and isinstance(messages[0], dict)
+                and "role" in messages[0]
+            )
+            if has_roles:
+                input_payload["messages"] = messages
             else:
-                # docs/gpt-5-nano-input-schema.json
-                # Prefer passing chat messages, fallback to concatenated prompt
-                has_roles = bool(
-                    isinstance(messages, list)
-                    and messages
-                    and isinstance(messages[0], dict)
-                    and "role" in messages[0]
+                input_payload["prompt"] = "\n\n".join(
+                    [m.get("content", "") for m in messages if isinstance(m, dict)]
                 )
-                if has_roles:
-                    input_payload["messages"] = messages
-                else:
-                    input_payload["prompt"] = "\n\n".join(
-                        [m.get("content", "") for m in messages if isinstance(m, dict)]
-                    )
 
-                tokens_key = "max_completion_tokens"
-                input_payload[tokens_key] = self._max_completion_tokens
+            tokens_key = "max_completion_tokens"
+            input_payload[tokens_key] = self._max_completion_tokens
+            # Structured outputs are not part of the nano schema
+            extra_input.pop("response_format", None)
 
-            # Merge any extras (e.g., response_format.json_schema) as recommended by guide
-            if extra_input:
-                input_payload.update(extra_input)
+        # Merge any extras (e.g., response_format.json_schema) as recommended by guide
+        if extra_input:
+            input_payload.update(extra_input)
+        return input_payload, tokens_key
 
-            # Log full request payload for debugging (standard format)
-            try:
-                payload_json = json.dumps(input_payload, ensure_ascii=False, default=str)
-            except Exception:
-                payload_json = repr(input_payload)
+    def _call(self, model: str, messages: List[Dict[str, str]]) -> str:
+        """Call Replicate model using the official client per guide and schemas."""
+        step = current_step("llm")
+        priority = priority_for_step(step)
+        target = get_router().select(step, model)
+        model = target.model
+        started = time.perf_counter()
+        queue_ms = 0.0
+        retries = 0
+        failed = False
+        shared = False
+        text = ""
+        try:
+            input_payload, tokens_key = self._build_input(
+                model, messages, variant=target.variant
+            )
+
+            # Request payload; serialized off-thread only if the level is enabled
             _lvl = logging.INFO if self._log_payloads else logging.DEBUG
-            self.logger.log(_lvl, "Replicate request | model=%s | input=%s", model, payload_json)
+            self._payload_log.log(
+                _lvl, "Replicate request | model=%s | input=%s", model, input_payload
+            )
 
-            out = replicate.run(model, input=input_payload)
+            out, waited, shared = self._run_shared(model, input_payload, priority)
+            queue_ms += waited
 
             # Capture raw response before joining for logging purposes
             # Normalize output into text while keeping a raw view for logging.
@@ -264,11 +314,9 @@ class ReplicateLLMClient(LLMClient):
                     text = "".join(str(c) for c in chunks)
 
             # Log raw response (as-is chunks) for debugging
-            try:
-                raw_json = json.dumps(raw_view, ensure_ascii=False, default=str)
-            except Exception:
-                raw_json = repr(raw_view)
-            self.logger.log(_lvl, "Replicate raw response | model=%s | raw=%s", model, raw_json)
+            self._payload_log.log(
+                _lvl, "Replicate raw response | model=%s | raw=%s", model, raw_view
+            )
 
             if not text.strip() and tokens_key == "max_output_tokens":
                 # Proactive single retry with higher cap for structured outputs
@@ -285,7 +333,11 @@ class ReplicateLLMClient(LLMClient):
                         prev,
                     )
                     input_payload[tokens_key] = new_cap
-                    _retry_out = replicate.run(model, input=input_payload)
+                    retries += 1
+                    _retry_out, waited, _ = self._run_shared(
+                        model, input_payload, priority
+                    )
+                    queue_ms += waited
                     raw_view = _retry_out
                     if _retry_out is None:
                         text = ""
@@ -318,24 +370,106 @@ class ReplicateLLMClient(LLMClient):
                         except Exception:
                             text = "".join(str(c) for c in _retry_chunks)
 
-                    try:
-                        raw_json_retry = json.dumps(raw_view, ensure_ascii=False, default=str)
-                    except Exception:
-                        raw_json_retry = repr(raw_view)
-                    self.logger.log(
+                    self._payload_log.log(
                         _lvl,
                         "Replicate raw response (retry) | model=%s | raw=%s",
                         model,
-                        raw_json_retry,
+                        raw_view,
                     )
 
             return text
         except Exception as exc:
+            failed = True
             # Ensure failure is visible in logs with stack trace
             self.logger.exception("Replicate request failed: %s", exc)
             raise LLMClientError(f"Replicate request failed: {exc}") from exc
+        finally:
+            latency_ms = (time.perf_counter() - started) * 1000
+            if not failed:
+                get_router().observe(step, target, latency_ms - queue_ms)
+            get_metrics().record_call(
+                CallRecord(
+                    kind="llm",
+                    model=str(target),
+                    step=step,
+                    latency_ms=latency_ms,
+                    input_chars=_message_chars(messages),
+                    output_chars=len(text),
+                    retries=retries,
+                    error=failed,
+                    queue_ms=queue_ms,
+                    shared=shared,
+                )
+            )
 
-    def generate_structured_notes(self, text: str) -> List[Dict[str, Any]]:
+    def _run_shared(
+        self, model: str, input_payload: Dict[str, Any], priority: Priority
+    ) -> Tuple[Any, float, bool]:
+        """Run ``replicate.run`` once for concurrent identical payloads.
+
+        Returns ``(output, queue_ms, shared)``. Streamed output is materialized
+        so every caller sharing the flight can read it.
+        """
+
+        def run() -> Tuple[Any, float]:
+            with get_scheduler().slot(priority) as waited:
+                out = replicate.run(model, input=input_payload)
+                if out is not None and not isinstance(out, (str, dict)):
+                    out = list(out)
+            return out, waited
+
+        (out, waited), shared = get_single_flight().do(
+            payload_key(model, input_payload), run
+        )
+        return out, (0.0 if shared else waited), shared
+
+    def _stream(
+        self, model: str, messages: List[Dict[str, str]], step: str = "llm"
+    ) -> Iterator[str]:
+        """Stream text chunks from Replicate as the model produces them.
+
+        ``step`` is passed explicitly because the generator body runs lazily,
+        outside of any ``llm_step`` context active at creation time.
+        """
+        target = get_router().select(step, model)
+        model = target.model
+        input_payload, _ = self._build_input(model, messages, variant=target.variant)
+        _lvl = logging.INFO if self._log_payloads else logging.DEBUG
+        self.logger.log(_lvl, "Replicate stream request | model=%s", str(target))
+        started = time.perf_counter()
+        queue_ms = 0.0
+        output_chars = 0
+        failed = False
+        try:
+            # The slot is held until the stream is exhausted or closed
+            with get_scheduler().slot(priority_for_step(step)) as queue_ms:
+                for event in replicate.stream(model, input=input_payload):
+                    chunk = str(event)
+                    if chunk:
+                        output_chars += len(chunk)
+                        yield chunk
+        except Exception as exc:
+            failed = True
+            self.logger.exception("Replicate stream failed: %s", exc)
+            raise LLMClientError(f"Replicate stream failed: {exc}") from exc
+        finally:
+            latency_ms = (time.perf_counter() - started) * 1000
+            if not failed:
+                get_router().observe(step, target, latency_ms - queue_ms)
+            get_metrics().record_call(
+                CallRecord(
+                    kind="llm",
+                    model=str(target),
+                    step=step,
+                    latency_ms=latency_ms,
+                    input_chars=_message_chars(messages),
+                    output_chars=output_chars,
+                    error=failed,
+                    queue_ms=queue_ms,
+                )
+            )
+
+    def _insights_messages(self, text: str) -> List[Dict[str, Any]]:
         user_prompt = self._prompt("insights", "user").format(raw_text=text)
         # Ask for strict JSON per docs using response_format.json_schema merged via _extra_input
         schema = {
@@ -362,28 +496,62 @@ class ReplicateLLMClient(LLMClient):
             "required": ["insights"],
             "additionalProperties": False,
         }
-        content = self._call(
-            "openai/gpt-5-structured",
-            [
-                {"role": "system", "content": self._prompt("insights", "system")},
-                {"role": "user", "content": user_prompt},
-                {
-                    "_extra_input": {
-                        "response_format": {
-                            "type": "json_schema",
-                            "json_schema": {
-                                "name": "insights_extraction",
-                                "strict": True,
-                                "schema": schema,
-                            },
-                        }
+        return [
+            {"role": "system", "content": self._prompt("insights", "system")},
+            {"role": "user", "content": user_prompt},
+            {
+                "_extra_input": {
+                    "response_format": {
+                        "type": "json_schema",
+                        "json_schema": {
+                            "name": "insights_extraction",
+                            "strict": True,
+                            "schema": schema,
+                        },
                     }
-                },
-            ],
-        )
+                }
+            },
+        ]
+
+    def generate_structured_notes(self, text: str) -> List[Dict[str, Any]]:
+        with llm_step("insights"):
+            content = self._call(
+                "openai/gpt-5-structured", self._insights_messages(text)
+            )
         data = self._parse_json(content)
         return data.get("insights", [])
 
+    def iter_structured_notes(self, text: str) -> Iterator[Dict[str, Any]]:
+        """Yield insights one by one while the model is still generating.
+
+        Falls back to :meth:`generate_structured_notes` if streaming fails
+        before the first insight or the streamed text has no parseable array.
+        """
+        parser = ArrayItemParser("insights")
+        raw: List[str] = []
+        yielded = 0
+        try:
+            for chunk in self._stream(
+                "openai/gpt-5-structured", self._insights_messages(text), step="insights"
+            ):
+                raw.append(chunk)
+                for item in parser.feed(chunk):
+                    if isinstance(item, dict):
+                        yielded += 1
+                        yield item
+        except LLMClientError:
+            if yielded:
+                raise
+            self.logger.warning("Insights streaming failed; falling back to a single call")
+            yield from self.generate_structured_notes(text)
+            return
+        if not yielded:
+            joined = "".join(raw)
+            if joined.strip():
+                yield from self._parse_json(joined).get("insights", [])
+            else:
+                yield from self.generate_structured_notes(text)
+
     def group_topics(self, insights: List[Dict[str, Any]]) -> Dict[str, Any]:
         lines = [
             f"{i.get('id')}\t{i.get('title')}\t{i.get('summary')}" for i in insights
@@ -416,25 +584,26 @@ class ReplicateLLMClient(LLMClient):
             "required": ["topics"],
             "additionalProperties": False,
         }
-        content = self._call(
-            "openai/gpt-5-structured",
-            [
-                {"role": "system", "content": self._prompt("topics", "system")},
-                {"role": "user", "content": user_prompt},
-                {
-                    "_extra_input": {
-                        "response_format": {
-                            "type": "json_schema",
-                            "json_schema": {
-                                "name": "topics_grouping",
-                                "strict": True,
-                                "schema": schema,
-                            },
+        with llm_step("topics"):
+            content = self._call(
+                "openai/gpt-5-structured",
+                [
+                    {"role": "system", "content": self._prompt("topics", "system")},
+                    {"role": "user", "content": user_prompt},
+                    {
+                        "_extra_input": {
+                            "response_format": {
+                                "type": "json_schema",
+                                "json_schema": {
+                                    "name": "topics_grouping",
+                                    "strict": True,
+                                    "schema": schema,
+                                },
+                            }
                         }
-                    }
-                },
-            ],
-        )
+                    },
+                ],
+            )
         return self._parse_json(content)
 
     def render_note_markdown(self, insight: Dict[str, Any]) -> str:
@@ -451,23 +620,25 @@ class ReplicateLLMClient(LLMClient):
                 insight.get("see_also_candidates", []), ensure_ascii=False
             ),
         )
-        return self._call(
-            "openai/gpt-5-structured",
-            [
-                {"role": "system", "content": self._prompt("note", "system")},
-                {"role": "user", "content": user_prompt},
-            ],
-        )
+        with llm_step("note"):
+            return self._call(
+                "openai/gpt-5-structured",
+                [
+                    {"role": "system", "content": self._prompt("note", "system")},
+                    {"role": "user", "content": user_prompt},
+                ],
+            )
 
     def generate_moc(self, topics_json: str) -> str:
         user_prompt = self._prompt("moc", "user").format(topics_json=topics_json)
-        return self._call(
-            "openai/gpt-5-structured",
-            [
-                {"role": "system", "content": self._prompt("moc", "system")},
-                {"role": "user", "content": user_prompt},
-            ],
-        )
+        with llm_step("moc"):
+            return self._call(
+                "openai/gpt-5-structured",
+                [
+                    {"role": "system", "content": self._prompt("moc", "system")},
+                    {"role": "user", "content": user_prompt},
+                ],
+            )
 
     def find_autolinks(
         self, title: str, summary: str, candidates: List[str]
@@ -488,31 +659,32 @@ class ReplicateLLMClient(LLMClient):
             "required": ["related_titles"],
             "additionalProperties": False,
         }
-        content = self._call(
-            "openai/gpt-5-structured",
-            [
-                {"role": "system", "content": self._prompt("autolink", "system")},
-                {"role": "user", "content": user_prompt},
-                {
-                    "_extra_input": {
-                        "response_format": {
-                            "type": "json_schema",
-                            "json_schema": {
-                                "name": "autolinks",
-                                "strict": True,
-                                "schema": schema,
-                            },
+        with llm_step("autolink"):
+            content = self._call(
+                "openai/gpt-5-structured",
+                [
+                    {"role": "system", "content": self._prompt("autolink", "system")},
+                    {"role": "user", "content": user_prompt},
+                    {
+                        "_extra_input": {
+                            "response_format": {
+                                "type": "json_schema",
+                                "json_schema": {
+                                    "name": "autolinks",
+                                    "strict": True,
+                                    "schema": schema,
+                                },
+                            }
                         }
-                    }
-                },
-            ],
-        )
+                    },
+                ],
+            )
         data = self._parse_json(content)
         return data.get("related_titles", [])
 
-    def answer_from_context(
+    def _answer_messages(
         self, query: str, fragments: List[Dict[str, str]]
-    ) -> str:
+    ) -> List[Dict[str, str]]:
         context_lines = []
         for idx, frag in enumerate(fragments, start=1):
             context_lines.append(
@@ -521,10 +693,22 @@ class ReplicateLLMClient(LLMClient):
         user_prompt = self._prompt("answer", "user").format(
             query=query, context="\n".join(context_lines)
         )
-        return self._call(
-            "openai/gpt-5-nano",
-            [
-                {"role": "system", "content": self._prompt("answer", "system")},
-                {"role": "user", "content": user_prompt},
-            ],
+        return [
+            {"role": "system", "content": self._prompt("answer", "system")},
+            {"role": "user", "content": user_prompt},
+        ]
+
+    def answer_from_context(
+        self, query: str, fragments: List[Dict[str, str]]
+    ) -> str:
+        with llm_step("answer"):
+            return self._call(
+                "openai/gpt-5-nano", self._answer_messages(query, fragments)
+            )
+
+    def stream_answer_from_context(
+        self, query: str, fragments: List[Dict[str, str]]
+    ) -> Iterator[str]:
+        return self._stream(
+            "openai/gpt-5-nano", self._answer_messages(query, fragments), step="answer"
         )
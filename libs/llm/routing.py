@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+"""Per-step model routing with latency budgets.
+
+Each pipeline step (see ``libs.metrics.llm_step``) maps to a target model and
+a latency budget in ``Settings.llm_routes``. Targets are Replicate model ids,
+optionally suffixed with ``@<variant>`` to pick the GPT-5 family member that
+``openai/gpt-5-structured`` should run (``gpt-5``, ``gpt-5-mini``,
+``gpt-5-nano``).
+
+The router keeps an exponentially weighted moving average of observed
+latency per target. While the primary target's average exceeds the step's
+budget, calls go to the configured fallback; every ``probe_every``-th call
+still probes the primary so the route recovers once it is fast again.
+"""
+
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+from libs.core.settings import get_settings
+
+
+class Target(NamedTuple):
+    model: str
+    variant: Optional[str] = None
+
+    @classmethod
+    def parse(cls, spec: str) -> "Target":
+        model, _, variant = spec.partition("@")
+        return cls(model, variant or None)
+
+    def __str__(self) -> str:
+        return f"{self.model}@{self.variant}" if self.variant else self.model
+
+
+class ModelRouter:
+    """Select a model per step and fall back when it runs over budget."""
+
+    def __init__(
+        self,
+        routes: Mapping[str, Mapping[str, Any]] | None = None,
+        *,
+        alpha: float = 0.3,
+        probe_every: int = 10,
+    ) -> None:
+        self.routes: Dict[str, Dict[str, Any]] = {
+            step: dict(route) for step, route in (routes or {}).items()
+        }
+        self.alpha = alpha
+        self.probe_every = max(1, probe_every)
+        self._lock = threading.Lock()
+        self._ewma: Dict[Tuple[str, str], float] = {}
+        self._fallback_calls: Dict[str, int] = {}
+
+    def select(self, step: str, default: str) -> Target:
+        """Return the target to use for ``step`` (``default`` if unrouted)."""
+        route = self.routes.get(step)
+        if not route or not route.get("model"):
+            return Target.parse(default)
+        primary = Target.parse(str(route["model"]))
+        fallback = route.get("fallback")
+        budget = route.get("budget_ms")
+        if not fallback or not budget:
+            return primary
+        with self._lock:
+            avg = self._ewma.get((step, str(primary)))
+            if avg is None or avg <= float(budget):
+                self._fallback_calls[step] = 0
+                return primary
+            n = self._fallback_calls.get(step, 0) + 1
+            self._fallback_calls[step] = n
+        if n % self.probe_every == 0:
+            return primary
+        return Target.parse(str(fallback))
+
+    def observe(self, step: str, target: Target, latency_ms: float) -> None:
+        """Feed the observed latency of a finished call."""
+        key = (step, str(target))
+        with self._lock:
+            prev = self._ewma.get(key)
+            self._ewma[key] = (
+                latency_ms if prev is None else prev + self.alpha * (latency_ms - prev)
+            )
+
+    def latency(self, step: str, target: Target) -> Optional[float]:
+        return self._ewma.get((step, str(target)))
+
+
+@lru_cache
+def get_router() -> ModelRouter:
+    """Return the process-wide router configured from settings."""
+    return ModelRouter(getattr(get_settings(), "llm_routes", {}) or {})
+
+
+__all__ = ["ModelRouter", "Target", "get_router"]
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+"""Process-level admission control for Replicate calls.
+
+Ingest and search share one Replicate token. The scheduler caps the number of
+in-flight calls per process and admits waiters by priority class, so an
+interactive answer never queues behind a burst of ingest calls. A few slots
+can additionally be reserved for non-ingest work.
+
+The cap and the reserved slots only apply within one process. Background
+ingest runs in the separate ``ingest-worker`` process, which has its own
+scheduler; the Replicate token is shared, so keep the worker's
+``REPLICATE_MAX_CONCURRENCY`` low enough (``WORKER_REPLICATE_MAX_CONCURRENCY``
+in docker-compose.yml) that the API's calls for search still fit under the
+account's limit.
+
+Waiting for a slot blocks the calling thread. Async callers therefore run
+model calls through :func:`offload`, which uses a separate thread pool per
+priority class: ingest calls queued for a slot only fill the ingest pool, and
+a search call still gets a thread to reach the priority queue with.
+"""
+
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, Callable, Iterator, List, Tuple, TypeVar
+
+from libs.core.settings import get_settings
+from libs.metrics import get_metrics
+
+
+class Priority(IntEnum):
+    """Priority classes; lower value is served first."""
+
+    INTERACTIVE = 0
+    QUERY_EMBEDDING = 1
+    INGEST = 2
+
+
+_STEP_PRIORITIES = {
+    "answer": Priority.INTERACTIVE,
+    "query_embedding": Priority.QUERY_EMBEDDING,
+}
+
+
+def priority_for_step(step: str) -> Priority:
+    """Map a pipeline step (see ``libs.metrics.llm_step``) to a priority class."""
+    return _STEP_PRIORITIES.get(step, Priority.INGEST)
+
+
+class CallScheduler:
+    """Priority queue in front of a global concurrency cap.
+
+    ``max_concurrency <= 0`` disables the cap. ``reserved_interactive`` slots
+    out of the cap are never given to :attr:`Priority.INGEST` calls.
+    """
+
+    def __init__(self, max_concurrency: int, reserved_interactive: int = 0) -> None:
+        self.max_concurrency = max_concurrency
+        self.reserved_interactive = max(
+            0, min(reserved_interactive, max_concurrency - 1)
+        )
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+
+    def _limit(self, priority: int) -> int:
+        if priority >= Priority.INGEST:
+            return self.max_concurrency - self.reserved_interactive
+        return self.max_concurrency
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiting)
+
+    @contextmanager
+    def slot(self, priority: Priority) -> Iterator[float]:
+        """Hold one call slot for the duration of the block.
+
+        Yields the time spent waiting for the slot, in milliseconds.
+        """
+        if self.max_concurrency <= 0:
+            yield 0.0
+            return
+        started = time.perf_counter()
+        entry = (int(priority), next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            # Better classes sort first in the heap, and their limit is never
+            # lower, so only the head of the queue can ever be admitted.
+            while not (
+                self._waiting[0] == entry and self._active < self._limit(entry[0])
+            ):
+                self._cond.wait()
+            heapq.heappop(self._waiting)
+            self._active += 1
+            self._cond.notify_all()
+        queued_ms = (time.perf_counter() - started) * 1000
+        get_metrics().observe(
+            "llm_queue_ms", queued_ms, priority=Priority(entry[0]).name.lower()
+        )
+        try:
+            yield queued_ms
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+
+@lru_cache
+def get_scheduler() -> CallScheduler:
+    """Return the process-wide scheduler configured from settings."""
+    settings = get_settings()
+    return CallScheduler(
+        int(getattr(settings, "replicate_max_concurrency", 8)),
+        int(getattr(settings, "replicate_reserved_interactive", 2)),
+    )
+
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=None)
+def executor_for(priority: Priority) -> ThreadPoolExecutor:
+    """Thread pool for the blocking model calls of one priority class."""
+    cap = get_scheduler().max_concurrency
+    return ThreadPoolExecutor(
+        max_workers=max(4, cap if cap > 0 else 8),
+        thread_name_prefix=f"llm-{priority.name.lower()}",
+    )
+
+
+async def offload(
+    priority: Priority, func: Callable[..., T], /, *args: Any, **kwargs: Any
+) -> T:
+    """Like ``asyncio.to_thread``, but on the pool of ``priority``."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(executor_for(priority), call)
+
+
+__all__ = [
+    "CallScheduler",
+    "Priority",
+    "executor_for",
+    "get_scheduler",
+    "offload",
+    "priority_for_step",
+]
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+"""Single-flight deduplication of identical in-flight model calls.
+
+When two callers in the same process send an identical payload at the same
+time (a retried webhook, the same post forwarded by two users), only the
+first one reaches Replicate; the others wait for its result. Nothing is kept
+once the call finishes, so this is not a cache.
+"""
+
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Callable, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def payload_key(model: str, payload: Any) -> str:
+    """Stable hash of a model id and its input payload."""
+    raw = json.dumps(
+        [model, payload], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Share one in-flight result between concurrent callers with the same key."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Run ``fn`` once per key among concurrent callers.
+
+        Returns ``(result, shared)`` where ``shared`` is true for callers that
+        reused the result of a call started by someone else. Exceptions raised
+        by ``fn`` propagate to every caller waiting on the key.
+        """
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+        if not leader:
+            return fut.result(), True
+        try:
+            result = fn()
+        except BaseException as exc:
+            fut.set_exception(exc)
+            raise
+        else:
+            fut.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+
+@lru_cache
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single-flight group."""
+    return SingleFlight()
+
+
+__all__ = ["SingleFlight", "get_single_flight", "payload_key"]
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+"""In-process metrics for outbound LLM and embedding calls.
+
+Every call made through ``ReplicateLLMClient`` or ``EmbeddingsProvider`` is
+recorded with its model, pipeline step, latency, sizes and retries:
+- aggregated process-wide in :class:`MetricsRegistry` (see ``get_metrics()``);
+- collected per request when running inside :func:`collect_calls`, so the
+  request log line can show where time and tokens went.
+
+The pipeline step is taken from the :func:`llm_step` context, which callers
+set around a call (``insights``, ``topics``, ``note``, ``autolink``, ``moc``,
+``answer``, ``embed``...).
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from libs.core.settings import get_settings
+
+
+# Upper bounds (ms) of histogram buckets; the last bucket is unbounded
+HISTOGRAM_BUCKETS_MS: Tuple[float, ...] = (
+    5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000,
+)
+
+_current_step: ContextVar[Optional[str]] = ContextVar("llm_step", default=None)
+_request_calls: ContextVar[Optional[List["CallRecord"]]] = ContextVar(
+    "llm_request_calls", default=None
+)
+
+
+def estimate_tokens(chars: int) -> int:
+    """Rough token estimate (~4 characters per token)."""
+    return int(math.ceil(chars / 4)) if chars > 0 else 0
+
+
+@dataclass
+class CallRecord:
+    """Single outbound model call."""
+
+    kind: str  # "llm" | "embedding"
+    model: str
+    step: str
+    latency_ms: float
+    input_chars: int = 0
+    output_chars: int = 0
+    items: int = 1
+    retries: int = 0
+    error: bool = False
+    # Time spent waiting for a scheduler slot (included in latency_ms)
+    queue_ms: float = 0.0
+    # Result reused from an identical in-flight call (no spend of its own)
+    shared: bool = False
+
+    @property
+    def tokens_in(self) -> int:
+        return estimate_tokens(self.input_chars)
+
+    @property
+    def tokens_out(self) -> int:
+        return estimate_tokens(self.output_chars)
+
+
+@contextmanager
+def llm_step(name: str) -> Iterator[None]:
+    """Label model calls made inside the block with a pipeline step name."""
+    token = _current_step.set(name)
+    try:
+        yield
+    finally:
+        _current_step.reset(token)
+
+
+def current_step(default: str) -> str:
+    return _current_step.get() or default
+
+
+@contextmanager
+def collect_calls() -> Iterator[List[CallRecord]]:
+    """Collect records of calls made within the block (e.g. one HTTP request)."""
+    calls: List[CallRecord] = []
+    token = _request_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        _request_calls.reset(token)
+
+
+def summarize_calls(calls: List[CallRecord]) -> Dict[str, Any]:
+    """Compact per-step breakdown suitable for a log line."""
+    by_step: Dict[str, Dict[str, Any]] = {}
+    for rec in calls:
+        agg = by_step.setdefault(
+            rec.step, {"calls": 0, "latency_ms": 0, "tokens_in": 0, "tokens_out": 0}
+        )
+        agg["calls"] += 1
+        agg["latency_ms"] += int(rec.latency_ms)
+        agg["tokens_in"] += rec.tokens_in
+        agg["tokens_out"] += rec.tokens_out
+    return {
+        "calls": len(calls),
+        "latency_ms": int(sum(r.latency_ms for r in calls)),
+        "retries": sum(r.retries for r in calls),
+        "errors": sum(1 for r in calls if r.error),
+        "by_step": by_step,
+    }
+
+
+class MetricsRegistry:
+    """Thread-safe aggregate of call records keyed by (kind, model, step)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str, str], Dict[str, float]] = {}
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Dict[str, Any]] = {}
+
+    def _cost(self, rec: CallRecord) -> float:
+        prices = getattr(get_settings(), "llm_prices", {}) or {}
+        price = prices.get(rec.model) or {}
+        return (
+            rec.tokens_in / 1000 * float(price.get("input", 0.0))
+            + rec.tokens_out / 1000 * float(price.get("output", 0.0))
+        )
+
+    def record_call(self, rec: CallRecord) -> None:
+        cost = 0.0 if rec.shared else self._cost(rec)
+        with self._lock:
+            agg = self._calls.setdefault(
+                (rec.kind, rec.model, rec.step),
+                {
+                    "count": 0,
+                    "errors": 0,
+                    "retries": 0,
+                    "shared": 0,
+                    "items": 0,
+                    "latency_ms_total": 0.0,
+                    "latency_ms_max": 0.0,
+                    "queue_ms_total": 0.0,
+                    "input_chars": 0,
+                    "output_chars": 0,
+                    "tokens_in": 0,
+                    "tokens_out": 0,
+                    "cost": 0.0,
+                },
+            )
+            agg["count"] += 1
+            agg["errors"] += int(rec.error)
+            agg["retries"] += rec.retries
+            agg["shared"] += int(rec.shared)
+            agg["items"] += rec.items
+            agg["latency_ms_total"] += rec.latency_ms
+            agg["latency_ms_max"] = max(agg["latency_ms_max"], rec.latency_ms)
+            agg["queue_ms_total"] += rec.queue_ms
+            agg["input_chars"] += rec.input_chars
+            agg["output_chars"] += rec.output_chars
+            agg["tokens_in"] += rec.tokens_in
+            agg["tokens_out"] += rec.tokens_out
+            agg["cost"] += cost
+        calls = _request_calls.get()
+        if calls is not None:
+            calls.append(rec)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Add a sample to the histogram ``name`` with the given labels."""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            hist = self._histograms.setdefault(
+                key,
+                {"count": 0, "sum": 0.0, "buckets": [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)},
+            )
+            hist["count"] += 1
+            hist["sum"] += value
+            idx = next(
+                (i for i, le in enumerate(HISTOGRAM_BUCKETS_MS) if value <= le),
+                len(HISTOGRAM_BUCKETS_MS),
+            )
+            hist["buckets"][idx] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            items = [(k, dict(v)) for k, v in self._calls.items()]
+            hists = [
+                (k, {**v, "buckets": list(v["buckets"])})
+                for k, v in self._histograms.items()
+            ]
+        calls = []
+        for (kind, model, step), agg in sorted(items):
+            count = agg["count"] or 1
+            calls.append(
+                {
+                    "kind": kind,
+                    "model": model,
+                    "step": step,
+                    **agg,
+                    "latency_ms_avg": round(agg["latency_ms_total"] / count, 1),
+                }
+            )
+        histograms = []
+        for (name, labels), hist in sorted(hists, key=lambda kv: kv[0]):
+            bounds = [str(le) for le in HISTOGRAM_BUCKETS_MS] + ["+Inf"]
+            histograms.append(
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": hist["count"],
+                    "sum": round(hist["sum"], 1),
+                    "buckets": dict(zip(bounds, hist["buckets"])),
+                }
+            )
+        return {"calls": calls, "histograms": histograms}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls.clear()
+            self._histograms.clear()
+
+
+class StageTimings:
+    """Wall time and item counts per pipeline stage of one operation.
+
+    Stages may run concurrently (several notes rendered at once), so a
+    stage's time is summed over its runs and can exceed the total.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def stage(self, name: str, count: int = 1) -> Iterator[Dict[str, int]]:
+        """Time the block; set ``run["count"]`` inside it if not known upfront."""
+        run = {"count": count}
+        start = time.perf_counter()
+        try:
+            yield run
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000, run["count"])
+
+    def add(self, name: str, ms: float, count: int = 1) -> None:
+        with self._lock:
+            agg = self._stages.setdefault(name, {"ms": 0.0, "count": 0})
+            agg["ms"] += ms
+            agg["count"] += count
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {"ms": round(agg["ms"], 1), "count": int(agg["count"])}
+                for name, agg in self._stages.items()
+            }
+
+    def server_timing(self) -> str:
+        """Value for a ``Server-Timing`` response header."""
+        return ", ".join(
+            f'{name};dur={agg["ms"]};desc="n={agg["count"]}"'
+            for name, agg in self.as_dict().items()
+        )
+
+    def observe(self, metric: str, registry: Optional["MetricsRegistry"] = None) -> None:
+        """Feed every stage into the histogram ``metric`` labelled by stage."""
+        registry = registry or get_metrics()
+        for name, agg in self.as_dict().items():
+            registry.observe(metric, agg["ms"], stage=name)
+
+
+@lru_cache
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return MetricsRegistry()
+
+
+__all__ = [
+    "CallRecord",
+    "MetricsRegistry",
+    "StageTimings",
+    "collect_calls",
+    "current_step",
+    "estimate_tokens",
+    "get_metrics",
+    "llm_step",
+    "summarize_calls",
+]
@@ -1,3 +1,7 @@
+from .chunker import MarkdownChunker, TextChunk, chunk_markdown
+from .index_version import IndexVersion, get_index_version
+from .rerank import mmr, pack_context
+
 try:  # pragma: no cover - optional dependency
     from .vector_index import VectorIndex
 except Exception:  # pragma: no cover - missing pymilvus
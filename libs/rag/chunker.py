@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+"""Structure-aware chunking of Markdown notes for embedding.
+
+Text is split into units along Markdown structure (headings, paragraphs,
+list items, fenced code blocks) and sentences, then packed into chunks of
+about ``target_tokens`` tokens. Consecutive chunks of one section overlap by
+``overlap_sentences`` whole units. Every chunk keeps character offsets into
+the source text and the heading it starts under as its anchor (usable as an
+Obsidian ``[[note#Heading]]`` link).
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, NamedTuple, Optional
+
+from libs.metrics import estimate_tokens
+
+_HEADING_RE = re.compile(r"#{1,6}[ \t]+(.*?)[ \t#]*$")
+_LIST_RE = re.compile(r"[ \t]*(?:[-*+]|\d+[.)])[ \t]+")
+_FENCE_RE = re.compile(r"[ \t]*(?:```|~~~)")
+# Sentence end: terminal punctuation, optional closing quotes/brackets, space
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])([\"'»”)\]]*)\s+")
+
+
+@dataclass
+class TextChunk:
+    """A chunk of source text with its location."""
+
+    text: str
+    start: int
+    end: int
+    anchor: Optional[str] = None
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(len(self.text))
+
+
+class _Unit(NamedTuple):
+    start: int
+    end: int
+    anchor: Optional[str]
+    # First unit of a section (after a heading or at the top of the text)
+    section_start: bool
+
+
+class MarkdownChunker:
+    """Split Markdown into sentence-aligned chunks of a target token size.
+
+    ``max_chars`` is a hard cap per chunk (the vector index stores chunk text
+    in a bounded VARCHAR); a single sentence longer than that is split at
+    whitespace.
+    """
+
+    def __init__(
+        self,
+        target_tokens: int = 200,
+        overlap_sentences: int = 1,
+        max_chars: int = 1000,
+    ) -> None:
+        self.target_tokens = max(1, target_tokens)
+        self.overlap_sentences = max(0, overlap_sentences)
+        self.max_chars = max(1, max_chars)
+
+    def split(self, text: str) -> List[TextChunk]:
+        return list(self._pack(text, self._units(text)))
+
+    # ------------------------------------------------------------------
+    def _units(self, text: str) -> Iterator[_Unit]:
+        anchor: Optional[str] = None
+        section_start = True
+        para_start = para_end = -1
+        fence_start = -1
+        pos = 0
+
+        def flush(start: int, end: int, sentences: bool) -> Iterator[_Unit]:
+            nonlocal section_start
+            spans = self._sentences(text, start, end) if sentences else [(start, end)]
+            for s, e in spans:
+                for s2, e2 in self._cap(text, s, e):
+                    yield _Unit(s2, e2, anchor, section_start)
+                    section_start = False
+
+        for line in text.splitlines(keepends=True):
+            start = pos
+            pos += len(line)
+            body = line.rstrip("\r\n")
+            end = start + len(body)
+
+            if fence_start >= 0:
+                if _FENCE_RE.match(body):
+                    yield from flush(fence_start, end, sentences=False)
+                    fence_start = -1
+                continue
+            if _FENCE_RE.match(body):
+                if para_start >= 0:
+                    yield from flush(para_start, para_end, sentences=True)
+                    para_start = -1
+                fence_start = start
+                continue
+            heading = _HEADING_RE.match(body)
+            if heading or not body.strip() or _LIST_RE.match(body):
+                if para_start >= 0:
+                    yield from flush(para_start, para_end, sentences=True)
+                    para_start = -1
+            if heading:
+                anchor = heading.group(1).strip() or anchor
+                section_start = True
+                yield from flush(start, end, sentences=False)
+                continue
+            if not body.strip():
+                continue
+            if para_start < 0:
+                para_start = start + (len(body) - len(body.lstrip()))
+            para_end = end
+
+        if fence_start >= 0:
+            yield from flush(fence_start, len(text.rstrip()), sentences=False)
+        if para_start >= 0:
+            yield from flush(para_start, para_end, sentences=True)
+
+    @staticmethod
+    def _sentences(text: str, start: int, end: int) -> List[tuple]:
+        spans = []
+        cur = start
+        for m in _SENTENCE_END_RE.finditer(text, start, end):
+            spans.append((cur, m.end(1)))
+            cur = m.end()
+        if cur < end:
+            spans.append((cur, end))
+        return spans
+
+    def _cap(self, text: str, start: int, end: int) -> Iterator[tuple]:
+        while end - start > self.max_chars:
+            cut = text.rfind(" ", start + 1, start + self.max_chars)
+            if cut <= start:
+                cut = start + self.max_chars
+            yield start, cut
+            start = cut
+            while start < end and text[start].isspace():
+                start += 1
+        if end > start:
+            yield start, end
+
+    def _pack(self, text: str, units: Iterator[_Unit]) -> Iterator[TextChunk]:
+        cur: List[_Unit] = []
+
+        def fits(first: _Unit, unit: _Unit) -> bool:
+            span = unit.end - first.start
+            return span <= self.max_chars and estimate_tokens(span) <= self.target_tokens
+
+        for unit in units:
+            if cur:
+                size = estimate_tokens(cur[-1].end - cur[0].start)
+                # Sections start a new chunk once the current one is half full;
+                # small sections are merged so short notes stay in one chunk.
+                boundary = unit.section_start and size >= self.target_tokens // 2
+                if boundary or not fits(cur[0], unit):
+                    yield self._chunk(text, cur)
+                    carry: List[_Unit] = []
+                    if not unit.section_start and self.overlap_sentences:
+                        carry = cur[-self.overlap_sentences :]
+                    while carry and not fits(carry[0], unit):
+                        carry = carry[1:]
+                    cur = carry
+            cur.append(unit)
+        if cur:
+            yield self._chunk(text, cur)
+
+    @staticmethod
+    def _chunk(text: str, units: List[_Unit]) -> TextChunk:
+        start, end = units[0].start, units[-1].end
+        return TextChunk(text[start:end], start, end, units[0].anchor)
+
+
+def chunk_markdown(
+    text: str,
+    *,
+    target_tokens: int = 200,
+    overlap_sentences: int = 1,
+    max_chars: int = 1000,
+) -> List[TextChunk]:
+    """Split ``text`` with a :class:`MarkdownChunker`."""
+    return MarkdownChunker(target_tokens, overlap_sentences, max_chars).split(text)
+
+
+__all__ = ["MarkdownChunker", "TextChunk", "chunk_markdown"]
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+"""Version counter of the vector index, shared between processes.
+
+Every write to the index bumps the counter, so anything derived from search
+results (see ``libs.usecases.search.SearchCache``) can include it in its key
+and is never served after an ingest changed the index. The counter lives in
+a small file next to the vault because the API and the ingest worker share
+that volume; reads are a ``stat`` plus, after a change, one small read.
+"""
+
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from libs.core.settings import get_settings
+
+try:  # pragma: no cover - POSIX only
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None  # type: ignore[assignment]
+
+
+class IndexVersion:
+    """Monotonic counter stored in ``path``."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._cache: Optional[tuple] = None  # (inode, mtime_ns, size, value)
+
+    def current(self) -> int:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return 0
+        # Bumps replace the file, so a new inode marks a change even when two
+        # bumps land within one mtime tick
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        cached = self._cache
+        if cached and cached[:3] == stamp:
+            return cached[3]
+        try:
+            value = int(self.path.read_text(encoding="utf-8").strip() or 0)
+        except (OSError, ValueError):
+            return 0
+        self._cache = (*stamp, value)
+        return value
+
+    def bump(self) -> int:
+        """Increment the counter and return the new version."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path.with_name(self.path.name + ".lock"), "a") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                self._cache = None
+                value = self.current() + 1
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                tmp.write_text(str(value), encoding="utf-8")
+                os.replace(tmp, self.path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+        return value
+
+
+@lru_cache
+def get_index_version() -> IndexVersion:
+    """Return the process-wide index version counter."""
+    return IndexVersion(Path(get_settings().vault_dir) / ".index_version")
+
+
+__all__ = ["IndexVersion", "get_index_version"]
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+"""Post-retrieval selection of search hits for answer prompts.
+
+:func:`mmr` picks hits by maximal marginal relevance: each pick trades its
+similarity to the query against its similarity to hits already picked, so
+overlapping chunks of one passage do not crowd out other notes.
+:func:`pack_context` then merges adjacent chunks of the same note into one
+passage (dropping the sentences the chunker repeats between them) and keeps
+the best passages that fit a token budget.
+"""
+
+import math
+from typing import Any, Dict, List, Sequence
+
+from libs.metrics import estimate_tokens
+
+try:  # pragma: no cover - numpy comes with pymilvus
+    import numpy as np
+except ImportError:  # pragma: no cover - pure-Python fallback
+    np = None  # type: ignore[assignment]
+
+
+def _normalize(vec: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+def _similarities(query_vec: Sequence[float], vectors: List[Sequence[float]]):
+    """Cosine similarity of every vector to the query and to each other."""
+    if np is not None:
+        m = np.asarray(vectors, dtype=float)
+        m /= np.linalg.norm(m, axis=1, keepdims=True).clip(min=1e-12)
+        q = np.asarray(query_vec, dtype=float)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        return (m @ q).tolist(), (m @ m.T).tolist()
+    unit = [_normalize(v) for v in vectors]
+    q = _normalize(query_vec)
+    to_query = [sum(a * b for a, b in zip(v, q)) for v in unit]
+    pairwise = [[sum(a * b for a, b in zip(u, v)) for v in unit] for u in unit]
+    return to_query, pairwise
+
+
+def mmr(
+    query_vec: Sequence[float],
+    hits: List[Dict[str, Any]],
+    k: int,
+    lambda_: float = 0.7,
+    vector_key: str = "embedding",
+) -> List[Dict[str, Any]]:
+    """Select ``k`` hits by maximal marginal relevance.
+
+    ``lambda_`` = 1 is plain relevance order, lower values favour diversity.
+    Hits without a stored vector keep their original order.
+    """
+    if k <= 0:
+        return []
+    if len(hits) <= 1 or lambda_ >= 1 or any(not h.get(vector_key) for h in hits):
+        return hits[:k]
+    to_query, pairwise = _similarities(query_vec, [h[vector_key] for h in hits])
+    picked: List[int] = []
+    left = list(range(len(hits)))
+    while left and len(picked) < k:
+        best = max(
+            left,
+            key=lambda i: lambda_ * to_query[i]
+            - (1 - lambda_) * max((pairwise[i][j] for j in picked), default=0.0),
+        )
+        picked.append(best)
+        left.remove(best)
+    return [hits[i] for i in picked]
+
+
+def _join_overlapping(a: str, b: str, max_overlap: int = 2000) -> str:
+    """Concatenate ``b`` after ``a`` without repeating their shared text."""
+    for size in range(min(len(a), len(b), max_overlap), 0, -1):
+        if a.endswith(b[:size]):
+            return a + b[size:]
+    return f"{a.rstrip()} {b.lstrip()}"
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    limit = max_tokens * 4  # estimate_tokens uses ~4 characters per token
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit - 3)
+    return text[: cut if cut > 0 else limit - 3].rstrip() + "..."
+
+
+def pack_context(
+    hits: List[Dict[str, Any]],
+    max_tokens: int = 800,
+    min_tokens: int = 30,
+) -> List[Dict[str, Any]]:
+    """Merge adjacent chunks per note and keep passages within a token budget.
+
+    ``hits`` are best-first and carry ``note_id``, ``pos`` and ``text``. A
+    passage ranks by its best hit and keeps the other keys of that hit; the
+    last passage is shortened to the remaining budget unless fewer than
+    ``min_tokens`` remain.
+    """
+    by_note: Dict[Any, List[tuple]] = {}
+    for rank, hit in enumerate(hits):
+        by_note.setdefault(hit.get("note_id"), []).append((rank, hit))
+
+    passages: List[tuple] = []
+    for group in by_note.values():
+        group.sort(key=lambda rh: (rh[1].get("pos") is None, rh[1].get("pos") or 0))
+        run: List[tuple] = []
+        for rank, hit in group:
+            pos = hit.get("pos")
+            prev = run[-1][1].get("pos") if run else None
+            if pos is not None and prev is not None and pos - prev <= 1:
+                if pos != prev:  # the same chunk twice adds nothing
+                    run.append((rank, hit))
+                continue
+            run = [(rank, hit)]
+            passages.append(run)
+
+    packed: List[Dict[str, Any]] = []
+    budget = max_tokens
+    for run in sorted(passages, key=lambda r: min(rank for rank, _ in r)):
+        text = str(run[0][1].get("text") or "")
+        for _, hit in run[1:]:
+            text = _join_overlapping(text, str(hit.get("text") or ""))
+        cost = estimate_tokens(len(text))
+        if cost > budget:
+            if budget < min_tokens:
+                break
+            text = _truncate(text, budget)
+            cost = budget
+        best = min(run, key=lambda rh: rh[0])[1]
+        packed.append(
+            {
+                **{k: v for k, v in best.items() if k != "embedding"},
+                "text": text,
+                "pos": run[0][1].get("pos"),
+                "chunks": len(run),
+            }
+        )
+        budget -= cost
+        if budget <= 0:
+            break
+    return packed
+
+
+__all__ = ["mmr", "pack_context"]
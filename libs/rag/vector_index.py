@@ -1,4 +1,5 @@
-from typing import List, Dict, Any
+import json
+from typing import Any, Dict, Iterable, List
 
 from pymilvus import (
     connections,
@@ -10,20 +11,31 @@ from pymilvus import (
 )
 
 from libs.core.settings import get_settings
+from .index_version import get_index_version
 
 
 class VectorIndex:
-    """Wrapper around Milvus vector store."""
+    """Wrapper around Milvus vector store.
+
+    Reads use ``consistency_level`` (Milvus default when ``None``). With the
+    search cache on it defaults to ``"Strong"``: the cache is keyed by the
+    index version bumped right after each write, and a Bounded read could
+    still miss that write and be cached under the new version.
+    """
 
     def __init__(
         self,
         uri: str | None = None,
         dim: int | None = None,
         create_notes_meta: bool = False,
+        consistency_level: str | None = None,
     ) -> None:
         # Resolve configuration from settings if not explicitly provided
         settings = get_settings()
         self.dim = dim if dim is not None else getattr(settings, "embedding_dim", 768)
+        if consistency_level is None and getattr(settings, "search_cache", True):
+            consistency_level = "Strong"
+        self.consistency_level = consistency_level
         if uri:
             self.uri = uri
         else:
@@ -107,6 +119,11 @@ class VectorIndex:
         schema = CollectionSchema(fields, description="notes metadata")
         Collection(self.notes_meta_collection, schema=schema)
 
+    def _read_options(self) -> Dict[str, Any]:
+        if self.consistency_level is None:
+            return {}
+        return {"consistency_level": self.consistency_level}
+
     # Public API -------------------------------------------------------
     def upsert_chunks(self, chunks: List[Dict[str, Any]]) -> None:
         """Insert or update chunk records."""
@@ -119,28 +136,79 @@ class VectorIndex:
             [c["embedding"] for c in chunks],
         ]
         collection.upsert(data)
+        # Invalidates cached search results in every process
+        get_index_version().bump()
+
+    def delete_chunks(self, chunk_ids: Iterable[str]) -> None:
+        """Remove chunk records by id (e.g. those of a failed ingest)."""
+        ids = [str(c) for c in chunk_ids]
+        if not ids:
+            return
+        Collection(self.chunks_collection).delete(f"chunk_id in {json.dumps(ids)}")
+        get_index_version().bump()
 
-    def search(self, query_vec: List[float], k: int = 5) -> List[Dict[str, Any]]:
+    def search(
+        self, query_vec: List[float], k: int = 5, with_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Nearest chunks; ``with_vectors`` also returns their ``embedding``."""
         collection = Collection(self.chunks_collection)
         collection.load()
-        search_params = {"metric_type": "COSINE", "params": {"ef": 64}}
+        search_params = {"metric_type": "COSINE", "params": {"ef": max(64, k)}}
+        output_fields = ["chunk_id", "note_id", "pos", "text"]
+        if with_vectors:
+            output_fields.append("embedding")
         results = collection.search(
             data=[query_vec],
             anns_field="embedding",
             param=search_params,
             limit=k,
-            output_fields=["chunk_id", "note_id", "pos", "text"],
+            output_fields=output_fields,
+            **self._read_options(),
         )
         hits: List[Dict[str, Any]] = []
         for hit in results[0]:
             entity = hit.entity
-            hits.append(
-                {
-                    "chunk_id": entity.get("chunk_id"),
-                    "note_id": entity.get("note_id"),
-                    "pos": entity.get("pos"),
-                    "text": entity.get("text"),
-                    "score": hit.score,
-                }
-            )
+            item = {
+                "chunk_id": entity.get("chunk_id"),
+                "note_id": entity.get("note_id"),
+                "pos": entity.get("pos"),
+                "text": entity.get("text"),
+                "score": hit.score,
+            }
+            if with_vectors:
+                item["embedding"] = list(entity.get("embedding") or [])
+            hits.append(item)
         return hits
+
+    def fetch_chunks(self, positions: Dict[str, Iterable[int]]) -> List[Dict[str, Any]]:
+        """Chunks at the given positions of each note, in one query.
+
+        ``positions`` maps ``note_id`` to chunk positions (``pos``); used to
+        pull the neighbours of search hits without another vector search.
+        """
+        clauses = []
+        wanted = 0
+        for note_id, pos in positions.items():
+            pos = sorted({int(p) for p in pos})
+            if pos:
+                clauses.append(f"(note_id == {json.dumps(note_id)} and pos in {pos})")
+                wanted += len(pos)
+        if not clauses:
+            return []
+        collection = Collection(self.chunks_collection)
+        collection.load()
+        rows = collection.query(
+            expr=" or ".join(clauses),
+            output_fields=["chunk_id", "note_id", "pos", "text"],
+            limit=wanted,
+            **self._read_options(),
+        )
+        return [
+            {
+                "chunk_id": row.get("chunk_id"),
+                "note_id": row.get("note_id"),
+                "pos": row.get("pos"),
+                "text": row.get("text"),
+            }
+            for row in rows
+        ]
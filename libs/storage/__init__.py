@@ -1,3 +1,4 @@
 from .notes_storage import Note, NotesStorage
+from .topic_index import TopicIndex
 
-__all__ = ["Note", "NotesStorage"]
+__all__ = ["Note", "NotesStorage", "TopicIndex"]
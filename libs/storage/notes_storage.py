@@ -2,11 +2,35 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict, defaultdict
+import os
 import re
+import threading
 from zipfile import ZipFile
 
+from .topic_index import TopicIndex
+
+
+# Frontmatter of note files by path, shared by every NotesStorage in the
+# process (one is created per request). Entries are checked against the
+# file's stat on every read, so edits made elsewhere are picked up.
+_META_CACHE_SIZE = 20000
+_meta_cache: "OrderedDict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]]" = OrderedDict()
+_meta_lock = threading.Lock()
+
+
+def _stat_key(st: os.stat_result) -> Tuple[int, int, int]:
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _remember_meta(path: Path, stamp: Tuple[int, int, int], front: Dict[str, Any]) -> None:
+    with _meta_lock:
+        _meta_cache[str(path)] = (stamp, front)
+        _meta_cache.move_to_end(str(path))
+        while len(_meta_cache) > _META_CACHE_SIZE:
+            _meta_cache.popitem(last=False)
+
 
 @dataclass
 class Note:
@@ -33,6 +57,7 @@ class NotesStorage:
         self.notes_dir = self.vault_path / "10_Notes"
         self.moc_dir = self.vault_path / "00_MOC"
         self.moc_file = self.moc_dir / "topics_index.md"
+        self.topic_index = TopicIndex(self.moc_dir / "topics_index.json")
 
     # ------------------------------------------------------------------
     # public API
@@ -46,7 +71,7 @@ class NotesStorage:
         # regenerate cross links for all notes including newly saved
         self._generate_crosslinks()
         # update topics index
-        self._update_moc()
+        self._update_moc([note])
 
     def read_note(self, slug: str) -> Note:
         """Read note from disk by slug."""
@@ -72,19 +97,59 @@ class NotesStorage:
             channel=front.get("channel"),
         )
 
+    def read_meta(self, slugs: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Frontmatter of many notes at once, without reading their bodies.
+
+        Served from a process-wide cache validated by ``stat``; only notes
+        that changed since they were last seen are re-read, and then only up
+        to the end of the frontmatter. Missing notes are left out.
+        """
+        out: Dict[str, Dict[str, Any]] = {}
+        for slug in dict.fromkeys(slugs):
+            path = self.notes_dir / f"{slug}.md"
+            try:
+                stamp = _stat_key(path.stat())
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with _meta_lock:
+                cached = _meta_cache.get(str(path))
+            if cached and cached[0] == stamp:
+                out[slug] = dict(cached[1])
+                continue
+            try:
+                front = _read_frontmatter(path)
+            except FileNotFoundError:
+                continue
+            _remember_meta(path, stamp, front)
+            out[slug] = dict(front)
+        return out
+
     def list_notes(self) -> List[Note]:
         """Return all notes stored in the vault."""
 
         return list(self._load_all_notes().values())
 
+    def record_topics(
+        self, topics: List[Dict[str, Any]], notes: List[Note]
+    ) -> None:
+        """File new notes under their topics and tags and re-render the MOC.
+
+        ``topics`` use the :meth:`TopicIndex.update` layout.
+        """
+        self._update_moc(notes, topics)
+
     def export_zip(self, output_path: Path) -> None:
         """Export entire vault as ZIP archive."""
 
         output_path = Path(output_path)
         with ZipFile(output_path, "w") as zf:
             for file in self.vault_path.rglob("*"):
-                if file.is_file():
-                    zf.write(file, file.relative_to(self.vault_path))
+                if not file.is_file() or file.suffix in {".lock", ".tmp"}:
+                    continue
+                # Service state kept in the vault root (e.g. .index_version)
+                if file.parent == self.vault_path and file.name.startswith("."):
+                    continue
+                zf.write(file, file.relative_to(self.vault_path))
 
     # ------------------------------------------------------------------
     # helpers
@@ -107,6 +172,7 @@ class NotesStorage:
         path = self.notes_dir / f"{note.slug}.md"
         content = f"---\n{fm}\n---\n\n{note.body.rstrip()}\n"
         path.write_text(content, encoding="utf-8")
+        _remember_meta(path, _stat_key(path.stat()), _load_yaml(fm))
 
     def _load_all_notes(self) -> Dict[str, Note]:
         notes: Dict[str, Note] = {}
@@ -144,21 +210,19 @@ class NotesStorage:
                 note.body = f"{base_body}\n"
             self._write_note_file(note)
 
-    def _update_moc(self) -> None:
-        notes = self._load_all_notes()
-        tag_map: Dict[str, List[Note]] = defaultdict(list)
-        for note in notes.values():
-            for tag in note.tags:
-                tag_map[tag].append(note)
-
-        lines = ["# Topics Index", ""]
-        for tag in sorted(tag_map):
-            lines.append(f"## {tag}")
-            for note in sorted(tag_map[tag], key=lambda n: n.slug):
-                lines.append(f"- [[{note.slug}]] {note.title}")
-            lines.append("")
-
-        self.moc_file.write_text("\n".join(lines).rstrip() + "\n", encoding="utf-8")
+    def _update_moc(
+        self,
+        notes: Optional[List[Note]] = None,
+        topics: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        if not self.topic_index.exists():
+            # First run on an existing vault: seed the index with every note
+            notes = list(self._load_all_notes().values())
+        self.topic_index.update(
+            topics=topics or [],
+            notes=[{"slug": n.slug, "title": n.title, "tags": n.tags} for n in notes or []],
+            moc_file=self.moc_file,
+        )
 
 
 # ----------------------------------------------------------------------
@@ -180,6 +244,19 @@ def _dump_yaml(data: Dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
+def _read_frontmatter(path: Path) -> Dict[str, Any]:
+    """Parse the YAML frontmatter of ``path``, stopping at its closing fence."""
+    lines: List[str] = []
+    with open(path, encoding="utf-8") as fh:
+        if not fh.readline().startswith("---"):
+            return {}
+        for line in fh:
+            if line.startswith("---"):
+                break
+            lines.append(line)
+    return _load_yaml("".join(lines))
+
+
 def _load_yaml(text: str) -> Dict[str, Any]:
     data: Dict[str, Any] = {}
     lines = [ln.rstrip() for ln in text.strip().splitlines() if ln.strip()]
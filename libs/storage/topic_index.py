@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+"""Persisted topic/tag → notes index behind the vault MOC.
+
+The index lives next to the MOC as ``00_MOC/topics_index.json`` and is
+updated in place with only the notes touched by an ingest or save; the
+Markdown MOC is then rendered from it deterministically. Updates take an
+inter-process file lock, held until the MOC is rewritten too, so the API and
+ingest workers can share a vault.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:  # pragma: no cover - POSIX only
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None  # type: ignore[assignment]
+
+
+def _topic_key(title: str) -> str:
+    return " ".join(str(title).casefold().split())
+
+
+def _empty() -> Dict[str, Any]:
+    return {"version": 1, "topics": {}, "tags": {}}
+
+
+class TopicIndex:
+    """JSON index of topics and tags with the notes filed under them."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._cache: Optional[tuple] = None  # (mtime_ns, data)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return _empty()
+        if self._cache and self._cache[0] == mtime:
+            return json.loads(json.dumps(self._cache[1]))  # callers may mutate
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return _empty()
+        data.setdefault("topics", {})
+        data.setdefault("tags", {})
+        self._cache = (mtime, data)
+        return json.loads(json.dumps(data))
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path.with_suffix(".lock"), "a") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _save(self, data: Dict[str, Any]) -> None:
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(
+            json.dumps(data, ensure_ascii=False, sort_keys=True, indent=1),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+        self._cache = (self.path.stat().st_mtime_ns, data)
+
+    def update(
+        self,
+        *,
+        topics: Iterable[Dict[str, Any]] = (),
+        notes: Iterable[Dict[str, Any]] = (),
+        moc_file: Optional[Path] = None,
+    ) -> Dict[str, Any]:
+        """Merge topics and notes into the index and return the new state.
+
+        ``topics`` items: ``{"topic_id", "title", "desc", "notes": [{"slug",
+        "title", "summary"}]}``; topics are keyed by normalized title because
+        topic ids are only unique within one ingest. ``notes`` items:
+        ``{"slug", "title", "tags"}``, replacing the note's tag entries.
+        ``moc_file`` is re-rendered before the lock is released, so the MOC
+        never lags behind an index written by another process.
+        """
+        with self._locked():
+            data = self.load()
+            for topic in topics:
+                title = str(topic.get("title") or topic.get("topic_id") or "").strip()
+                if not title:
+                    continue
+                entry = data["topics"].setdefault(
+                    _topic_key(title), {"title": title, "notes": {}}
+                )
+                entry["title"] = title
+                if topic.get("desc"):
+                    entry["desc"] = topic["desc"]
+                if topic.get("topic_id"):
+                    entry["topic_id"] = topic["topic_id"]
+                for note in topic.get("notes") or []:
+                    if note.get("slug"):
+                        entry["notes"][note["slug"]] = {
+                            "title": note.get("title", ""),
+                            "summary": note.get("summary", ""),
+                        }
+            for note in notes:
+                slug = note.get("slug")
+                if not slug:
+                    continue
+                tags = set(note.get("tags") or [])
+                for tag, members in list(data["tags"].items()):
+                    if slug in members and tag not in tags:
+                        del members[slug]
+                        if not members:
+                            del data["tags"][tag]
+                for tag in tags:
+                    data["tags"].setdefault(tag, {})[slug] = note.get("title", "")
+            self._save(data)
+            if moc_file is not None:
+                self._write_moc(Path(moc_file), data)
+        return data
+
+    @classmethod
+    def _write_moc(cls, moc_file: Path, data: Dict[str, Any]) -> None:
+        moc_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = moc_file.with_suffix(".md.tmp")
+        tmp.write_text(cls.render(data), encoding="utf-8")
+        os.replace(tmp, moc_file)
+
+    @staticmethod
+    def render(data: Dict[str, Any]) -> str:
+        """Markdown MOC: topics first, then notes by tag, in stable order."""
+        lines: List[str] = ["# Topics Index", ""]
+        topics = sorted(data.get("topics", {}).values(), key=lambda t: _topic_key(t["title"]))
+        for topic in topics:
+            lines.append(f"## {topic['title']}")
+            if topic.get("desc"):
+                lines += [str(topic["desc"]), ""]
+            for slug in sorted(topic.get("notes", {})):
+                lines.append(f"- [[{slug}]] {topic['notes'][slug].get('title', '')}".rstrip())
+            lines.append("")
+        tags = data.get("tags", {})
+        if tags:
+            if topics:
+                lines += ["# Tags", ""]
+            for tag in sorted(tags):
+                lines.append(f"## {tag}")
+                for slug in sorted(tags[tag]):
+                    lines.append(f"- [[{slug}]] {tags[tag][slug]}".rstrip())
+                lines.append("")
+        return "\n".join(lines).rstrip() + "\n"
+
+
+__all__ = ["TopicIndex"]
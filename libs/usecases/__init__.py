@@ -1,4 +1,11 @@
-from .ingest_text import IngestText
-from .search import Search
+from .ingest_text import BatchItemResult, IngestText, build_ingest_text
+from .search import Search, SearchCache, get_search_cache
 
-__all__ = ["IngestText", "Search"]
+__all__ = [
+    "BatchItemResult",
+    "IngestText",
+    "Search",
+    "SearchCache",
+    "build_ingest_text",
+    "get_search_cache",
+]
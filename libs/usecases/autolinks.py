@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List
+
+from libs.llm import LLMClient, EmbeddingsProvider
+from libs.rag import VectorIndex
+from libs.storage import NotesStorage
+from libs.metrics import llm_step
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a))
+    nb = math.sqrt(sum(y * y for y in b))
+    if not na or not nb:
+        return 0.0
+    return dot / (na * nb)
+
+
+class LLMAutolinker:
+    """Pick "See also" titles among the current batch with one LLM call per insight."""
+
+    def __init__(self, llm: LLMClient) -> None:
+        self.llm = llm
+
+    def link(self, insights: List[Dict[str, Any]]) -> None:
+        all_titles = [i.get("title", "") for i in insights]
+        for ins in insights:
+            candidates = [t for t in all_titles if t != ins.get("title")]
+            ins["see_also_candidates"] = self.llm.find_autolinks(
+                ins.get("title", ""),
+                ins.get("summary", ""),
+                candidates,
+            )
+
+
+class EmbeddingAutolinker:
+    """Pick "See also" titles by vector similarity across the whole vault.
+
+    Each insight's ``title + summary`` is embedded in a single batched call and
+    compared both with the other insights of the batch and with chunks already
+    stored in the vector index. Only candidates scoring at least ``threshold``
+    (cosine similarity) are kept, best first.
+    """
+
+    def __init__(
+        self,
+        embeddings: EmbeddingsProvider,
+        index: VectorIndex,
+        storage: NotesStorage,
+        *,
+        threshold: float = 0.75,
+        max_links: int = 5,
+        search_k: int = 20,
+    ) -> None:
+        self.embeddings = embeddings
+        self.index = index
+        self.storage = storage
+        self.threshold = threshold
+        self.max_links = max_links
+        self.search_k = search_k
+
+    def link(self, insights: List[Dict[str, Any]]) -> None:
+        if not insights:
+            return
+        texts = [
+            f"{ins.get('title', '')}\n{ins.get('summary', '')}".strip()
+            for ins in insights
+        ]
+        with llm_step("autolink"):
+            vectors = self.embeddings.embed_texts(texts)
+        # Older notes already indexed in the vault, resolved to titles with
+        # one frontmatter lookup for the whole batch
+        vault_hits = [
+            [
+                hit
+                for hit in self.index.search(vector, self.search_k)
+                if float(hit.get("score") or 0.0) >= self.threshold
+            ]
+            for vector in vectors
+        ]
+        metas = self.storage.read_meta(
+            hit.get("note_id") for hits in vault_hits for hit in hits
+        )
+
+        for i, ins in enumerate(insights):
+            title = ins.get("title", "")
+            scores: Dict[str, float] = {}
+
+            # Peers from the same ingest batch
+            for j, other in enumerate(insights):
+                other_title = other.get("title", "")
+                if j == i or not other_title or other_title == title:
+                    continue
+                score = _cosine(vectors[i], vectors[j])
+                if score >= self.threshold:
+                    scores[other_title] = max(score, scores.get(other_title, score))
+
+            for hit in vault_hits[i]:
+                score = float(hit.get("score") or 0.0)
+                other_title = (metas.get(hit.get("note_id")) or {}).get("title")
+                if not other_title or other_title == title:
+                    continue
+                scores[other_title] = max(score, scores.get(other_title, score))
+
+            ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+            ins["see_also_candidates"] = [t for t, _ in ranked[: self.max_links]]
+
+
+__all__ = ["LLMAutolinker", "EmbeddingAutolinker"]
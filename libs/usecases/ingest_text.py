@@ -1,15 +1,28 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
 import re
 import unicodedata
-from typing import Any, Dict, List
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterable, List, Sequence, Tuple
 import json
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from libs.core.settings import get_settings
 from libs.llm import LLMClient, EmbeddingsProvider
-from libs.rag import VectorIndex
+from libs.llm.scheduler import Priority, executor_for, offload
+from libs.rag import MarkdownChunker, VectorIndex
 from libs.storage import NotesStorage, Note as FsNote
-from libs.db import models, NoteRepo, ChunkRepo
+from libs.core.fingerprint import Fingerprint
+from libs.db import models, NoteRepo, ChunkRepo, FingerprintRepo
 from libs.storage.notes_storage import _load_yaml
+from libs.metrics import StageTimings, estimate_tokens, get_metrics, llm_step
+from .autolinks import LLMAutolinker, EmbeddingAutolinker
+from .note_renderer import LLMNoteRenderer, TemplateNoteRenderer
 
 
 
@@ -97,18 +110,6 @@ def _slugify(text: str) -> str:
     return text.strip("-")
 
 
-def _chunk_text(text: str, size: int = 500, overlap: int = 50) -> List[str]:
-    if not text:
-        return []
-    chunks: List[str] = []
-    start = 0
-    while start < len(text):
-        end = start + size
-        chunks.append(text[start:end])
-        start = end - overlap
-    return chunks
-
-
 def _normalize_tag(tag: str) -> str:
     tag = tag.strip()
     if not tag:
@@ -126,8 +127,114 @@ def _dedup_preserve_order(items: List[str]) -> List[str]:
     return out
 
 
+def _insight_key(insight: Dict[str, Any]) -> str:
+    return _slugify(str(insight.get("title", "")).strip()) or str(insight.get("id"))
+
+
+def _merge_insights(insights: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge insights that would become the same note (same title slug).
+
+    Segments of one document often restate a point; the first occurrence is
+    kept and takes over the bullets, tags and highest confidence of the rest.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    out: List[Dict[str, Any]] = []
+    for insight in insights:
+        key = _insight_key(insight)
+        first = merged.get(key)
+        if first is None:
+            merged[key] = insight
+            out.append(insight)
+            continue
+        for field in ("bullets", "tags"):
+            first[field] = _dedup_preserve_order(
+                [str(x) for x in list(first.get(field) or []) + list(insight.get(field) or [])]
+            )
+        if not first.get("summary") and insight.get("summary"):
+            first["summary"] = insight["summary"]
+        try:
+            first["confidence"] = max(
+                float(first.get("confidence") or 0), float(insight.get("confidence") or 0)
+            )
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+@dataclass
+class BatchItemResult:
+    """Outcome of one item of :meth:`IngestText.ingest_batch`."""
+
+    notes: List[models.Note] = field(default_factory=list)
+    # Notes came from an earlier ingest (or an identical item of the batch)
+    duplicate: bool = False
+    error: str | None = None
+
+
+# Fire-and-forget work (e.g. MOC summaries) kept alive until it finishes
+_background: set = set()
+
+
+async def _cancel_all(tasks: Sequence[asyncio.Future]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _gather_or_cancel(aws: Iterable[Awaitable[Any]]) -> List[Any]:
+    """``asyncio.gather`` that cancels and awaits the rest on the first failure.
+
+    Undoing a failed ingest must not race insights that are still writing.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        await _cancel_all(tasks)
+        raise
+
+
+async def _settle(aw: Awaitable[Any]) -> Any:
+    """Await a write; if cancelled meanwhile, let it finish before stopping.
+
+    A cancelled ``to_thread`` call keeps running in its thread; waiting for
+    it means the undo of a failed ingest sees every write that happened.
+    """
+    task = asyncio.ensure_future(aw)
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await asyncio.gather(task, return_exceptions=True)
+        raise
+
+
 class IngestText:
-    """Pipeline to convert raw text into notes and index them for search."""
+    """Pipeline to convert raw text into notes and index them for search.
+
+    Insights run through render → persist → embed → index concurrently, with
+    at most ``concurrency`` insights inside each of the render, embed and
+    index stages. Blocking model and file calls run in worker threads; DB
+    writes share one session and are serialized, and the session commits
+    once at the end of the request.
+
+    With ``stream_insights`` the structured insights are parsed from the
+    streamed model output and every note is rendered, stored and indexed as
+    soon as its insight is complete. Topics and "See also" links need the
+    whole batch, so they are written into the notes once the stream ends.
+
+    Texts longer than ``long_document_tokens`` are ingested map-reduce style:
+    the text is split along Markdown structure into segments of about
+    ``segment_tokens``, insights are extracted from the segments in parallel,
+    and a single reduce step merges duplicate insights, groups topics and
+    picks links for the whole document.
+
+    Each call records per-stage wall time and item counts in ``timings``
+    (logged as ``ingest_timings`` and observed as ``ingest_stage_ms``).
+
+    DB rows roll back with the caller's session when an ingest fails; the
+    note files it created and the chunks it indexed are removed as well, so
+    a retry does not leave orphans behind.
+    """
 
     def __init__(
         self,
@@ -137,6 +244,16 @@ class IngestText:
         index: VectorIndex,
         note_repo: NoteRepo,
         chunk_repo: ChunkRepo,
+        autolinker: LLMAutolinker | EmbeddingAutolinker | None = None,
+        renderer: LLMNoteRenderer | TemplateNoteRenderer | None = None,
+        stream_insights: bool = False,
+        concurrency: int = 4,
+        chunker: MarkdownChunker | None = None,
+        fingerprints: FingerprintRepo | None = None,
+        near_duplicate_distance: int = 7,
+        moc_summary: bool = False,
+        long_document_tokens: int = 3000,
+        segment_tokens: int = 1500,
     ) -> None:
         self.llm = llm
         self.storage = storage
@@ -144,15 +261,349 @@ class IngestText:
         self.index = index
         self.note_repo = note_repo
         self.chunk_repo = chunk_repo
+        # Defaults to LLM-picked links among the current batch
+        self.autolinker = autolinker or LLMAutolinker(llm)
+        self.renderer = renderer or LLMNoteRenderer(llm)
+        self.stream_insights = stream_insights
+        self.chunker = chunker or MarkdownChunker()
+        # Duplicate detection is skipped without a fingerprint store
+        self.fingerprints = fingerprints
+        self.near_duplicate_distance = near_duplicate_distance
+        # The MOC itself is rendered from the topic index; an LLM overview
+        # of each batch is optional and written in the background.
+        self.moc_summary = moc_summary
+        self.long_document_tokens = long_document_tokens
+        # Segments are cut at sections/sentences; none repeat across segments
+        self.segmenter = MarkdownChunker(
+            target_tokens=segment_tokens,
+            overlap_sentences=0,
+            max_chars=max(1, segment_tokens) * 4,
+        )
+        limit = max(1, concurrency)
+        self._stages = {
+            stage: asyncio.Semaphore(limit)
+            for stage in ("extract", "render", "embed", "index")
+        }
+        # One AsyncSession cannot run concurrent operations
+        self._db_lock = asyncio.Lock()
+        self.timings = StageTimings()
+        # Writes of the current call that a failure must undo
+        self._new_files: List[Path] = []
+        self._indexed_chunks: List[str] = []
 
     # ------------------------------------------------------------------
     async def __call__(self, text: str) -> List[models.Note]:
-        insights: List[Dict[str, Any]] = self.llm.generate_structured_notes(text)
+        with self._timed("text"):
+            async with self._undo_on_error():
+                return await self._ingest_text(text)
+
+    async def _ingest_text(self, text: str) -> List[models.Note]:
+        fingerprint: Fingerprint | None = None
+        if self.fingerprints is not None:
+            # SimHash is pure Python and takes a while on long documents
+            fingerprint = await asyncio.to_thread(Fingerprint.of, text)
+            existing = await self._find_duplicate(fingerprint)
+            if existing:
+                return existing
+
+        long_document = estimate_tokens(len(text)) > self.long_document_tokens
+        if self.stream_insights and not long_document:
+            notes = await self._ingest_streaming(text)
+        else:
+            notes = await self._ingest(text)
+
+        if fingerprint is not None and notes:
+            async with self._db_lock:
+                with self.timings.stage("db"):
+                    await self.fingerprints.add(fingerprint, [n.id for n in notes])
+        return notes
+
+    @contextmanager
+    def _timed(self, op: str):
+        """Start fresh stage timings for one ingest and report them at the end."""
+        import logging as _logging
+
+        self.timings = StageTimings()
+        try:
+            with self.timings.stage("total"):
+                yield
+        finally:
+            _logging.getLogger("ingest").info(
+                "ingest_timings", extra={"op": op, "stages": self.timings.as_dict()}
+            )
+            self.timings.observe("ingest_stage_ms", get_metrics())
+
+    @asynccontextmanager
+    async def _undo_on_error(self):
+        """Remove the note files and index entries of a failed ingest."""
+        self._new_files, self._indexed_chunks = [], []
+        try:
+            yield
+        except BaseException:
+            await asyncio.to_thread(self._undo_writes)
+            raise
+
+    def _undo_writes(self) -> None:
+        import logging as _logging
+
+        logger = _logging.getLogger("ingest")
+        for path in self._new_files:
+            path.unlink(missing_ok=True)
+        if self._indexed_chunks:
+            try:
+                self.index.delete_chunks(self._indexed_chunks)
+            except Exception:
+                logger.warning("ingest_undo_index_failed", exc_info=True)
+        logger.info(
+            "ingest_undone",
+            extra={"files": len(self._new_files), "chunks": len(self._indexed_chunks)},
+        )
+
+    async def _find_duplicate(self, fingerprint: Fingerprint) -> List[models.Note]:
+        """Notes created earlier from the same (or nearly the same) text."""
+        import logging as _logging
+
+        with self.timings.stage("db"):
+            kind = "exact"
+            match = await self.fingerprints.find_exact(fingerprint)
+            # Very short texts share too many shingles to compare reliably
+            if match is None and fingerprint.tokens >= 8:
+                kind = "near"
+                match = await self.fingerprints.find_near(
+                    fingerprint, self.near_duplicate_distance
+                )
+            if match is None:
+                return []
+            notes = [
+                n for n in [await self.note_repo.get(i) for i in match.note_ids or []] if n
+            ]
+        if notes:
+            _logging.getLogger("ingest").info(
+                "ingest_duplicate",
+                extra={"match": kind, "notes": [n.id for n in notes]},
+            )
+        return notes
+
+    async def _ingest(self, text: str) -> List[models.Note]:
+        return await self._store_batch(await self._extract(text))
+
+    async def _extract(self, text: str) -> List[Dict[str, Any]]:
+        """Insights of ``text``, segment by segment for long documents."""
+        if estimate_tokens(len(text)) <= self.long_document_tokens:
+            segments = [text]
+        else:
+            segments = [s.text for s in self.segmenter.split(text)]
+
+        async def extract(segment: str) -> List[Dict[str, Any]]:
+            async with self._stages["extract"]:
+                with self.timings.stage("insights") as run:
+                    found = await offload(
+                        Priority.INGEST, self.llm.generate_structured_notes, segment
+                    )
+                    run["count"] = len(found or [])
+                    return found
+
+        results = await asyncio.gather(*(extract(s) for s in segments))
+        if len(results) == 1:
+            return list(results[0] or [])
+        insights: List[Dict[str, Any]] = []
+        for n, segment_insights in enumerate(results, start=1):
+            for insight in segment_insights or []:
+                # Ids are only unique within one extraction call
+                insight["id"] = f"s{n}-{insight.get('id') or len(insights) + 1}"
+                insights.append(insight)
+        return _merge_insights(insights)
+
+    async def ingest_batch(
+        self, items: Sequence[Dict[str, Any]]
+    ) -> List[BatchItemResult]:
+        """Ingest many texts as one batch and report the outcome per item.
+
+        ``items`` are ``{"text": ..., "meta": {...}}``; ``meta`` keys
+        (``source_url``, ``source_author``, ``source_dt``, ``source_channel``)
+        are applied to every note of the item. Insights of all items share
+        one topic grouping, one autolink pass, one embedding request, one
+        index upsert and one MOC update. An item whose extraction fails gets
+        an ``error`` and does not affect the others.
+        """
+        with self._timed("batch"):
+            async with self._undo_on_error():
+                return await self._ingest_batch(items)
+
+    async def _ingest_batch(
+        self, items: Sequence[Dict[str, Any]]
+    ) -> List[BatchItemResult]:
+        import logging as _logging
+
+        results = [BatchItemResult() for _ in items]
+        fingerprints: List[Fingerprint | None] = [None] * len(items)
+        if self.fingerprints is not None:
+            fingerprints = await asyncio.to_thread(
+                lambda: [Fingerprint.of(str(item.get("text") or "")) for item in items]
+            )
+        first_by_digest: Dict[str, int] = {}
+        same_as: Dict[int, int] = {}
+        todo: List[int] = []
+        for n, fp in enumerate(fingerprints):
+            if fp is not None:
+                if fp.sha256 in first_by_digest:
+                    same_as[n] = first_by_digest[fp.sha256]
+                    continue
+                first_by_digest[fp.sha256] = n
+                existing = await self._find_duplicate(fp)
+                if existing:
+                    results[n].notes = existing
+                    results[n].duplicate = True
+                    continue
+            todo.append(n)
+
+        extracted = await asyncio.gather(
+            *(self._extract(str(items[n].get("text") or "")) for n in todo),
+            return_exceptions=True,
+        )
+        insights: List[Dict[str, Any]] = []
+        owners: List[int] = []
+        for n, found in zip(todo, extracted):
+            if isinstance(found, BaseException):
+                if not isinstance(found, Exception):
+                    raise found
+                _logging.getLogger("ingest").warning(
+                    "ingest_batch_item_failed", extra={"item": n, "error": str(found)}
+                )
+                results[n].error = str(found)
+                continue
+            meta = {k: v for k, v in (items[n].get("meta") or {}).items() if v}
+            for insight in found:
+                insight["id"] = f"{n}-{insight.get('id') or len(insights) + 1}"
+                if meta:
+                    insight["meta"] = {**(insight.get("meta") or {}), **meta}
+                insights.append(insight)
+                owners.append(n)
+
+        # Items restating the same point share the resulting note
+        key_owners: Dict[str, List[int]] = {}
+        for insight, n in zip(insights, owners):
+            key_owners.setdefault(_insight_key(insight), []).append(n)
+        merged = _merge_insights(insights)
+        # Rendering normalizes titles in place, so take the keys beforehand
+        merged_keys = [_insight_key(insight) for insight in merged]
+        notes = await self._store_batch(merged, pipelined=False)
+        for key, note in zip(merged_keys, notes):
+            for n in _dedup_preserve_order(key_owners[key]):
+                results[n].notes.append(note)
+
+        if self.fingerprints is not None:
+            async with self._db_lock, self.timings.stage("db", count=len(todo)):
+                for n in todo:
+                    if results[n].notes and fingerprints[n] is not None:
+                        await self.fingerprints.add(
+                            fingerprints[n], [note.id for note in results[n].notes]
+                        )
+        for n, first in same_as.items():
+            results[n].notes = list(results[first].notes)
+            results[n].duplicate = True
+            results[n].error = results[first].error
+        return results
+
+    async def _store_batch(
+        self, insights: List[Dict[str, Any]], pipelined: bool = True
+    ) -> List[models.Note]:
+        """Group topics and links for ``insights``, then store and index them.
+
+        Pipelined, every note is embedded and indexed as soon as it is
+        stored; otherwise all notes are persisted first and indexed with a
+        single embedding request and upsert.
+        """
         if not insights:
             return []
 
-        topics_info = self.llm.group_topics(insights)
-        insight_map = {ins.get("id"): ins for ins in insights if ins.get("id")}
+        topics_info = await self._assign_topics(insights)
+        await self._link(insights)
+
+        if pipelined:
+            stored = await _gather_or_cancel(self._store_insight(i) for i in insights)
+        else:
+            stored = await _gather_or_cancel(self._persist_insight(i) for i in insights)
+            await self._index_notes(list(stored))
+        await self._write_moc(topics_info, insights, stored)
+        return [note for note, _ in stored]
+
+    async def _ingest_streaming(self, text: str) -> List[models.Note]:
+        insights: List[Dict[str, Any]] = []
+        tasks: List[asyncio.Task] = []
+        try:
+            with self.timings.stage("insights") as run:
+                async for insight in self._iter_insights(text):
+                    insights.append(insight)
+                    tasks.append(asyncio.create_task(self._store_insight(insight)))
+                run["count"] = len(insights)
+        except BaseException:
+            await _cancel_all(tasks)
+            raise
+        if not insights:
+            return []
+        stored = await _gather_or_cancel(tasks)
+
+        topics_info = await self._assign_topics(insights)
+        await self._link(insights)
+        for insight, (note, fs_note) in zip(insights, stored):
+            topic_id = (insight.get("meta") or {}).get("topic_id")
+            see_also = self.renderer.see_also_section(
+                list(insight.get("see_also_candidates") or [])
+            )
+            if not topic_id and not see_also:
+                continue
+            if topic_id:
+                fs_note.topic_id = topic_id
+                with self.timings.stage("db"):
+                    await self.note_repo.update(note, topic_id=topic_id)
+            if see_also:
+                fs_note.body = f"{fs_note.body.rstrip()}\n\n{see_also}"
+            with self.timings.stage("file_write"):
+                await asyncio.to_thread(self.storage._write_note_file, fs_note)
+        await self._write_moc(topics_info, insights, stored)
+        return [note for note, _ in stored]
+
+    async def _iter_insights(self, text: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield insights from the model stream without blocking the loop."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce() -> None:
+            try:
+                for item in self.llm.iter_structured_notes(text):
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            except Exception as exc:  # re-raised in the consumer
+                loop.call_soon_threadsafe(queue.put_nowait, exc)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        # Copy the context so step labels and request metrics follow the call
+        producer = loop.run_in_executor(
+            executor_for(Priority.INGEST), contextvars.copy_context().run, produce
+        )
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if isinstance(item, dict):
+                    yield item
+        finally:
+            await producer
+
+    async def _link(self, insights: List[Dict[str, Any]]) -> None:
+        with self.timings.stage("autolinks", count=len(insights)):
+            await offload(Priority.INGEST, self.autolinker.link, insights)
+
+    async def _assign_topics(self, insights: List[Dict[str, Any]]) -> Dict[str, Any]:
+        with self.timings.stage("topics", count=len(insights)):
+            topics_info = await offload(
+                Priority.INGEST, self.llm.group_topics, insights
+            )
         id_to_topic: Dict[str, str] = {}
         for topic in topics_info.get("topics", []):
             for iid in topic.get("insight_ids", []):
@@ -162,137 +613,208 @@ class IngestText:
             topic_id = id_to_topic.get(ins.get("id"))
             if topic_id:
                 ins.setdefault("meta", {})["topic_id"] = topic_id
+        return topics_info
+
+    async def _store_insight(
+        self, insight: Dict[str, Any]
+    ) -> Tuple[models.Note, FsNote]:
+        """Run a single insight through render → persist → embed → index."""
+        stored = await self._persist_insight(insight)
+        await self._index_notes([stored])
+        return stored
+
+    async def _persist_insight(
+        self, insight: Dict[str, Any]
+    ) -> Tuple[models.Note, FsNote]:
+        """Render an insight, write its note file and create the DB row."""
+        async with self._stages["render"]:
+            with self.timings.stage("render"):
+                fs_note, db_meta = await offload(
+                    Priority.INGEST, self._render_insight, insight
+                )
 
-        all_titles = [i.get("title", "") for i in insights]
-        for ins in insights:
-            candidates = [t for t in all_titles if t != ins.get("title")]
-            related = self.llm.find_autolinks(
-                ins.get("title", ""),
-                ins.get("summary", ""),
-                candidates,
+        with self.timings.stage("file_write"):
+            await _settle(asyncio.to_thread(self._write_note, fs_note))
+        async with self._db_lock:
+            with self.timings.stage("db"):
+                note = await self.note_repo.create(
+                    id=fs_note.slug,
+                    title=fs_note.title,
+                    file_path=str(self.storage.notes_dir / f"{fs_note.slug}.md"),
+                    tags=fs_note.tags,
+                    **db_meta,
+                )
+        return note, fs_note
+
+    def _write_note(self, fs_note: FsNote) -> None:
+        """Write a note file, remembering it if this call created it."""
+        path = self.storage.notes_dir / f"{fs_note.slug}.md"
+        if not path.exists():
+            self._new_files.append(path)
+        self.storage._write_note_file(fs_note)
+
+    async def _index_notes(self, stored: List[Tuple[models.Note, FsNote]]) -> None:
+        """Chunk, embed and index notes with one embedding call and one upsert."""
+        pending = [
+            (note, pos, chunk)
+            for note, fs_note in stored
+            for pos, chunk in enumerate(self.chunker.split(fs_note.body))
+        ]
+        if not pending:
+            return
+        async with self._stages["embed"]:
+            with self.timings.stage("embed", count=len(pending)):
+                embeddings = await offload(
+                    Priority.INGEST,
+                    self._embed_chunks, [chunk.text for _, _, chunk in pending]
+                )
+        if len(embeddings) != len(pending):
+            # Indexing a prefix would leave notes that search cannot find
+            raise ValueError(
+                f"Embedding provider returned {len(embeddings)} vectors "
+                f"for {len(pending)} chunks"
             )
-            ins["see_also_candidates"] = related
 
-        self.storage.notes_dir.mkdir(parents=True, exist_ok=True)
+        async with self._db_lock:
+            with self.timings.stage("db"):
+                chunk_ids = await self.chunk_repo.bulk_create(
+                    [
+                        {"note_id": note.id, "pos": pos, "anchor": chunk.anchor}
+                        for note, pos, chunk in pending
+                    ]
+                )
+        chunks_for_index = [
+            {
+                "chunk_id": chunk_id,
+                "note_id": note.id,
+                "pos": pos,
+                "text": chunk.text,
+                "embedding": emb,
+            }
+            for chunk_id, (note, pos, chunk), emb in zip(chunk_ids, pending, embeddings)
+        ]
+        if chunks_for_index:
+            self._indexed_chunks.extend(c["chunk_id"] for c in chunks_for_index)
+            async with self._stages["index"]:
+                with self.timings.stage("index", count=len(chunks_for_index)):
+                    await _settle(
+                        asyncio.to_thread(self.index.upsert_chunks, chunks_for_index)
+                    )
+
+    def _embed_chunks(self, texts: List[str]) -> List[List[float]]:
+        with llm_step("embed"):
+            return self.embeddings.embed_texts(texts)
 
-        notes: List[models.Note] = []
+    def _render_insight(
+        self, insight: Dict[str, Any]
+    ) -> Tuple[FsNote, Dict[str, Any]]:
+        """Normalize an insight and render it into a note plus DB metadata."""
+        self.storage.notes_dir.mkdir(parents=True, exist_ok=True)
         import logging as _logging
         required_fields = {"id", "title", "summary", "bullets", "tags", "confidence"}
-        for insight in insights:
-            # Validate and normalize insight fields server-side
-            title = str(insight.get("title", "")).strip() or "untitled"
-            if len(title) > 80:
-                title = title[:77] + "..."
-            bullets_in = [str(b) for b in (insight.get("bullets") or []) if str(b).strip()]
-            bullets_in = _dedup_preserve_order(bullets_in)
-            tags_in = [str(t) for t in (insight.get("tags") or []) if str(t).strip()]
-            tags_norm = _dedup_preserve_order([_normalize_tag(t) for t in tags_in if _normalize_tag(t)])
-
-            # Write back normalized values for downstream prompt
-            insight["title"] = title
-            insight["bullets"] = bullets_in
-            insight["tags"] = tags_norm
-
-            # Quick validity check and controlled degradation
-            missing = [k for k in required_fields if k not in insight]
-            if missing:
-                _logging.getLogger("ingest").warning(
-                    "llm_invalid_insight_missing_fields",
-                    extra={"missing": missing, "insight_preview": {"title": title}},
-                )
-                # Fill sane defaults to avoid pipeline failure
-                insight.setdefault("summary", "")
-                insight.setdefault("bullets", [])
-                insight.setdefault("tags", [])
-                insight.setdefault("confidence", 0.0)
-
-            rendered = self.llm.render_note_markdown(insight)
-            front: Dict[str, Any] = {}
-            body = rendered
-            if rendered.startswith("---"):
-                parts = rendered.split("---", 2)
-                if len(parts) == 3:
-                    _, fm, body = parts
-                    front = _load_yaml(fm)
-                    body = body.lstrip("\n")
-
-            # Prefer normalized server-side values over model/frontmatter
-            title = front.get("title") or title
-            tags = front.get("tags") or tags_norm
-
-            fm_meta = {k: v for k, v in front.items() if k not in {"title", "tags"}}
-            meta = {**insight.get("meta", {}), **fm_meta}
-
-            slug = _slugify(title)
-
-            # Generate server-side created timestamp if not provided
-            from datetime import datetime, timezone
-            created_str = meta.get("created")
-            if not created_str:
-                created_str = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-            fs_note = FsNote(
-                slug=slug,
-                title=title,
-                tags=tags,
-                body=body,
-                created=created_str,
-                source_url=meta.get("source_url"),
-                author=meta.get("source_author"),
-                dt=meta.get("source_dt"),
-                topic_id=meta.get("topic_id"),
-                channel=meta.get("source_channel"),
-            )
-            self.storage._write_note_file(fs_note)
-
-            meta_mapping = {
-                "source_author": "author",
-                "source_dt": "dt",
-                "source_channel": "channel",
-            }
-            allowed_fields = {"source_url", "author", "dt", "topic_id", "channel"}
-            db_meta: Dict[str, Any] = {}
-            for key, value in meta.items():
-                mapped = meta_mapping.get(key, key)
-                if mapped in allowed_fields:
-                    # Normalize empty strings to None
-                    if isinstance(value, str) and not value.strip():
-                        value = None
-                    db_meta[mapped] = value
-
-            note = await self.note_repo.create(
-                id=slug,
-                title=title,
-                file_path=str(self.storage.notes_dir / f"{slug}.md"),
-                tags=tags,
-                **db_meta,
+        # Validate and normalize insight fields server-side
+        title = str(insight.get("title", "")).strip() or "untitled"
+        if len(title) > 80:
+            title = title[:77] + "..."
+        bullets_in = [str(b) for b in (insight.get("bullets") or []) if str(b).strip()]
+        bullets_in = _dedup_preserve_order(bullets_in)
+        tags_in = [str(t) for t in (insight.get("tags") or []) if str(t).strip()]
+        tags_norm = _dedup_preserve_order([_normalize_tag(t) for t in tags_in if _normalize_tag(t)])
+
+        # Write back normalized values for downstream prompt
+        insight["title"] = title
+        insight["bullets"] = bullets_in
+        insight["tags"] = tags_norm
+
+        # Quick validity check and controlled degradation
+        missing = [k for k in required_fields if k not in insight]
+        if missing:
+            _logging.getLogger("ingest").warning(
+                "llm_invalid_insight_missing_fields",
+                extra={"missing": missing, "insight_preview": {"title": title}},
             )
-
-            chunk_texts = _chunk_text(body)
-            embeddings = self.embeddings.embed_texts(chunk_texts)
-            chunks_for_index = []
-            for pos, (ch_text, emb) in enumerate(zip(chunk_texts, embeddings)):
-                chunk = await self.chunk_repo.create(note_id=note.id, pos=pos)
-                chunks_for_index.append(
-                    {
-                        "chunk_id": chunk.id,
-                        "note_id": note.id,
-                        "pos": pos,
-                        "text": ch_text,
-                        "embedding": emb,
-                    }
-                )
-            if chunks_for_index:
-                self.index.upsert_chunks(chunks_for_index)
-            notes.append(note)
+            # Fill sane defaults to avoid pipeline failure
+            insight.setdefault("summary", "")
+            insight.setdefault("bullets", [])
+            insight.setdefault("tags", [])
+            insight.setdefault("confidence", 0.0)
+
+        rendered = self.renderer.render(insight)
+        front: Dict[str, Any] = {}
+        body = rendered
+        if rendered.startswith("---"):
+            parts = rendered.split("---", 2)
+            if len(parts) == 3:
+                _, fm, body = parts
+                front = _load_yaml(fm)
+                body = body.lstrip("\n")
+
+        # Prefer normalized server-side values over model/frontmatter
+        title = front.get("title") or title
+        tags = front.get("tags") or tags_norm
+
+        fm_meta = {k: v for k, v in front.items() if k not in {"title", "tags"}}
+        meta = {**insight.get("meta", {}), **fm_meta}
+
+        slug = _slugify(title)
+
+        # Generate server-side created timestamp if not provided
+        from datetime import datetime, timezone
+        created_str = meta.get("created")
+        if not created_str:
+            created_str = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        fs_note = FsNote(
+            slug=slug,
+            title=title,
+            tags=tags,
+            body=body,
+            created=created_str,
+            source_url=meta.get("source_url"),
+            author=meta.get("source_author"),
+            dt=meta.get("source_dt"),
+            topic_id=meta.get("topic_id"),
+            channel=meta.get("source_channel"),
+        )
+
+        meta_mapping = {
+            "source_author": "author",
+            "source_dt": "dt",
+            "source_channel": "channel",
+        }
+        allowed_fields = {"source_url", "author", "dt", "topic_id", "channel"}
+        db_meta: Dict[str, Any] = {}
+        for key, value in meta.items():
+            mapped = meta_mapping.get(key, key)
+            if mapped in allowed_fields:
+                # Normalize empty strings to None
+                if isinstance(value, str) and not value.strip():
+                    value = None
+                db_meta[mapped] = value
+        return fs_note, db_meta
+
+    async def _write_moc(
+        self,
+        topics_info: Dict[str, Any],
+        insights: List[Dict[str, Any]],
+        stored: List[Tuple[models.Note, FsNote]],
+    ) -> None:
+        """File this batch in the persisted topic index and re-render the MOC."""
+        slug_by_id = {
+            ins.get("id"): fs_note.slug
+            for ins, (_, fs_note) in zip(insights, stored)
+            if ins.get("id")
+        }
+        insight_map = {ins.get("id"): ins for ins in insights if ins.get("id")}
         topics_for_moc = []
         for topic in topics_info.get("topics", []):
             notes_list = []
             for iid in topic.get("insight_ids", []):
                 ins = insight_map.get(iid)
-                if ins:
+                if ins and iid in slug_by_id:
                     notes_list.append(
                         {
+                            "slug": slug_by_id[iid],
                             "title": ins.get("title", ""),
                             "summary": ins.get("summary", ""),
                         }
@@ -306,9 +828,90 @@ class IngestText:
                 }
             )
 
-        topics_json = json.dumps({"topics": topics_for_moc}, ensure_ascii=False)
-        moc = self.llm.generate_moc(topics_json)
-        self.storage.moc_dir.mkdir(parents=True, exist_ok=True)
-        self.storage.moc_file.write_text(moc.rstrip() + "\n", encoding="utf-8")
+        with self.timings.stage("moc", count=len(stored)):
+            # Takes the vault's file lock and may first scan the whole vault
+            await asyncio.to_thread(
+                self.storage.record_topics,
+                topics_for_moc,
+                [fs_note for _, fs_note in stored],
+            )
+        if self.moc_summary:
+            self._summarize_moc_later(topics_for_moc)
 
-        return notes
+    def _summarize_moc_later(self, topics: List[Dict[str, Any]]) -> None:
+        """Write an LLM overview of this batch's topics off the request path."""
+        import logging as _logging
+
+        topics_json = json.dumps({"topics": topics}, ensure_ascii=False)
+        summary_file = self.storage.moc_dir / "topics_summary.md"
+
+        def run() -> None:
+            try:
+                with llm_step("moc"):
+                    moc = self.llm.generate_moc(topics_json)
+                summary_file.write_text(moc.rstrip() + "\n", encoding="utf-8")
+            except Exception:
+                _logging.getLogger("ingest").exception("moc_summary_failed")
+
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(
+            executor_for(Priority.INGEST), contextvars.copy_context().run, run
+        )
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+
+def build_ingest_text(
+    llm: LLMClient,
+    storage: NotesStorage,
+    embeddings: EmbeddingsProvider,
+    index: VectorIndex,
+    session: AsyncSession,
+    lang: str = "en",
+) -> IngestText:
+    """Assemble :class:`IngestText` as configured in settings.
+
+    Shared by the API request path and the background ingest worker.
+    """
+    settings = get_settings()
+    autolinker = None
+    if getattr(settings, "autolink_engine", "llm") == "embedding":
+        autolinker = EmbeddingAutolinker(
+            embeddings,
+            index,
+            storage,
+            threshold=getattr(settings, "autolink_threshold", 0.75),
+            max_links=getattr(settings, "autolink_max_links", 5),
+        )
+    lang = lang or "en"
+    if getattr(settings, "note_renderer", "template") == "template":
+        renderer: LLMNoteRenderer | TemplateNoteRenderer = TemplateNoteRenderer(lang)
+    else:
+        renderer = LLMNoteRenderer(llm, lang)
+    return IngestText(
+        llm,
+        storage,
+        embeddings,
+        index,
+        NoteRepo(session),
+        ChunkRepo(session),
+        autolinker=autolinker,
+        renderer=renderer,
+        stream_insights=bool(getattr(settings, "llm_stream_insights", False)),
+        concurrency=int(getattr(settings, "ingest_concurrency", 4)),
+        fingerprints=(
+            FingerprintRepo(session)
+            if getattr(settings, "ingest_dedup", True)
+            else None
+        ),
+        near_duplicate_distance=int(
+            getattr(settings, "ingest_near_duplicate_distance", 7)
+        ),
+        moc_summary=bool(getattr(settings, "moc_llm_summary", False)),
+        long_document_tokens=int(getattr(settings, "ingest_long_document_tokens", 3000)),
+        segment_tokens=int(getattr(settings, "ingest_segment_tokens", 1500)),
+        chunker=MarkdownChunker(
+            target_tokens=int(getattr(settings, "chunk_target_tokens", 200)),
+            overlap_sentences=int(getattr(settings, "chunk_overlap_sentences", 1)),
+        ),
+    )
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from libs.core.i18n import I18n
+from libs.llm import LLMClient
+from libs.storage.notes_storage import _dump_yaml
+
+
+# Used when config/i18n is not shipped with the runtime image
+_HEADINGS: Dict[str, Dict[str, str]] = {
+    "note_theses": {"en": "Key points", "ru": "Тезисы"},
+    "note_sources": {"en": "Sources", "ru": "Источники"},
+    "note_see_also": {"en": "See also", "ru": "См. также"},
+}
+
+
+def _see_also_section(heading: str, titles: List[str]) -> str:
+    links = [t for t in titles if t][:5]
+    if not links:
+        return ""
+    return "\n".join([f"## {heading}"] + [f"- [[{t}]]" for t in links]) + "\n"
+
+
+class LLMNoteRenderer:
+    """Render note Markdown with one LLM call per insight."""
+
+    def __init__(self, llm: LLMClient, lang: str = "en") -> None:
+        self.llm = llm
+        self.lang = (lang or "en").lower()
+
+    def render(self, insight: Dict[str, Any]) -> str:
+        return self.llm.render_note_markdown(insight)
+
+    def see_also_section(self, titles: List[str]) -> str:
+        """Return a "See also" block to append to an already rendered note."""
+        msg = _HEADINGS["note_see_also"]
+        return _see_also_section(msg.get(self.lang) or msg["en"], titles)
+
+
+class TemplateNoteRenderer:
+    """Render note Markdown deterministically from insight fields.
+
+    Produces the same layout the ``note`` prompt asks the LLM for: YAML
+    frontmatter, summary, key points, sources and "See also" links, with
+    section headings localized via ``config/i18n``.
+    """
+
+    def __init__(self, lang: str = "en", i18n: I18n | None = None) -> None:
+        self.lang = (lang or "en").lower()
+        self.i18n = i18n or I18n(self.lang)
+
+    def _t(self, key: str) -> str:
+        val = self.i18n.t(key)
+        if val != key:
+            return val
+        msg = _HEADINGS.get(key, {})
+        return msg.get(self.lang) or msg.get("en") or key
+
+    def render(self, insight: Dict[str, Any]) -> str:
+        meta: Dict[str, Any] = insight.get("meta") or {}
+
+        def _field(key: str) -> Any:
+            return meta.get(key) or insight.get(key)
+
+        front: Dict[str, Any] = {
+            "title": insight.get("title", ""),
+            "tags": list(insight.get("tags") or []),
+        }
+        for key in ("created", "source_url", "source_author", "source_dt", "topic_id"):
+            value = _field(key)
+            if value:
+                front[key] = value
+
+        lines: List[str] = []
+        summary = str(insight.get("summary") or "").strip()
+        if summary:
+            lines += [summary, ""]
+        bullets = [str(b).strip() for b in insight.get("bullets") or [] if str(b).strip()]
+        if bullets:
+            lines += [f"## {self._t('note_theses')}"]
+            lines += [f"- {b}" for b in bullets]
+            lines.append("")
+        source_url = _field("source_url")
+        if source_url:
+            lines += [f"## {self._t('note_sources')}", f"- {source_url}", ""]
+        see_also = [t for t in insight.get("see_also_candidates") or [] if t][:5]
+        if see_also:
+            lines += [f"## {self._t('note_see_also')}"]
+            lines += [f"- [[{t}]]" for t in see_also]
+            lines.append("")
+
+        body = "\n".join(lines).rstrip()
+        return f"---\n{_dump_yaml(front)}\n---\n\n{body}\n"
+
+    def see_also_section(self, titles: List[str]) -> str:
+        """Return a "See also" block to append to an already rendered note."""
+        return _see_also_section(self._t("note_see_also"), titles)
+
+
+__all__ = ["LLMNoteRenderer", "TemplateNoteRenderer"]
@@ -1,17 +1,174 @@
 from __future__ import annotations
 
-from typing import List, Dict
+import asyncio
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
+from libs.core.fingerprint import normalize_text
+from libs.core.settings import get_settings
 from libs.llm import LLMClient, EmbeddingsProvider
-from libs.rag import VectorIndex
+from libs.llm.scheduler import Priority, executor_for, offload
+from libs.rag import IndexVersion, VectorIndex, mmr, pack_context
 from libs.storage import NotesStorage
+from libs.metrics import llm_step
 
 
 MAX_SNIPPET_LEN = 200
 
+T = TypeVar("T")
+
+# Answer calls that missed their deadline, kept alive until they finish
+_late_answers: set = set()
+
+
+class SearchCache:
+    """Small in-process LRU cache with a TTL for search results.
+
+    Keys include the index version, so entries from before an index write
+    are never hit again; they simply age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 600.0) -> None:
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+@lru_cache
+def get_search_cache() -> SearchCache:
+    """Return the process-wide search cache."""
+    settings = get_settings()
+    return SearchCache(
+        max_entries=int(getattr(settings, "search_cache_size", 512)),
+        ttl=float(getattr(settings, "search_cache_ttl", 600)),
+    )
+
+
+def _copy(fragments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Callers may edit fragments; cached ones must stay intact
+    return [dict(f) for f in fragments]
+
+
+def _fragment(hit: Dict[str, Any]) -> Dict[str, str]:
+    """Result list entry for a hit, with a shortened snippet."""
+    snippet = hit["text"]
+    if len(snippet) > MAX_SNIPPET_LEN:
+        snippet = snippet[: MAX_SNIPPET_LEN - 3].rstrip() + "..."
+    return {
+        "note_id": hit["note_id"],
+        "title": hit.get("title", ""),
+        "url": f"obsidian://{hit['note_id']}",
+        "snippet": snippet,
+    }
+
+
+async def _until(aw: Awaitable[T], deadline: Optional[float]) -> T:
+    """Await ``aw`` until the loop time ``deadline``; ``TimeoutError`` after."""
+    if deadline is None:
+        return await aw
+    return await asyncio.wait_for(aw, max(0.0, deadline - asyncio.get_running_loop().time()))
+
+
+async def _iterate_in_thread(tokens: Iterator[str]) -> AsyncIterator[str]:
+    """Drain a blocking token iterator in a worker thread."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def produce() -> None:
+        try:
+            for token in tokens:
+                if stop.is_set():  # client went away
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, token)
+        except Exception as exc:  # re-raised in the consumer
+            loop.call_soon_threadsafe(queue.put_nowait, exc)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    loop.run_in_executor(
+        executor_for(Priority.INTERACTIVE), contextvars.copy_context().run, produce
+    )
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
 
 class Search:
-    """Run semantic search over notes and compose an LLM answer."""
+    """Run semantic search over notes and compose an LLM answer.
+
+    Every stage is awaited: the embedding, vector index and model clients
+    are blocking, so each call runs in a worker thread only while it blocks
+    instead of holding a threadpool slot for the whole request. Note
+    hydration runs concurrently with fetching the answer context. With a
+    ``timeout`` (seconds) retrieval must finish within the deadline or
+    ``TimeoutError`` is raised. The results are still returned when the
+    answer misses it, with ``None`` for the answer; the model call cannot be
+    stopped mid-request, so it runs to completion and, with a cache, its
+    answer is cached for the next identical search.
+
+    ``fetch_factor`` × k candidates are retrieved with their vectors and
+    narrowed to k by maximal marginal relevance (``mmr_lambda`` = 1 turns
+    this off). The answer model gets those hits packed into passages within
+    ``context_tokens``: adjacent chunks of one note are merged and their
+    repeated sentences dropped. With ``neighbors`` > 0 the chunks up to that
+    many positions before and after each hit are fetched first (one batched
+    lookup, no extra vector search), so passages read as coherent text.
+
+    With a ``cache`` and an index ``version``, retrieved hits and answers
+    are cached per normalized query, ``k``, ``user`` and index version; any
+    index write bumps the version, so ingests are visible to the next search
+    right away.
+    """
 
     def __init__(
         self,
@@ -19,33 +176,233 @@ class Search:
         embeddings: EmbeddingsProvider,
         index: VectorIndex,
         storage: NotesStorage,
+        cache: SearchCache | None = None,
+        version: IndexVersion | None = None,
+        user: str | None = None,
+        mmr_lambda: float = 0.5,
+        fetch_factor: int = 3,
+        context_tokens: int = 800,
+        neighbors: int = 0,
+        timeout: float | None = None,
     ) -> None:
         self.llm = llm
         self.embeddings = embeddings
         self.index = index
         self.storage = storage
+        self.cache = cache if version is not None else None
+        self.version = version
+        self.user = user
+        self.mmr_lambda = mmr_lambda
+        self.fetch_factor = max(1, fetch_factor)
+        self.context_tokens = context_tokens
+        self.neighbors = max(0, neighbors)
+        self.timeout = timeout
 
     # ------------------------------------------------------------------
-    def __call__(self, query: str, k: int = 5) -> tuple[str, List[Dict[str, str]]]:
-        query_vec = self.embeddings.embed_texts([query])[0]
-        hits = self.index.search(query_vec, k)
-        fragments: List[Dict[str, str]] = []
+    def _key(self, kind: str, query: str, k: int) -> tuple:
+        return (kind, normalize_text(query), k, self.user, self.version.current())
+
+    def _deadline(self) -> Optional[float]:
+        if not self.timeout:
+            return None
+        return asyncio.get_running_loop().time() + self.timeout
+
+    async def retrieve(self, query: str, k: int = 5) -> List[Dict[str, str]]:
+        """Fragments for ``query`` without composing an answer (no LLM call)."""
+        hits, _ = await _until(self._hits(query, k), self._deadline())
+        return [_fragment(hit) for hit in hits]
+
+    async def _hits(
+        self, query: str, k: int, with_context: bool = False
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Hydrated hits, plus their neighbour chunks when ``with_context``."""
+        if self.cache is None:
+            return await self._hits_uncached(query, k, with_context)
+        key = self._key("retrieve", query, k)
+        cached = self.cache.get(key)
+        if cached is not None:
+            hits = _copy(cached)
+            return hits, (await self._neighbor_chunks(hits) if with_context else [])
+        hits, extra = await self._hits_uncached(query, k, with_context)
+        self.cache.set(key, _copy(hits))
+        return hits, extra
+
+    async def _hits_uncached(
+        self, query: str, k: int, with_context: bool
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        query_vec = (
+            await offload(Priority.QUERY_EMBEDDING, self._embed_query, query)
+        )[0]
+        if self.mmr_lambda < 1 and self.fetch_factor > 1:
+            candidates = await asyncio.to_thread(
+                self.index.search, query_vec, k * self.fetch_factor, with_vectors=True
+            )
+            hits = mmr(query_vec, candidates, k, self.mmr_lambda)
+        else:
+            hits = await asyncio.to_thread(self.index.search, query_vec, k)
+        # One batched metadata lookup instead of reading every hit's file,
+        # overlapped with the neighbour lookup for the answer context
+        hydrate = asyncio.to_thread(
+            self.storage.read_meta, [hit["note_id"] for hit in hits]
+        )
+        if with_context:
+            metas, extra = await asyncio.gather(hydrate, self._neighbor_chunks(hits))
+        else:
+            metas, extra = await hydrate, []
+        out: List[Dict[str, Any]] = []
         for hit in hits:
-            try:
-                note = self.storage.read_note(hit["note_id"])
-            except FileNotFoundError:
+            meta = metas.get(hit["note_id"])
+            if meta is None:
                 # Skip hits pointing to notes that no longer exist
                 continue
-            snippet = hit["text"]
-            if len(snippet) > MAX_SNIPPET_LEN:
-                snippet = snippet[: MAX_SNIPPET_LEN - 3].rstrip() + "..."
-            fragments.append(
-                {
-                    "note_id": hit["note_id"],
-                    "title": note.title,
-                    "url": f"obsidian://{note.slug}",
-                    "snippet": snippet,
-                }
+            item = {k: v for k, v in hit.items() if k != "embedding"}
+            item["title"] = meta.get("title", "")
+            out.append(item)
+        return out, extra
+
+    def _embed_query(self, query: str) -> List[List[float]]:
+        with llm_step("query_embedding"):
+            return self.embeddings.embed_texts([query])
+
+    async def _neighbor_chunks(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Chunks around the hits that are not hits themselves."""
+        if not self.neighbors:
+            return []
+        have = {(h.get("note_id"), h.get("pos")) for h in hits}
+        wanted: Dict[str, set] = {}
+        for hit in hits:
+            if hit.get("pos") is None:
+                continue
+            for pos in range(hit["pos"] - self.neighbors, hit["pos"] + self.neighbors + 1):
+                if pos >= 0 and (hit["note_id"], pos) not in have:
+                    wanted.setdefault(hit["note_id"], set()).add(pos)
+        if not wanted:
+            return []
+        try:
+            return await asyncio.to_thread(self.index.fetch_chunks, wanted)
+        except Exception:
+            import logging as _logging
+
+            # Expansion is best effort; the hits alone still make a context
+            _logging.getLogger("search").warning("neighbor_fetch_failed", exc_info=True)
+            return []
+
+    def _expand(
+        self, hits: List[Dict[str, Any]], chunks: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Place the neighbouring chunks of every hit right after it."""
+        by_key = {(c.get("note_id"), c.get("pos")): c for c in chunks}
+        out: List[Dict[str, Any]] = []
+        for hit in hits:
+            out.append(hit)
+            if hit.get("pos") is None:
+                continue
+            for pos in range(hit["pos"] - self.neighbors, hit["pos"] + self.neighbors + 1):
+                chunk = by_key.pop((hit["note_id"], pos), None)
+                if chunk is not None:
+                    out.append({**chunk, "title": hit.get("title", "")})
+        return out
+
+    def _context(
+        self, hits: List[Dict[str, Any]], chunks: List[Dict[str, Any]]
+    ) -> List[Dict[str, str]]:
+        """Passages for the answer prompt, in the fragment layout."""
+        if chunks:
+            hits = self._expand(hits, chunks)
+        return [
+            {
+                "note_id": p["note_id"],
+                "title": p.get("title", ""),
+                "url": f"obsidian://{p['note_id']}",
+                "snippet": p["text"],
+            }
+            for p in pack_context(hits, self.context_tokens)
+        ]
+
+    async def __call__(
+        self, query: str, k: int = 5
+    ) -> tuple[Optional[str], List[Dict[str, str]]]:
+        if self.cache is not None:
+            key = self._key("answer", query, k)
+            hit = self.cache.get(key)
+            if hit is not None:
+                return hit[0], _copy(hit[1])
+        deadline = self._deadline()
+        hits, extra = await _until(self._hits(query, k, with_context=True), deadline)
+        fragments = [_fragment(h) for h in hits]
+        answer_call = asyncio.ensure_future(
+            offload(
+                Priority.INTERACTIVE,
+                self.llm.answer_from_context,
+                query,
+                self._context(hits, extra),
             )
-        answer = self.llm.answer_from_context(query, fragments)
+        )
+        try:
+            answer = await _until(asyncio.shield(answer_call), deadline)
+        except asyncio.TimeoutError:
+            import logging as _logging
+
+            _logging.getLogger("search").warning(
+                "search_answer_timeout", extra={"timeout": self.timeout}
+            )
+            self._keep_late_answer(
+                answer_call, key if self.cache is not None else None, fragments
+            )
+            return None, fragments
+        if self.cache is not None:
+            self.cache.set(key, (answer, _copy(fragments)))
         return answer, fragments
+
+    def _keep_late_answer(
+        self,
+        answer_call: asyncio.Future,
+        key: Optional[Hashable],
+        fragments: List[Dict[str, str]],
+    ) -> None:
+        """Cache the answer of a call that missed its deadline once it is done."""
+        fragments = _copy(fragments)
+
+        def done(fut: asyncio.Future) -> None:
+            _late_answers.discard(fut)
+            if fut.cancelled() or fut.exception() is not None:
+                return
+            if self.cache is not None and key is not None:
+                self.cache.set(key, (fut.result(), fragments))
+
+        _late_answers.add(answer_call)
+        answer_call.add_done_callback(done)
+
+    async def stream(
+        self, query: str, k: int = 5
+    ) -> tuple[List[Dict[str, str]], AsyncIterator[str]]:
+        """Retrieve fragments and return them with a lazy answer token stream."""
+        if self.cache is not None:
+            key = self._key("answer", query, k)
+            hit = self.cache.get(key)
+            if hit is not None:
+                return _copy(hit[1]), _replay(hit[0])
+        hits, extra = await _until(
+            self._hits(query, k, with_context=True), self._deadline()
+        )
+        fragments = [_fragment(h) for h in hits]
+        tokens = _iterate_in_thread(
+            self.llm.stream_answer_from_context(query, self._context(hits, extra))
+        )
+        if self.cache is None:
+            return fragments, tokens
+        return fragments, self._cache_stream(key, tokens, _copy(fragments))
+
+    async def _cache_stream(
+        self, key: tuple, tokens: AsyncIterator[str], fragments: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        """Pass tokens through and cache the answer once the stream completes."""
+        parts: List[str] = []
+        async for token in tokens:
+            parts.append(token)
+            yield token
+        self.cache.set(key, ("".join(parts), fragments))
+
+
+async def _replay(answer: str) -> AsyncIterator[str]:
+    yield answer
@@ -1,7 +1,7 @@
 import sys
 from pathlib import Path
 from types import SimpleNamespace
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 import os
 
 import pytest
@@ -83,6 +83,20 @@ class DummyIngestText:
         self.storage.save_note(note)
         return [SimpleNamespace(id=note.slug, title=note.title)]
 
+    async def ingest_batch(self, items):
+        results = []
+        for n, item in enumerate(items):
+            note = Note(slug=f"n{n}", title=f"n{n}", tags=[], body=item["text"])
+            self.storage.save_note(note)
+            results.append(
+                SimpleNamespace(
+                    notes=[SimpleNamespace(id=note.slug, title=note.title)],
+                    duplicate=False,
+                    error=None,
+                )
+            )
+        return results
+
 
 @pytest.fixture()
 def client(tmp_path):
@@ -91,7 +105,7 @@ def client(tmp_path):
     storage = NotesStorage(tmp_path / "vault")
     app.dependency_overrides[get_storage] = lambda: storage
     app.dependency_overrides[ingest_text_uc] = lambda: DummyIngestText(storage)
-    app.dependency_overrides[search_uc] = lambda: MagicMock(return_value=("answer", []))
+    app.dependency_overrides[search_uc] = lambda: AsyncMock(return_value=("answer", []))
     app.dependency_overrides[current_user] = lambda: SimpleNamespace(id=1, telegram_id=1)
 
     with TestClient(app) as test_client:
@@ -7,6 +7,43 @@ def test_ingest_text_endpoint(client):
     assert note["content"] == "hello"
 
 
+def test_ingest_batch_endpoint(client):
+    response = client.post(
+        "/ingest/batch",
+        json={"items": [{"text": "one"}, {"text": "two", "author": "Alice"}]},
+    )
+    assert response.status_code == 201
+    items = response.json()["items"]
+    assert [i["notes"][0]["content"] for i in items] == ["one", "two"]
+    assert items[0]["duplicate"] is False and items[0]["error"] is None
+
+    assert client.post("/ingest/batch", json={"items": []}).status_code == 422
+
+
+def test_ingest_text_server_timing_header(client, monkeypatch):
+    from types import SimpleNamespace
+    from apps.api import main
+    from libs.metrics import StageTimings
+
+    timings = StageTimings()
+    timings.add("embed", 12.5, 3)
+
+    class TimedIngest:
+        async def __call__(self, text):
+            return []
+
+    uc = TimedIngest()
+    uc.timings = timings
+    main.app.dependency_overrides[main.ingest_text_uc] = lambda: uc
+    monkeypatch.setattr(
+        main, "get_settings", lambda: SimpleNamespace(ingest_timing_header=True)
+    )
+
+    response = client.post("/ingest/text", json={"text": "hello"})
+    assert response.status_code == 201
+    assert response.headers["Server-Timing"] == 'embed;dur=12.5;desc="n=3"'
+
+
 def test_health_endpoint(client):
     response = client.get("/health")
     assert response.status_code == 200
@@ -62,6 +99,25 @@ def test_search_endpoint(client):
     assert "items" in data
 
 
+def test_search_retrieve_mode_skips_answer(client):
+    from apps.api import main
+
+    uc = main.app.dependency_overrides[main.search_uc]()
+    uc.retrieve.return_value = [{"note_id": "n1", "title": "N1"}]
+    main.app.dependency_overrides[main.search_uc] = lambda: uc
+
+    response = client.post("/search", json={"query": "hello", "mode": "retrieve"})
+    assert response.status_code == 200
+    assert response.json() == {"answer_md": None, "items": [{"note_id": "n1", "title": "N1"}]}
+    uc.assert_not_awaited()
+
+    response = client.post("/search/answer", json={"query": "hello"})
+    assert response.json() == {"answer_md": "answer"}
+    uc.assert_awaited_once_with("hello", 5)
+
+    assert client.post("/search", json={"query": "q", "mode": "x"}).status_code == 422
+
+
 def test_webhook_secret_validation(client, monkeypatch):
     from types import SimpleNamespace
     from apps.api import main
@@ -76,7 +132,7 @@ def test_webhook_secret_validation(client, monkeypatch):
     assert response.status_code == 403
 
 
-def test_webhook_splits_long_message(client, monkeypatch):
+def test_webhook_ingests_long_message_once(client, monkeypatch):
     from types import SimpleNamespace
     from apps.api import main
 
@@ -86,14 +142,13 @@ def test_webhook_splits_long_message(client, monkeypatch):
         calls.append(text)
 
     monkeypatch.setattr(main, "get_settings", lambda: SimpleNamespace(telegram_webhook_secret="s", telegram_bot_token=""))
-    monkeypatch.setattr(main, "MAX_NOTE_LEN", 10)
     main.app.dependency_overrides[main.ingest_text_uc] = lambda: fake_uc
 
-    payload = {"message": {"forward_date": 1, "text": "a" * 25}}
+    payload = {"message": {"forward_date": 1, "text": "a" * 2500}}
     response = client.post("/telegram/webhook/s", json=payload)
     assert response.status_code == 200
     assert response.json()["status"] == "ok"
-    assert calls == ["a" * 10, "a" * 10, "a" * 5]
+    assert calls == ["a" * 2500]
 
 
 def test_get_note_metadata(client):
@@ -157,3 +212,75 @@ def test_bot_api_token(client, monkeypatch):
         headers={"X-Bot-Api-Token": "s"},
     )
     assert resp.status_code == 201
+
+
+def test_search_stream_endpoint(client):
+    from types import SimpleNamespace
+    from apps.api import main
+
+    items = [{"note_id": "n1", "title": "N1", "url": "obsidian://n1", "snippet": "s"}]
+    async def tokens():
+        for token in ["an", "swer"]:
+            yield token
+
+    async def stream(query, k):
+        return items, tokens()
+
+    uc = SimpleNamespace(stream=stream)
+    main.app.dependency_overrides[main.search_uc] = lambda: uc
+
+    response = client.get("/search/stream", params={"query": "hello"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    body = response.text
+    assert body.index("event: items") < body.index("event: token")
+    assert 'data: {"text": "an"}' in body
+    assert body.rstrip().endswith("event: done\ndata: {}")
+
+
+def test_search_timeout_returns_504(client):
+    from unittest.mock import AsyncMock
+    from apps.api import main
+
+    uc = AsyncMock(side_effect=TimeoutError)
+    main.app.dependency_overrides[main.search_uc] = lambda: uc
+
+    response = client.post("/search", json={"query": "hello"})
+    assert response.status_code == 504
+
+
+def test_ingest_text_async_enqueues_job(client, tmp_path):
+    import asyncio
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from apps.api import main
+    from libs.db import models
+    from libs.db.database import Base
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'api.db'}")
+    maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def init():
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all,
+                tables=[models.User.__table__, models.IngestJob.__table__],
+            )
+
+    asyncio.run(init())
+
+    async def sqlite_session():
+        async with maker() as session:
+            yield session
+            await session.commit()
+
+    main.app.dependency_overrides[main.db_session] = sqlite_session
+
+    response = client.post("/ingest/text?async=true", json={"text": "hello"})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.headers["location"] == f"/jobs/{job_id}"
+
+    job = client.get(f"/jobs/{job_id}").json()
+    assert job["status"] == "queued"
+    assert job["result"] is None
+    assert client.get("/jobs/unknown").status_code == 404
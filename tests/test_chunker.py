@@ -0,0 +1,55 @@
+from libs.rag import chunk_markdown
+
+
+NOTE = """Intro sentence. Another one!
+
+## Key points
+- first point
+- second point. It has two sentences.
+
+```python
+x = 1
+
+y = 2
+```
+
+## Sources
+- http://example.com
+"""
+
+
+def test_offsets_and_anchors_follow_structure() -> None:
+    chunks = chunk_markdown(NOTE, target_tokens=12, overlap_sentences=0)
+
+    for c in chunks:
+        assert NOTE[c.start : c.end] == c.text
+    assert chunks[0].anchor is None
+    assert chunks[0].text == "Intro sentence. Another one!"
+    anchors = [c.anchor for c in chunks]
+    assert "Key points" in anchors and "Sources" in anchors
+    # Code fences are never split, even on blank lines inside them
+    assert any(c.text.startswith("```python") and c.text.endswith("```") for c in chunks)
+    # Headings start chunks and sentences are never cut
+    assert all(not c.text.startswith("point") for c in chunks)
+
+
+def test_short_note_stays_in_one_chunk() -> None:
+    chunks = chunk_markdown(NOTE)
+    assert len(chunks) == 1
+    assert chunks[0].text == NOTE.rstrip()
+
+
+def test_long_sections_overlap_by_sentence_and_respect_caps() -> None:
+    text = "## Intro\n" + " ".join(f"Sentence {i} is here." for i in range(100))
+    chunks = chunk_markdown(text, target_tokens=40, overlap_sentences=1)
+
+    assert len(chunks) > 3
+    assert all(c.anchor == "Intro" for c in chunks)
+    assert all(c.tokens <= 40 for c in chunks)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        last_sentence = prev.text.rsplit(". ", 1)[-1]
+        assert nxt.text.startswith(last_sentence)
+
+    words = chunk_markdown("word " * 600, max_chars=500)
+    assert all(len(c.text) <= 500 for c in words)
+    assert all(not c.text.startswith(" ") for c in words)
@@ -0,0 +1,33 @@
+from libs.core.fingerprint import Fingerprint, from_signed64, hamming, to_signed64
+
+POST = (
+    "Команда выпустила новую версию библиотеки для векторного поиска. "
+    "Индексация стала в два раза быстрее, а потребление памяти снизилось на треть. "
+    "Подробности и бенчмарки в блоге проекта."
+)
+
+
+def test_exact_fingerprint_ignores_case_and_whitespace() -> None:
+    a = Fingerprint.of(POST)
+    b = Fingerprint.of("  " + POST.upper().replace(" ", "  \n") + "\n")
+    assert a.sha256 == b.sha256
+    assert a.sha256 != Fingerprint.of(POST + " Ещё.").sha256
+
+
+def test_simhash_separates_near_and_different_texts() -> None:
+    base = Fingerprint.of(POST)
+    near = Fingerprint.of(POST + " 🔥 Подписывайтесь!")
+    other = Fingerprint.of(
+        "Рецепт пирога с яблоками: мука, сахар, яйца и корица. Выпекать сорок минут."
+    )
+    assert hamming(base.simhash, near.simhash) <= 10
+    assert hamming(base.simhash, near.simhash) < hamming(base.simhash, other.simhash)
+    assert hamming(base.simhash, other.simhash) > 10
+
+
+def test_bands_and_signed_storage_roundtrip() -> None:
+    fp = Fingerprint.of(POST)
+    assert len(fp.bands) == 8
+    assert sum(b << (8 * i) for i, b in enumerate(fp.bands)) == fp.simhash
+    assert from_signed64(to_signed64(fp.simhash)) == fp.simhash
+    assert -(2**63) <= to_signed64(2**64 - 1) < 2**63
@@ -91,3 +91,85 @@ def test_missing_prompt_key(monkeypatch, tmp_path: Path) -> None:
     monkeypatch.setattr(client, "_call", lambda m, msgs: "{}")
     with pytest.raises(LLMClientError):
         client.group_topics([])
+
+
+def test_stream_answer_from_context(monkeypatch):
+    client = make_client()
+    captured = {}
+
+    def fake_stream(model, input):
+        captured["model"] = model
+        captured["input"] = input
+        return iter(["Hel", "", "lo"])
+
+    import libs.llm.replicate_client as rc
+
+    monkeypatch.setattr(rc.replicate, "stream", fake_stream, raising=False)
+    chunks = list(client.stream_answer_from_context("q", [{"title": "t", "snippet": "s"}]))
+    assert chunks == ["Hel", "lo"]
+    assert captured["model"] == "openai/gpt-5-nano"
+    assert captured["input"]["messages"][1]["role"] == "user"
+
+
+def test_call_records_step_metrics(monkeypatch):
+    from libs.metrics import collect_calls, get_metrics, llm_step
+
+    client = make_client()
+    outputs = iter(["", '{"related_titles": []}'])
+
+    import libs.llm.replicate_client as rc
+
+    monkeypatch.setattr(rc.replicate, "run", lambda model, input: next(outputs))
+    get_metrics().reset()
+    with collect_calls() as calls:
+        assert client.find_autolinks("t", "s", ["A"]) == []
+
+    assert len(calls) == 1
+    rec = calls[0]
+    assert (rec.kind, rec.step) == ("llm", "autolink")
+    assert rec.model.startswith("openai/gpt-5-structured")
+    assert rec.retries == 1 and not rec.error
+    assert rec.input_chars > 0 and rec.output_chars == len('{"related_titles": []}')
+    snapshot = get_metrics().snapshot()["calls"]
+    assert snapshot[0]["step"] == "autolink" and snapshot[0]["count"] == 1
+
+
+def test_array_item_parser_yields_closed_objects():
+    from libs.llm.json_stream import ArrayItemParser
+
+    parser = ArrayItemParser("insights")
+    raw = '```json\n{"insights": [{"id": "i1", "title": "a \\"}\\" b", "tags": ["x"]}, {"id": "i2", "meta": {"k": 1}}]}\n```'
+    seen = []
+    for i in range(0, len(raw), 7):
+        seen.append(parser.feed(raw[i : i + 7]))
+    items = [item for batch in seen for item in batch]
+    assert [i["id"] for i in items] == ["i1", "i2"]
+    assert items[0]["title"] == 'a "}" b'
+    assert items[1]["meta"] == {"k": 1}
+    # The first object is emitted before the stream finishes
+    assert seen.index([items[0]]) < len(seen) - 1
+
+
+def test_array_item_parser_logs_invalid_items(caplog):
+    from libs.llm.json_stream import ArrayItemParser
+
+    parser = ArrayItemParser("insights")
+    with caplog.at_level("WARNING", logger="llm"):
+        items = parser.feed('{"insights": [{"id": "i1", "x": tru}, {"id": "i2"}]}')
+    assert items == [{"id": "i2"}]
+    assert [r.message for r in caplog.records] == ["stream_array_item_invalid"]
+
+
+def test_iter_structured_notes_streams_insights(monkeypatch):
+    client = make_client()
+    payload = json.dumps({"insights": [{"id": "i1"}, {"id": "i2"}]})
+
+    import libs.llm.replicate_client as rc
+
+    monkeypatch.setattr(
+        rc.replicate, "stream", lambda model, input: iter(payload), raising=False
+    )
+    monkeypatch.setattr(
+        client, "generate_structured_notes", lambda text: pytest.fail("no fallback")
+    )
+    assert [i["id"] for i in client.iter_structured_notes("text")] == ["i1", "i2"]
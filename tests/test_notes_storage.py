@@ -69,3 +69,63 @@ def test_export_zip(tmp_path: Path) -> None:
 
     with zipfile.ZipFile(zip_path, "r") as zf:
         assert "10_Notes/n1.md" in zf.namelist()
+
+
+def test_topic_index_updates_incrementally(tmp_path: Path) -> None:
+    storage = NotesStorage(tmp_path / "vault")
+    # Notes written before the index existed are picked up on first update
+    storage.notes_dir.mkdir(parents=True)
+    storage._write_note_file(Note(slug="old", title="Old", tags=["legacy"]))
+
+    storage.record_topics(
+        [{"topic_id": "t1", "title": "Python", "notes": [{"slug": "a", "title": "A"}]}],
+        [Note(slug="a", title="A", tags=["py"])],
+    )
+    # Another batch reuses the id "t1" for a different topic; same title merges
+    storage.record_topics(
+        [
+            {"topic_id": "t1", "title": "Go", "notes": [{"slug": "b", "title": "B"}]},
+            {"topic_id": "t2", "title": "python", "notes": [{"slug": "c", "title": "C"}]},
+        ],
+        [Note(slug="a", title="A", tags=["ml"]), Note(slug="b", title="B", tags=[])],
+    )
+
+    moc = storage.moc_file.read_text()
+    assert "## Go\n- [[b]] B\n" in moc
+    assert "## python\n- [[a]] A\n- [[c]] C\n" in moc
+    assert "## legacy\n- [[old]] Old\n" in moc
+    assert "## ml\n- [[a]] A\n" in moc
+    assert "## py\n" not in moc
+    assert storage.topic_index.path.exists()
+
+
+def test_read_meta_batches_and_tracks_edits(tmp_path: Path) -> None:
+    storage = NotesStorage(tmp_path / "vault")
+    storage.save_note(Note(slug="a", title="A", tags=["x"], body="long body"))
+    storage.save_note(Note(slug="b", title="B", tags=[], body="b"))
+
+    meta = storage.read_meta(["a", "missing", "b", "a"])
+    assert list(meta) == ["a", "b"]
+    assert meta["a"]["title"] == "A" and meta["a"]["tags"] == ["x"]
+
+    # Files edited outside this storage (e.g. in Obsidian) are re-read
+    path = storage.notes_dir / "b.md"
+    path.write_text("---\ntitle: Renamed B\n---\n\nb\n", encoding="utf-8")
+    assert NotesStorage(tmp_path / "vault").read_meta(["b"])["b"]["title"] == "Renamed B"
+
+
+def test_moc_is_written_while_the_index_lock_is_held(tmp_path: Path, monkeypatch) -> None:
+    from libs.storage.topic_index import TopicIndex
+
+    storage = NotesStorage(tmp_path / "vault")
+    held = []
+    render = TopicIndex.render
+
+    def spy(data):
+        held.append(storage.topic_index._lock.locked())
+        return render(data)
+
+    monkeypatch.setattr(TopicIndex, "render", staticmethod(spy))
+    storage.save_note(Note(slug="a", title="A", tags=["py"]))
+    assert held == [True]
+    assert "## py\n- [[a]] A\n" in storage.moc_file.read_text()
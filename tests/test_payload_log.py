@@ -0,0 +1,49 @@
+import logging
+
+from libs.llm.payload_log import PayloadLogger, flush_payload_logs, summarize_payload
+
+
+class _Records(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+class _Exploding:
+    def __repr__(self) -> str:  # pragma: no cover - must never be rendered
+        raise AssertionError("payload serialized while logging is disabled")
+
+
+def test_summarize_payload_caps_vectors_and_text() -> None:
+    out = summarize_payload(
+        {"embeddings": [[0.5] * 768] * 40, "text": "x" * 600}, max_items=2
+    )
+    assert out["embeddings"][0].startswith("<vector dim=768 head=[0.5000")
+    assert out["embeddings"][-1] == "…(+38 items)"
+    assert out["text"].endswith("…(+100 chars)")
+
+
+def test_payload_logger_is_lazy_and_capped() -> None:
+    logger = logging.getLogger("tests.payload_log")
+    logger.propagate = False
+    records = _Records()
+    logger.addHandler(records)
+    try:
+        logger.setLevel(logging.INFO)
+        plog = PayloadLogger(logger, max_chars=50)
+        plog.log(logging.DEBUG, "req %s", _Exploding())
+
+        payload = {"texts": ["t"], "max_output_tokens": 1, "prompt": "p" * 100}
+        plog.log(logging.INFO, "req model=%s input=%s", "m", payload)
+        payload["max_output_tokens"] = 2
+        flush_payload_logs()
+    finally:
+        logger.removeHandler(records)
+
+    assert len(records.messages) == 1
+    msg = records.messages[0]
+    assert msg.startswith('req model=m input={"texts": ["t"], "max_output_tokens": 1')
+    assert msg.endswith("chars)")
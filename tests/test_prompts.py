@@ -0,0 +1,47 @@
+import os
+from pathlib import Path
+
+from libs.llm.prompts import PromptRegistry, validate_prompts
+
+CONFIG = Path(__file__).resolve().parents[1] / "config"
+
+
+def test_shipped_prompts_are_valid() -> None:
+    registry = PromptRegistry(CONFIG)
+    for path in CONFIG.glob("prompts*.yaml"):
+        assert registry.errors(path) == []
+
+
+def test_validate_reports_missing_and_unknown_placeholders() -> None:
+    prompts = {"answer": {"system": "s", "user": "{query} {oops}"}}
+    errors = validate_prompts(prompts)
+    assert "missing section 'insights'" in errors
+    assert any("unknown placeholders: oops" in e for e in errors)
+
+
+def test_registry_caches_until_mtime_changes(tmp_path: Path) -> None:
+    path = tmp_path / "prompts.yaml"
+    path.write_text((CONFIG / "prompts.yaml").read_text(encoding="utf-8"), encoding="utf-8")
+    registry = PromptRegistry(tmp_path)
+
+    first = registry.load(path)
+    assert registry.load(path) is first
+
+    path.write_text("insights:\n  system: changed\n  user: '{raw_text}'\n", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert registry.load(path)["insights"]["system"] == "changed"
+
+
+def test_for_language_falls_back_to_valid_file(tmp_path: Path) -> None:
+    (tmp_path / "prompts.en.yaml").write_text(
+        (CONFIG / "prompts.en.yaml").read_text(encoding="utf-8"), encoding="utf-8"
+    )
+    # Broken Russian prompts must not be served
+    (tmp_path / "prompts.ru.yaml").write_text("answer: {}\n", encoding="utf-8")
+    registry = PromptRegistry(tmp_path)
+    registry.preload()
+
+    path, prompts = registry.for_language("ru")
+    assert path.name == "prompts.en.yaml"
+    assert "answer" in prompts
@@ -0,0 +1,70 @@
+import asyncio
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from libs.db import ChunkRepo, models
+from libs.db.database import Base
+
+
+def test_chunk_bulk_create_uses_one_insert(tmp_path) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'repo.db'}")
+    statements: list[tuple[str, bool]] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, params, context, executemany):
+        statements.append((statement, executemany))
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[models.Chunk.__table__])
+        statements.clear()
+        async with async_sessionmaker(engine)() as session:
+            rows = [{"note_id": "n1", "pos": pos} for pos in range(30)]
+            ids = await ChunkRepo(session).bulk_create(rows)
+            inserts = [s for s in statements if s[0].lstrip().upper().startswith("INSERT")]
+            count = await session.scalar(select(func.count()).select_from(models.Chunk))
+            stored = await session.scalar(
+                select(models.Chunk.id).where(models.Chunk.pos == 7)
+            )
+        await engine.dispose()
+        return ids, inserts, count, stored
+
+    ids, inserts, count, stored = asyncio.run(scenario())
+    assert len(ids) == len(set(ids)) == 30
+    assert inserts == [(inserts[0][0], False)]
+    assert count == 30
+    assert stored == ids[7]
+
+
+def test_fingerprint_repo_finds_exact_and_near_matches(tmp_path) -> None:
+    from libs.core.fingerprint import Fingerprint
+    from libs.db import FingerprintRepo
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'fp.db'}")
+    post = " ".join(f"слово{i}" for i in range(120))
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all, tables=[models.TextFingerprint.__table__]
+            )
+        async with async_sessionmaker(engine)() as session:
+            repo = FingerprintRepo(session)
+            await repo.add(Fingerprint.of(post), ["n1", "n2"])
+            exact = await repo.find_exact(Fingerprint.of(post.upper()))
+            near = await repo.find_near(Fingerprint.of(post + " подписывайтесь"))
+            unchecked = await repo.find_near(
+                Fingerprint.of(post + " подписывайтесь"), max_candidates=0
+            )
+            other = await repo.find_near(
+                Fingerprint.of(" ".join(f"другое{i}" for i in range(120)))
+            )
+        await engine.dispose()
+        return exact, near, unchecked, other
+
+    exact, near, unchecked, other = asyncio.run(scenario())
+    assert exact.note_ids == ["n1", "n2"]
+    assert near is not None and near.id == exact.id
+    assert unchecked is None  # candidates are capped
+    assert other is None
@@ -0,0 +1,35 @@
+from libs.rag import mmr, pack_context
+
+
+def test_mmr_prefers_diverse_hits() -> None:
+    hits = [
+        {"chunk_id": "a1", "embedding": [1.0, 0.0, 0.0]},
+        {"chunk_id": "a2", "embedding": [0.99, 0.01, 0.0]},
+        {"chunk_id": "b", "embedding": [0.7, 0.7, 0.0]},
+    ]
+    query = [1.0, 0.0, 0.0]
+
+    assert [h["chunk_id"] for h in mmr(query, hits, 2, lambda_=1.0)] == ["a1", "a2"]
+    assert [h["chunk_id"] for h in mmr(query, hits, 2, lambda_=0.3)] == ["a1", "b"]
+    # Without stored vectors the relevance order is kept
+    plain = [{"chunk_id": "x"}, {"chunk_id": "y"}]
+    assert mmr(query, plain, 1) == [{"chunk_id": "x"}]
+
+
+def test_pack_context_merges_adjacent_chunks_within_budget() -> None:
+    hits = [
+        {"note_id": "n1", "pos": 1, "text": "Second sentence. Third one.", "score": 0.9},
+        {"note_id": "n2", "pos": 0, "text": "Other note. " * 40, "score": 0.8},
+        {"note_id": "n1", "pos": 0, "text": "First sentence. Second sentence.", "score": 0.7},
+        {"note_id": "n1", "pos": 5, "text": "Far away.", "score": 0.6},
+    ]
+
+    packed = pack_context(hits, max_tokens=60, min_tokens=5)
+
+    assert packed[0]["note_id"] == "n1"
+    assert packed[0]["text"] == "First sentence. Second sentence. Third one."
+    assert packed[0]["chunks"] == 2 and packed[0]["score"] == 0.9
+    # The long passage is cut to the remaining budget; nothing fits after it
+    assert packed[1]["note_id"] == "n2" and packed[1]["text"].endswith("...")
+    assert len(packed[1]["text"]) <= (60 - 11) * 4
+    assert len(packed) == 2
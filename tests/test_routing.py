@@ -0,0 +1,58 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+from libs.llm.replicate_client import ReplicateLLMClient
+from libs.llm.routing import ModelRouter, Target
+
+ROUTES = {
+    "note": {
+        "model": "openai/gpt-5-structured@gpt-5-mini",
+        "budget_ms": 1000,
+        "fallback": "openai/gpt-5-structured@gpt-5-nano",
+    }
+}
+
+
+def test_unrouted_step_uses_default() -> None:
+    router = ModelRouter(ROUTES)
+    assert router.select("llm", "openai/gpt-5-nano") == Target("openai/gpt-5-nano")
+
+
+def test_falls_back_when_over_budget_and_probes_primary() -> None:
+    router = ModelRouter(ROUTES, alpha=1.0, probe_every=3)
+    primary = Target("openai/gpt-5-structured", "gpt-5-mini")
+    fallback = Target("openai/gpt-5-structured", "gpt-5-nano")
+
+    assert router.select("note", "x") == primary
+    router.observe("note", primary, 5000)
+
+    picks = [router.select("note", "x") for _ in range(3)]
+    assert picks == [fallback, fallback, primary]
+
+    # Primary is fast again after the probe -> route recovers
+    router.observe("note", primary, 200)
+    assert router.select("note", "x") == primary
+
+
+def test_call_sends_routed_variant(monkeypatch) -> None:
+    import libs.llm.replicate_client as rc
+    from libs.metrics import llm_step
+
+    captured = {}
+
+    def fake_run(model, input):
+        captured["model"] = model
+        captured["input"] = input
+        return "ok"
+
+    monkeypatch.setattr(rc.replicate, "run", fake_run)
+    monkeypatch.setattr(rc, "get_router", lambda: ModelRouter(ROUTES))
+    with llm_step("note"):
+        client = ReplicateLLMClient(
+            settings=SimpleNamespace(),
+            prompts_path=Path(__file__).resolve().parents[1] / "config" / "prompts.yaml",
+        )
+        client._call("openai/gpt-5-structured", [{"role": "user", "content": "u"}])
+
+    assert captured["model"] == "openai/gpt-5-structured"
+    assert captured["input"]["model"] == "gpt-5-mini"
@@ -0,0 +1,110 @@
+import threading
+import time
+
+from libs.llm.scheduler import (
+    CallScheduler,
+    Priority,
+    executor_for,
+    offload,
+    priority_for_step,
+)
+
+
+def _wait_queued(scheduler: CallScheduler, n: int) -> None:
+    deadline = time.monotonic() + 2
+    while scheduler.queued < n and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_interactive_calls_jump_the_ingest_queue() -> None:
+    scheduler = CallScheduler(max_concurrency=1)
+    order: list[str] = []
+    release = threading.Event()
+
+    def hold() -> None:
+        with scheduler.slot(Priority.INGEST):
+            release.wait(2)
+
+    def call(name: str, priority: Priority) -> None:
+        with scheduler.slot(priority):
+            order.append(name)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    while scheduler.active < 1:
+        time.sleep(0.001)
+    ingest = threading.Thread(target=call, args=("ingest", Priority.INGEST))
+    ingest.start()
+    _wait_queued(scheduler, 1)
+    answer = threading.Thread(target=call, args=("answer", Priority.INTERACTIVE))
+    answer.start()
+    _wait_queued(scheduler, 2)
+
+    release.set()
+    for t in (holder, ingest, answer):
+        t.join(2)
+    assert order == ["answer", "ingest"]
+
+
+def test_reserved_slots_are_kept_for_interactive() -> None:
+    scheduler = CallScheduler(max_concurrency=2, reserved_interactive=1)
+    release = threading.Event()
+
+    def hold() -> None:
+        with scheduler.slot(Priority.INGEST):
+            release.wait(2)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    while scheduler.active < 1:
+        time.sleep(0.001)
+
+    blocked = threading.Thread(target=hold)
+    blocked.start()
+    _wait_queued(scheduler, 1)
+    # Second ingest call waits, but a search answer still gets the reserved slot
+    with scheduler.slot(Priority.INTERACTIVE) as waited:
+        assert scheduler.active == 2
+    assert waited < 1000
+
+    release.set()
+    holder.join(2)
+    blocked.join(2)
+    assert scheduler.active == 0
+
+
+def test_priority_for_step() -> None:
+    assert priority_for_step("answer") is Priority.INTERACTIVE
+    assert priority_for_step("query_embedding") is Priority.QUERY_EMBEDDING
+    assert priority_for_step("insights") is Priority.INGEST
+
+
+def test_queued_ingest_calls_do_not_take_threads_from_search() -> None:
+    import asyncio
+
+    scheduler = CallScheduler(max_concurrency=2, reserved_interactive=1)
+    release = threading.Event()
+
+    def ingest_call() -> None:
+        with scheduler.slot(Priority.INGEST):
+            release.wait(5)
+
+    def answer_call() -> str:
+        with scheduler.slot(Priority.INTERACTIVE):
+            return "answer"
+
+    async def scenario() -> str:
+        # More ingest calls than the ingest pool has threads, all blocked
+        pending = [
+            asyncio.ensure_future(offload(Priority.INGEST, ingest_call))
+            for _ in range(executor_for(Priority.INGEST)._max_workers + 2)
+        ]
+        try:
+            return await asyncio.wait_for(
+                offload(Priority.INTERACTIVE, answer_call), timeout=2
+            )
+        finally:
+            release.set()
+            await asyncio.gather(*pending)
+
+    assert asyncio.run(scenario()) == "answer"
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from libs.llm.singleflight import SingleFlight, payload_key
+
+
+def _run_concurrently(flight: SingleFlight, fn, n: int = 3):
+    results: list = []
+    threads = [
+        threading.Thread(target=lambda: results.append(_safe(flight, fn)))
+        for _ in range(n)
+    ]
+    for t in threads:
+        t.start()
+        time.sleep(0.02)
+    return threads, results
+
+
+def _safe(flight: SingleFlight, fn):
+    try:
+        return flight.do("k", fn)
+    except Exception as exc:
+        return exc
+
+
+def test_concurrent_identical_calls_share_one_execution() -> None:
+    flight = SingleFlight()
+    release = threading.Event()
+    calls: list[int] = []
+
+    def fn():
+        calls.append(1)
+        release.wait(2)
+        return "out"
+
+    threads, results = _run_concurrently(flight, fn)
+    release.set()
+    for t in threads:
+        t.join(2)
+
+    assert calls == [1]
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert {out for out, _ in results} == {"out"}
+    assert flight.inflight == 0
+    # Nothing is cached once the flight has landed
+    assert flight.do("k", lambda: "again") == ("again", False)
+
+
+def test_errors_propagate_to_all_waiters() -> None:
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(2)
+        raise RuntimeError("boom")
+
+    threads, results = _run_concurrently(flight, fn, n=2)
+    release.set()
+    for t in threads:
+        t.join(2)
+
+    assert len(results) == 2
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.inflight == 0
+
+
+def test_payload_key_is_order_insensitive() -> None:
+    assert payload_key("m", {"a": 1, "b": [1, 2]}) == payload_key(
+        "m", {"b": [1, 2], "a": 1}
+    )
+    assert payload_key("m", {"a": 1}) != payload_key("other", {"a": 1})
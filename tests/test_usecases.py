@@ -6,6 +6,33 @@ from libs.storage import NotesStorage, Note
 from libs.db import models, NoteRepo, ChunkRepo
 
 
+def _repos() -> tuple:
+    """Note and chunk repositories that echo what the pipeline creates."""
+    note_repo = AsyncMock(spec=NoteRepo)
+    note_repo.create.side_effect = lambda **kw: models.Note(
+        id=kw["id"], title=kw["title"], tags=kw["tags"], file_path=kw["file_path"]
+    )
+    chunk_repo = AsyncMock(spec=ChunkRepo)
+    chunk_repo.bulk_create.side_effect = lambda rows: [f"c{n}" for n in range(len(rows))]
+    return note_repo, chunk_repo
+
+
+class _Renderer:
+    """Renders an insight as its title frontmatter plus ``body``."""
+
+    def __init__(self, body: str = "Body", on_render=None) -> None:
+        self.body = body
+        self.on_render = on_render
+
+    def render(self, insight):
+        if self.on_render is not None:
+            self.on_render()
+        return f"---\ntitle: {insight['title']}\n---\n\n{self.body.format(**insight)}"
+
+    def see_also_section(self, titles):
+        return ""
+
+
 def test_ingest_text_pipeline(tmp_path: Path) -> None:
     vault = tmp_path / "vault"
     storage = NotesStorage(vault)
@@ -59,9 +86,7 @@ def test_ingest_text_pipeline(tmp_path: Path) -> None:
         file_path=str(storage.notes_dir / "my-note.md"),
     )
     chunk_repo = AsyncMock(spec=ChunkRepo)
-    chunk_repo.create.return_value = models.Chunk(
-        id="1", note_id="my-note", pos=0, anchor=None
-    )
+    chunk_repo.bulk_create.return_value = ["1"]
 
     ingest = IngestText(llm, storage, embedder, index, note_repo, chunk_repo)
     import asyncio
@@ -71,9 +96,14 @@ def test_ingest_text_pipeline(tmp_path: Path) -> None:
     llm.group_topics.assert_called_once()
     llm.find_autolinks.assert_called_once()
     llm.render_note_markdown.assert_called_once()
-    llm.generate_moc.assert_called_once()
+    # The MOC is rendered from the topic index without an LLM call
+    llm.generate_moc.assert_not_called()
     embedder.embed_texts.assert_called_once_with(["Body text"])
     index.upsert_chunks.assert_called_once()
+    chunk_repo.bulk_create.assert_awaited_once_with(
+        [{"note_id": "my-note", "pos": 0, "anchor": None}]
+    )
+    assert index.upsert_chunks.call_args.args[0][0]["chunk_id"] == "1"
     note_path = vault / "10_Notes" / "my-note.md"
     assert note_path.exists()
     content = note_path.read_text()
@@ -86,7 +116,19 @@ def test_ingest_text_pipeline(tmp_path: Path) -> None:
     assert "topic_id: topic42" in fm
     assert "channel: telegram" in fm
     moc_path = vault / "00_MOC" / "topics_index.md"
-    assert moc_path.read_text() == "MOC\n"
+    assert moc_path.read_text() == (
+        "# Topics Index\n\n## T\nD\n\n- [[my-note]] My Note\n\n"
+        "# Tags\n\n## x\n- [[my-note]] My Note\n"
+    )
+
+    stages = ingest.timings.as_dict()
+    assert {
+        "total", "insights", "topics", "autolinks", "render",
+        "file_write", "db", "embed", "index", "moc",
+    } <= set(stages)
+    assert stages["insights"]["count"] == 1
+    assert stages["db"]["count"] == 2  # note row + chunk rows
+    assert 'render;dur=' in ingest.timings.server_timing()
 
     kwargs = note_repo.create.call_args.kwargs
     assert kwargs["author"] == "Alice"
@@ -170,18 +212,48 @@ def test_search_returns_answer(tmp_path: Path) -> None:
     ]
 
     searcher = Search(llm, embedder, index, storage)
-    answer, fragments = searcher("query")
+    import asyncio
+    answer, fragments = asyncio.run(searcher("query"))
 
     embedder.embed_texts.assert_called_once_with(["query"])
-    index.search.assert_called_once()
+    # Candidates for MMR are fetched with their vectors
+    index.search.assert_called_once_with([0.0, 0.1, 0.2], 15, with_vectors=True)
     llm.answer_from_context.assert_called_once()
     args, _ = llm.answer_from_context.call_args
     fragments_arg = args[1]
-    assert fragments_arg[0]["snippet"].endswith("...")
-    assert len(fragments_arg[0]["snippet"]) <= 200
+    # The answer model gets the packed passage, the result list a snippet
+    assert fragments_arg[0]["snippet"] == long_text
+    assert fragments[0]["snippet"].endswith("...")
+    assert len(fragments[0]["snippet"]) <= 200
     assert answer == "answer"
 
 
+def test_search_expands_hits_with_neighbor_chunks(tmp_path: Path) -> None:
+    storage = NotesStorage(tmp_path / "vault")
+    storage.save_note(Note(slug="n1", title="Note 1", tags=[], body="b"))
+    llm = MagicMock()
+    llm.answer_from_context.return_value = "answer"
+    embedder = MagicMock()
+    embedder.embed_texts.return_value = [[0.0]]
+    index = MagicMock()
+    index.search.return_value = [{"chunk_id": "c1", "note_id": "n1", "pos": 1, "text": "Two."}]
+    index.fetch_chunks.return_value = [
+        {"chunk_id": "c2", "note_id": "n1", "pos": 2, "text": "Three."},
+        {"chunk_id": "c0", "note_id": "n1", "pos": 0, "text": "One."},
+    ]
+
+    searcher = Search(llm, embedder, index, storage, neighbors=1, mmr_lambda=1.0)
+    import asyncio
+    _, fragments = asyncio.run(searcher("query"))
+
+    index.search.assert_called_once_with([0.0], 5)
+    index.fetch_chunks.assert_called_once_with({"n1": {0, 2}})
+    context = llm.answer_from_context.call_args.args[1]
+    assert [c["snippet"] for c in context] == ["One. Two. Three."]
+    # Neighbours only feed the answer; the result list has the hits
+    assert [f["snippet"] for f in fragments] == ["Two."]
+
+
 def test_search_skips_missing_files(tmp_path: Path) -> None:
     """Search should ignore hits referencing missing note files."""
     vault = tmp_path / "vault"
@@ -199,10 +271,606 @@ def test_search_skips_missing_files(tmp_path: Path) -> None:
 
     searcher = Search(llm, embedder, index, storage)
 
-    answer, fragments = searcher("query")
+    import asyncio
+    answer, fragments = asyncio.run(searcher("query"))
 
     # Ensure the LLM was called even with no fragments
     llm.answer_from_context.assert_called_once_with("query", [])
     assert answer == "answer"
     # Fragments list should be empty since the note was missing
     assert fragments == []
+
+
+def test_search_caches_until_index_version_changes(tmp_path: Path) -> None:
+    from libs.rag import IndexVersion
+    from libs.usecases import SearchCache
+
+    storage = NotesStorage(tmp_path / "vault")
+    storage.save_note(Note(slug="n1", title="Note 1", tags=[], body="b"))
+    llm = MagicMock()
+    llm.answer_from_context.return_value = "answer"
+    llm.stream_answer_from_context.side_effect = lambda q, f: iter(["ans", "wer"])
+    embedder = MagicMock()
+    embedder.embed_texts.return_value = [[0.0]]
+    index = MagicMock()
+    index.search.return_value = [{"chunk_id": 1, "note_id": "n1", "pos": 0, "text": "t"}]
+    version = IndexVersion(tmp_path / ".index_version")
+
+    def searcher(user: str = "u1") -> Search:
+        return Search(
+            llm, embedder, index, storage, cache=cache, version=version, user=user
+        )
+
+    import asyncio
+
+    async def ask(s: Search, query: str, k: int = 5):
+        return await s(query, k)
+
+    async def stream(s: Search, query: str) -> list:
+        _, tokens = await s.stream(query)
+        return [token async for token in tokens]
+
+    cache = SearchCache()
+    answer, fragments = asyncio.run(ask(searcher(), "Query"))
+    fragments[0]["title"] = "edited by caller"
+    again = asyncio.run(ask(searcher(), "  query "))
+    assert again == ("answer", [dict(fragments[0], title="Note 1")])
+    assert llm.answer_from_context.call_count == 1
+    assert index.search.call_count == 1
+
+    # Other users and other k miss
+    asyncio.run(ask(searcher("u2"), "query"))
+    asyncio.run(ask(searcher(), "query", k=3))
+    assert llm.answer_from_context.call_count == 3
+
+    version.bump()
+    asyncio.run(ask(searcher(), "query"))
+    assert llm.answer_from_context.call_count == 4
+
+    # A completed stream is cached as one answer
+    assert "".join(asyncio.run(stream(searcher(), "streamed"))) == "answer"
+    assert asyncio.run(stream(searcher(), "streamed")) == ["answer"]
+    assert llm.stream_answer_from_context.call_count == 1
+
+
+def test_search_answer_respects_deadline(tmp_path: Path) -> None:
+    import asyncio
+    import time
+    import pytest
+
+    storage = NotesStorage(tmp_path / "vault")
+    storage.save_note(Note(slug="n1", title="Note 1", tags=[], body="b"))
+    llm = MagicMock()
+    llm.answer_from_context.side_effect = lambda q, f: time.sleep(0.5) or "late"
+    embedder = MagicMock()
+    embedder.embed_texts.return_value = [[0.0]]
+    index = MagicMock()
+    index.search.return_value = [{"chunk_id": 1, "note_id": "n1", "pos": 0, "text": "t"}]
+
+    searcher = Search(llm, embedder, index, storage, timeout=0.1)
+    answer, fragments = asyncio.run(searcher("query"))
+
+    # Results are returned without the answer that missed the deadline
+    assert answer is None
+    assert [f["note_id"] for f in fragments] == ["n1"]
+
+    embedder.embed_texts.side_effect = lambda texts: time.sleep(0.5) or [[0.0]]
+    # Retrieval past the deadline fails the request
+    with pytest.raises(TimeoutError):
+        asyncio.run(searcher("other"))
+
+
+def test_search_caches_an_answer_that_missed_the_deadline(tmp_path: Path) -> None:
+    import asyncio
+    import time
+
+    from libs.rag import IndexVersion
+    from libs.usecases import SearchCache
+
+    storage = NotesStorage(tmp_path / "vault")
+    storage.save_note(Note(slug="n1", title="Note 1", tags=[], body="b"))
+    llm = MagicMock()
+    llm.answer_from_context.side_effect = lambda q, f: time.sleep(0.3) or "late"
+    embedder = MagicMock()
+    embedder.embed_texts.return_value = [[0.0]]
+    index = MagicMock()
+    index.search.return_value = [{"chunk_id": 1, "note_id": "n1", "pos": 0, "text": "t"}]
+    searcher = Search(
+        llm,
+        embedder,
+        index,
+        storage,
+        cache=SearchCache(),
+        version=IndexVersion(tmp_path / ".index_version"),
+        timeout=0.1,
+    )
+
+    async def scenario():
+        first = await searcher("query")
+        await asyncio.sleep(0.5)  # the model call finishes in the background
+        return first, await searcher("query")
+
+    (answer, _), (again, fragments) = asyncio.run(scenario())
+    assert answer is None
+    assert again == "late" and [f["note_id"] for f in fragments] == ["n1"]
+    assert llm.answer_from_context.call_count == 1
+
+
+def test_embedding_autolinker_links_vault_notes(tmp_path: Path) -> None:
+    from libs.usecases.autolinks import EmbeddingAutolinker
+
+    storage = NotesStorage(tmp_path / "vault")
+    storage.save_note(Note(slug="old", title="Old Note", tags=[], body="b"))
+
+    embedder = MagicMock()
+    embedder.embed_texts.return_value = [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]]
+    index = MagicMock()
+    index.search.return_value = [
+        {"note_id": "old", "score": 0.9},
+        {"note_id": "far", "score": 0.1},
+        {"note_id": "missing", "score": 0.95},
+    ]
+
+    insights = [
+        {"title": "A", "summary": "a"},
+        {"title": "B", "summary": "b"},
+        {"title": "C", "summary": "c"},
+    ]
+    storage.read_meta = MagicMock(wraps=storage.read_meta)
+    storage.read_note = MagicMock(side_effect=AssertionError("reads whole notes"))
+    EmbeddingAutolinker(embedder, index, storage, threshold=0.8).link(insights)
+
+    embedder.embed_texts.assert_called_once_with(["A\na", "B\nb", "C\nc"])
+    # Vault hits of all insights are resolved with one frontmatter lookup
+    storage.read_meta.assert_called_once()
+    assert insights[0]["see_also_candidates"] == ["B", "Old Note"]
+    assert insights[2]["see_also_candidates"] == ["Old Note"]
+
+
+def test_template_note_renderer_localized(tmp_path: Path) -> None:
+    from libs.usecases.note_renderer import TemplateNoteRenderer
+    from libs.storage.notes_storage import _load_yaml
+
+    insight = {
+        "title": "Заметка",
+        "summary": "Суть.",
+        "bullets": ["первый", "второй"],
+        "tags": ["x", "y"],
+        "meta": {"topic_id": "t-1", "source_url": "http://example.com"},
+        "see_also_candidates": ["Другая"],
+    }
+    rendered = TemplateNoteRenderer("ru").render(insight)
+
+    _, fm, body = rendered.split("---", 2)
+    front = _load_yaml(fm)
+    assert front["title"] == "Заметка"
+    assert front["tags"] == ["x", "y"]
+    assert front["topic_id"] == "t-1"
+    assert "## Тезисы\n- первый\n- второй" in body
+    assert "## Источники\n- http://example.com" in body
+    assert "## См. также\n- [[Другая]]" in body
+
+
+def test_ingest_text_streaming_stores_notes_as_they_arrive(tmp_path: Path) -> None:
+    from libs.usecases.note_renderer import TemplateNoteRenderer
+
+    storage = NotesStorage(tmp_path / "vault")
+    stored_before_end = []
+
+    def insights():
+        yield {"id": "i1", "title": "First", "summary": "one", "tags": ["x"]}
+        # The first note is stored while the model is still generating
+        import time
+        deadline = time.monotonic() + 5
+        while not (storage.notes_dir / "first.md").exists():
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+        stored_before_end.append((storage.notes_dir / "first.md").exists())
+        yield {"id": "i2", "title": "Second", "summary": "two", "tags": []}
+
+    llm = MagicMock()
+    llm.iter_structured_notes.return_value = insights()
+    llm.group_topics.return_value = {
+        "topics": [{"topic_id": "t1", "title": "T", "insight_ids": ["i1", "i2"]}]
+    }
+    llm.find_autolinks.side_effect = lambda title, summary, candidates: candidates
+    llm.generate_moc.return_value = "MOC"
+
+    embedder = MagicMock()
+    embedder.embed_texts.return_value = [[0.0, 0.1]]
+    index = MagicMock()
+    note_repo, chunk_repo = _repos()
+
+    ingest = IngestText(
+        llm,
+        storage,
+        embedder,
+        index,
+        note_repo,
+        chunk_repo,
+        renderer=TemplateNoteRenderer("en"),
+        stream_insights=True,
+    )
+    import asyncio
+    notes = asyncio.run(ingest("raw text"))
+
+    assert stored_before_end == [True]
+    assert [n.id for n in notes] == ["first", "second"]
+    llm.generate_structured_notes.assert_not_called()
+    assert index.upsert_chunks.call_count == 2
+    assert note_repo.update.await_count == 2
+    assert note_repo.update.await_args.kwargs == {"topic_id": "t1"}
+    content = (storage.notes_dir / "first.md").read_text()
+    assert "topic_id: t1" in content
+    assert content.rstrip().endswith("## See also\n- [[Second]]")
+    moc = (storage.moc_dir / "topics_index.md").read_text()
+    assert "## T\n- [[first]] First\n- [[second]] Second\n" in moc
+
+
+def test_ingest_text_overlaps_insights(tmp_path: Path) -> None:
+    import asyncio
+    import threading
+
+    storage = NotesStorage(tmp_path / "vault")
+    llm = MagicMock()
+    llm.generate_structured_notes.return_value = [
+        {"id": f"i{n}", "title": f"Note {n}", "summary": "s", "tags": []}
+        for n in range(2)
+    ]
+    llm.group_topics.return_value = {"topics": []}
+    llm.find_autolinks.return_value = []
+    llm.generate_moc.return_value = "MOC"
+
+    # Both renders must be in flight at once, or the barrier breaks
+    barrier = threading.Barrier(2, timeout=2)
+
+    embedder = MagicMock()
+    embedder.embed_texts.return_value = [[0.0]]
+    note_repo, chunk_repo = _repos()
+
+    ingest = IngestText(
+        llm,
+        storage,
+        embedder,
+        MagicMock(),
+        note_repo,
+        chunk_repo,
+        renderer=_Renderer(on_render=barrier.wait),
+        concurrency=2,
+    )
+    notes = asyncio.run(ingest("raw text"))
+
+    assert [n.id for n in notes] == ["note-0", "note-1"]
+    assert embedder.embed_texts.call_count == 2
+
+
+def test_concurrent_ingests_do_not_block_the_event_loop(tmp_path: Path) -> None:
+    import asyncio
+    import threading
+
+    storage = NotesStorage(tmp_path / "vault")
+    # Each model call waits for the other ingest to make the same call,
+    # which only happens if neither blocks the event loop
+    extracted = threading.Barrier(2, timeout=2)
+    grouped = threading.Barrier(2, timeout=2)
+
+    def extract(text: str):
+        extracted.wait()
+        return [{"id": "i1", "title": f"Note {text}", "summary": "s", "tags": []}]
+
+    def group(insights):
+        grouped.wait()
+        return {"topics": []}
+
+    llm = MagicMock()
+    llm.generate_structured_notes.side_effect = extract
+    llm.group_topics.side_effect = group
+    llm.find_autolinks.return_value = []
+    embedder = MagicMock()
+    embedder.embed_texts.return_value = [[0.0]]
+
+    def ingest() -> IngestText:
+        note_repo, chunk_repo = _repos()
+        return IngestText(
+            llm, storage, embedder, MagicMock(), note_repo, chunk_repo, renderer=_Renderer()
+        )
+
+    async def both():
+        return await asyncio.gather(ingest()("a"), ingest()("b"))
+
+    notes = asyncio.run(both())
+    assert [[n.id for n in batch] for batch in notes] == [["note-a"], ["note-b"]]
+
+
+def test_ingest_text_long_document_map_reduce(tmp_path: Path) -> None:
+    import asyncio
+    import threading
+
+    storage = NotesStorage(tmp_path / "vault")
+    # Both segment extractions must be in flight at once
+    barrier = threading.Barrier(2, timeout=2)
+
+    def extract(segment: str):
+        barrier.wait()
+        part = "a" if segment.startswith("# A") else "b"
+        return [
+            {"id": "i1", "title": "Shared", "summary": "s", "tags": [part], "bullets": [part]},
+            {"id": "i2", "title": f"Only {part}", "summary": "s", "tags": []},
+        ]
+
+    llm = MagicMock()
+    llm.generate_structured_notes.side_effect = extract
+    llm.group_topics.return_value = {"topics": []}
+    llm.find_autolinks.return_value = []
+
+    embedder = MagicMock()
+    embedder.embed_texts.return_value = [[0.0]]
+    note_repo, chunk_repo = _repos()
+
+    ingest = IngestText(
+        llm,
+        storage,
+        embedder,
+        MagicMock(),
+        note_repo,
+        chunk_repo,
+        renderer=_Renderer(),
+        long_document_tokens=50,
+        segment_tokens=60,
+    )
+    text = "# A\n\n" + "Alpha text here. " * 12 + "\n\n# B\n\n" + "Beta text here. " * 12
+    notes = asyncio.run(ingest(text))
+
+    assert llm.generate_structured_notes.call_count == 2
+    assert sorted(n.id for n in notes) == ["only-a", "only-b", "shared"]
+    # One reduce step over the merged insights of all segments
+    grouped = llm.group_topics.call_args.args[0]
+    assert len(grouped) == 3
+    assert len({i["id"] for i in grouped}) == 3
+    shared = next(i for i in grouped if i["title"] == "Shared")
+    assert shared["tags"] == ["a", "b"]
+    assert shared["bullets"] == ["a", "b"]
+
+
+def test_ingest_batch_shares_grouping_embedding_and_upsert(tmp_path: Path) -> None:
+    import asyncio
+
+    storage = NotesStorage(tmp_path / "vault")
+
+    def extract(text: str):
+        if text == "broken":
+            raise RuntimeError("model failed")
+        return [{"id": "i1", "title": f"Note {text}", "summary": "s", "tags": []}]
+
+    llm = MagicMock()
+    llm.generate_structured_notes.side_effect = extract
+    llm.group_topics.return_value = {"topics": []}
+    llm.find_autolinks.return_value = []
+
+    embedder = MagicMock()
+    embedder.embed_texts.side_effect = lambda texts: [[0.0] for _ in texts]
+    index = MagicMock()
+    note_repo, chunk_repo = _repos()
+
+    ingest = IngestText(
+        llm,
+        storage,
+        embedder,
+        index,
+        note_repo,
+        chunk_repo,
+        renderer=_Renderer(body="Body {title}"),
+    )
+    results = asyncio.run(
+        ingest.ingest_batch(
+            [
+                {"text": "a", "meta": {"source_author": "Alice"}},
+                {"text": "broken"},
+                {"text": "b"},
+            ]
+        )
+    )
+
+    assert [[n.id for n in r.notes] for r in results] == [["note-a"], [], ["note-b"]]
+    assert results[1].error == "model failed"
+    assert llm.group_topics.call_count == 1
+    assert len(llm.group_topics.call_args.args[0]) == 2
+    embedder.embed_texts.assert_called_once_with(["Body Note a", "Body Note b"])
+    chunk_repo.bulk_create.assert_awaited_once()
+    index.upsert_chunks.assert_called_once()
+    assert [c["note_id"] for c in index.upsert_chunks.call_args.args[0]] == [
+        "note-a",
+        "note-b",
+    ]
+    created = {c.kwargs["id"]: c.kwargs for c in note_repo.create.call_args_list}
+    assert created["note-a"]["author"] == "Alice"
+    assert "author" not in created["note-b"]
+
+
+def test_ingest_batch_assigns_notes_with_long_titles(tmp_path: Path) -> None:
+    import asyncio
+
+    storage = NotesStorage(tmp_path / "vault")
+    title = "A very long insight title " * 5
+    llm = MagicMock()
+    llm.generate_structured_notes.side_effect = lambda text: [
+        {"id": "i1", "title": title, "summary": text, "tags": []}
+    ]
+    llm.group_topics.return_value = {"topics": []}
+    llm.find_autolinks.return_value = []
+    embedder = MagicMock()
+    embedder.embed_texts.side_effect = lambda texts: [[0.0] for _ in texts]
+    note_repo, chunk_repo = _repos()
+
+    ingest = IngestText(
+        llm,
+        storage,
+        embedder,
+        MagicMock(),
+        note_repo,
+        chunk_repo,
+        renderer=_Renderer(),
+    )
+    results = asyncio.run(ingest.ingest_batch([{"text": "a"}, {"text": "b"}]))
+
+    # Both items restate the same point; the title is shortened on render
+    assert len(results[0].notes) == 1
+    assert results[0].notes[0].title.endswith("...")
+    assert [r.notes for r in results] == [results[0].notes] * 2
+
+
+def test_ingest_text_returns_existing_notes_for_duplicates(tmp_path: Path) -> None:
+    import asyncio
+    from types import SimpleNamespace
+    from libs.db import FingerprintRepo
+
+    storage = NotesStorage(tmp_path / "vault")
+    llm = MagicMock()
+    existing = models.Note(id="old", title="Old", tags=[], file_path="old.md")
+    note_repo = AsyncMock(spec=NoteRepo)
+    note_repo.get.side_effect = lambda note_id: existing if note_id == "old" else None
+    fingerprints = AsyncMock(spec=FingerprintRepo)
+    fingerprints.find_exact.return_value = SimpleNamespace(note_ids=["old", "gone"])
+
+    ingest = IngestText(
+        llm,
+        storage,
+        MagicMock(),
+        MagicMock(),
+        note_repo,
+        AsyncMock(spec=ChunkRepo),
+        fingerprints=fingerprints,
+    )
+    assert asyncio.run(ingest("same post")) == [existing]
+    llm.generate_structured_notes.assert_not_called()
+    fingerprints.add.assert_not_called()
+
+    # A new text runs the pipeline and records its fingerprint
+    fingerprints.find_exact.return_value = None
+    fingerprints.find_near.return_value = None
+    llm.generate_structured_notes.return_value = []
+    assert asyncio.run(ingest("a new post")) == []
+    llm.generate_structured_notes.assert_called_once_with("a new post")
+    fingerprints.find_near.assert_not_called()  # too short for SimHash
+
+
+def test_failed_ingest_removes_its_files_and_index_entries(tmp_path: Path) -> None:
+    import asyncio
+    import pytest
+    from libs.db import FingerprintRepo
+
+    storage = NotesStorage(tmp_path / "vault")
+    storage.save_note(Note(slug="note-old", title="Note old", tags=[], body="b"))
+    llm = MagicMock()
+    llm.generate_structured_notes.return_value = [
+        {"id": "i1", "title": "Note new", "summary": "s", "tags": []},
+        {"id": "i2", "title": "Note old", "summary": "s", "tags": []},
+    ]
+    llm.group_topics.return_value = {"topics": []}
+    llm.find_autolinks.return_value = []
+    embedder = MagicMock()
+    embedder.embed_texts.return_value = [[0.0]]
+    index = MagicMock()
+    note_repo, chunk_repo = _repos()
+    fingerprints = AsyncMock(spec=FingerprintRepo)
+    fingerprints.find_exact.return_value = None
+    fingerprints.add.side_effect = RuntimeError("db gone")
+
+    ingest = IngestText(
+        llm,
+        storage,
+        embedder,
+        index,
+        note_repo,
+        chunk_repo,
+        renderer=_Renderer(),
+        fingerprints=fingerprints,
+    )
+    with pytest.raises(RuntimeError):
+        asyncio.run(ingest("raw text"))
+
+    assert index.upsert_chunks.call_count == 2
+    index.delete_chunks.assert_called_once_with(["c0", "c0"])
+    # Notes that existed before the ingest are kept
+    assert [p.name for p in storage.notes_dir.iterdir()] == ["note-old.md"]
+
+
+def test_ingest_fails_when_embeddings_are_missing(tmp_path: Path) -> None:
+    import asyncio
+    import pytest
+
+    storage = NotesStorage(tmp_path / "vault")
+    llm = MagicMock()
+    llm.generate_structured_notes.return_value = [
+        {"id": "i1", "title": "Note", "summary": "s", "tags": []}
+    ]
+    llm.group_topics.return_value = {"topics": []}
+    llm.find_autolinks.return_value = []
+    embedder = MagicMock()
+    embedder.embed_texts.return_value = [[0.0]]
+    index = MagicMock()
+    note_repo, chunk_repo = _repos()
+    chunker = MagicMock()
+    chunker.split.return_value = [MagicMock(text="a", anchor=None)] * 2
+
+    ingest = IngestText(
+        llm,
+        storage,
+        embedder,
+        index,
+        note_repo,
+        chunk_repo,
+        renderer=_Renderer(),
+        chunker=chunker,
+    )
+    with pytest.raises(ValueError, match="1 vectors for 2 chunks"):
+        asyncio.run(ingest("raw text"))
+    chunk_repo.bulk_create.assert_not_called()
+    index.upsert_chunks.assert_not_called()
+
+
+def test_failed_insight_stops_its_siblings_before_the_undo(tmp_path: Path) -> None:
+    import asyncio
+    import time
+    import pytest
+
+    storage = NotesStorage(tmp_path / "vault")
+    llm = MagicMock()
+    llm.generate_structured_notes.return_value = [
+        {"id": f"i{n}", "title": f"Note {n}", "summary": "s", "tags": []}
+        for n in range(4)
+    ]
+    llm.group_topics.return_value = {"topics": []}
+    llm.find_autolinks.return_value = []
+
+    def embed(texts):
+        if texts == ["Body Note 0"]:
+            raise RuntimeError("embedding failed")
+        time.sleep(0.2)  # the others are still embedding when it fails
+        return [[0.0]]
+
+    embedder = MagicMock()
+    embedder.embed_texts.side_effect = embed
+    index = MagicMock()
+    note_repo, chunk_repo = _repos()
+
+    ingest = IngestText(
+        llm,
+        storage,
+        embedder,
+        index,
+        note_repo,
+        chunk_repo,
+        renderer=_Renderer(body="Body {title}"),
+    )
+
+    async def scenario() -> None:
+        with pytest.raises(RuntimeError, match="embedding failed"):
+            await ingest("raw text")
+        await asyncio.sleep(0.3)  # give stray writers time to show up
+
+    asyncio.run(scenario())
+
+    index.upsert_chunks.assert_not_called()
+    assert list(storage.notes_dir.iterdir()) == []
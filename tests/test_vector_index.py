@@ -20,10 +20,14 @@ def test_vector_index_prefixes_http(monkeypatch):
     assert captured["uri"] == "http://milvus:19530"
 
 
-def test_upsert_chunks(monkeypatch):
+def test_upsert_chunks(monkeypatch, tmp_path):
     """Ensure upsert_chunks formats data correctly and calls Collection."""
     from types import SimpleNamespace
     import libs.rag.vector_index as vi
+    from libs.rag import IndexVersion
+
+    version = IndexVersion(tmp_path / ".index_version")
+    monkeypatch.setattr(vi, "get_index_version", lambda: version)
 
     # Avoid network and collection setup
     monkeypatch.setattr(vi, "connections", SimpleNamespace(connect=lambda alias, uri: None))
@@ -57,6 +61,31 @@ def test_upsert_chunks(monkeypatch):
         ["t", "u"],
         [[0.1, 0.2], [0.3, 0.4]],
     ]
+    # Cached search results are invalidated by the write
+    assert version.current() == 1
+
+
+def test_delete_chunks(monkeypatch, tmp_path):
+    from types import SimpleNamespace
+    import libs.rag.vector_index as vi
+    from libs.rag import IndexVersion
+
+    version = IndexVersion(tmp_path / ".index_version")
+    monkeypatch.setattr(vi, "get_index_version", lambda: version)
+    monkeypatch.setattr(vi, "connections", SimpleNamespace(connect=lambda alias, uri: None))
+    monkeypatch.setattr(vi.VectorIndex, "_ensure_chunks_collection", lambda self: None)
+    index = vi.VectorIndex(uri="milvus:19530")
+
+    exprs = []
+    monkeypatch.setattr(
+        vi, "Collection", lambda name: SimpleNamespace(delete=exprs.append)
+    )
+
+    index.delete_chunks([])
+    index.delete_chunks(["c1", "c2"])
+
+    assert exprs == ['chunk_id in ["c1", "c2"]']
+    assert version.current() == 1
 
 
 def test_search_returns_hits(monkeypatch):
@@ -77,7 +106,8 @@ def test_search_returns_hits(monkeypatch):
         def load(self):
             captured["load"] = True  # type: ignore[name-defined]
 
-        def search(self, data, anns_field, param, limit, output_fields):
+        def search(self, data, anns_field, param, limit, output_fields, **kwargs):
+            captured["consistency_level"] = kwargs.get("consistency_level")
             entity = {"chunk_id": 1, "note_id": "n1", "pos": 2, "text": "snippet"}
 
             class Hit:
@@ -87,12 +117,48 @@ def test_search_returns_hits(monkeypatch):
 
             return [[Hit(entity)]]
 
-    captured: dict[str, bool] = {}
+    captured: dict = {}
     monkeypatch.setattr(vi, "Collection", DummyCollection)
 
     hits = index.search([0.0, 0.1], k=1)
 
     assert captured.get("load") is True
+    # Search results are cached per index version; reads must see the last write
+    assert captured.get("consistency_level") == "Strong"
     assert hits == [
         {"chunk_id": 1, "note_id": "n1", "pos": 2, "text": "snippet", "score": 0.42}
     ]
+
+
+def test_fetch_chunks_builds_one_query(monkeypatch):
+    from types import SimpleNamespace
+    import libs.rag.vector_index as vi
+
+    monkeypatch.setattr(vi, "connections", SimpleNamespace(connect=lambda alias, uri: None))
+    monkeypatch.setattr(vi.VectorIndex, "_ensure_chunks_collection", lambda self: None)
+    index = vi.VectorIndex(uri="milvus:19530")
+
+    queries: list[dict] = []
+
+    class DummyCollection:
+        def __init__(self, name):
+            pass
+
+        def load(self):
+            pass
+
+        def query(self, **kwargs):
+            queries.append(kwargs)
+            return [{"chunk_id": "c", "note_id": "n1", "pos": 2, "text": "t"}]
+
+    monkeypatch.setattr(vi, "Collection", DummyCollection)
+
+    rows = index.fetch_chunks({"n1": [2, 0, 2], "n2": [], "n3": [5]})
+
+    assert rows == [{"chunk_id": "c", "note_id": "n1", "pos": 2, "text": "t"}]
+    assert len(queries) == 1
+    assert queries[0]["expr"] == (
+        '(note_id == "n1" and pos in [0, 2]) or (note_id == "n3" and pos in [5])'
+    )
+    assert queries[0]["limit"] == 3
+    assert index.fetch_chunks({}) == []
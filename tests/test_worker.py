@@ -0,0 +1,142 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from apps.worker.main import run_once
+from libs.db import JobRepo, models
+from libs.db.database import Base
+
+
+def _session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def factory():
+        async with maker() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def init():
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all,
+                tables=[models.User.__table__, models.IngestJob.__table__],
+            )
+
+    return engine, factory, init
+
+
+def test_worker_runs_queued_jobs_and_retries_failures(tmp_path) -> None:
+    engine, factory, init = _session_factory(tmp_path)
+    seen = []
+
+    async def ingest(session, payload, user):
+        seen.append(payload["text"])
+        if payload["text"] == "bad":
+            raise RuntimeError("boom")
+        return [SimpleNamespace(id="n1", title="N1")]
+
+    async def scenario():
+        await init()
+        async with factory() as session:
+            repo = JobRepo(session)
+            ok = (await repo.create({"text": "good"})).id
+            bad = (await repo.create({"text": "bad"})).id
+
+        assert await run_once(factory, ingest, max_attempts=2)
+        assert await run_once(factory, ingest, max_attempts=2)
+        async with factory() as session:
+            done = await JobRepo(session).get(ok)
+            retried = await JobRepo(session).get(bad)
+            assert done.status == "done"
+            assert done.result == {"notes": [{"id": "n1", "title": "N1"}]}
+            assert retried.status == "queued"
+            assert retried.error == "boom"
+
+        # Second failure exhausts the attempts
+        assert await run_once(factory, ingest, max_attempts=2)
+        assert not await run_once(factory, ingest, max_attempts=2)
+        async with factory() as session:
+            failed = await JobRepo(session).get(bad)
+            assert failed.status == "failed"
+            assert failed.attempts == 2
+        await engine.dispose()
+
+    asyncio.run(scenario())
+    assert seen == ["good", "bad", "bad"]
+
+
+def test_worker_backs_off_and_gives_up_on_stale_jobs(tmp_path) -> None:
+    engine, factory, init = _session_factory(tmp_path)
+
+    async def ingest(session, payload, user):
+        raise RuntimeError("boom")
+
+    async def scenario():
+        await init()
+        async with factory() as session:
+            repo = JobRepo(session)
+            failing = (await repo.create({"text": "bad"})).id
+            # Left running by a worker that died on its last attempt
+            crashed = await repo.create({"text": "crash"})
+            crashed.status = "running"
+            crashed.attempts = 2
+            crashed.started_at = datetime.utcnow() - timedelta(hours=1)
+            crashed = crashed.id
+
+        stale = timedelta(minutes=15)
+        assert await run_once(
+            factory, ingest, stale_after=stale, max_attempts=2, retry_backoff=60
+        )
+        # The retry waits for its backoff; the crashed job is not claimed again
+        assert not await run_once(factory, ingest, stale_after=stale, max_attempts=2)
+        async with factory() as session:
+            retried = await JobRepo(session).get(failing)
+            assert retried.status == "queued"
+            assert retried.run_after > datetime.utcnow() + timedelta(seconds=50)
+            gone = await JobRepo(session).get(crashed)
+            assert gone.status == "failed"
+            assert gone.attempts == 2
+
+            retried.run_after = datetime.utcnow() - timedelta(seconds=1)
+        assert await run_once(factory, ingest, stale_after=stale, max_attempts=2)
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_heartbeat_keeps_a_long_job_from_going_stale(tmp_path) -> None:
+    engine, factory, init = _session_factory(tmp_path)
+    runs = []
+
+    async def ingest(session, payload, user):
+        runs.append(payload["text"])
+        await asyncio.sleep(0.6)  # several times stale_after
+        return []
+
+    async def scenario():
+        await init()
+        async with factory() as session:
+            job = (await JobRepo(session).create({"text": "long"})).id
+
+        stale = timedelta(seconds=0.15)
+        first = asyncio.create_task(run_once(factory, ingest, stale_after=stale))
+        await asyncio.sleep(0.4)
+        # A second worker must not take the job over while it still runs
+        assert not await run_once(factory, ingest, stale_after=stale)
+        assert await first
+        async with factory() as session:
+            done = await JobRepo(session).get(job)
+            assert done.status == "done" and done.attempts == 1
+        await engine.dispose()
+
+    asyncio.run(scenario())
+    assert runs == ["long"]